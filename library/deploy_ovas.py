@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# coding=utf-8
+#
+# Copyright © 2015 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import collections
+import os
+
+import requests
+
+try:
+    from pyVmomi import vim, vmodl
+    HAS_PYVMOMI = True
+except ImportError:
+    HAS_PYVMOMI = False
+
+from ansible.module_utils.nsxt_bulk import getBulkItems
+from ansible.module_utils.nsxt_ova import DEPLOY_PARAMS, buildOvfCommand, buildTemplateCommand, cloneAppliance, \
+    connectToApi, deployAppliances, getInventory, getOvaDigest, getOvaFile, getTemplateName, getVmNames, maskCommand
+
+ITEM_KEYS = DEPLOY_PARAMS + ['portgroup_ext', 'portgroup_transport', 'ssh_enabled', 'allow_ssh_root_login', 'disk_mode',
+                             'vcenter', 'vcenter_user', 'vcenter_passwd', 'deployment_size', 'resource_pool']
+SECRET_KEYS = ['admin_password', 'cli_password', 'vcenter_passwd']
+
+
+def get_existing_vms(module, items):
+    # one name listing per vCenter, however many appliances go to it
+    contents = {}
+    existing = {}
+    for params in items:
+        key = (params['vcenter'], params['vcenter_user'])
+        if key in existing:
+            continue
+        try:
+            content = connectToApi(params['vcenter'], params['vcenter_user'], params['vcenter_passwd'])
+        except vim.fault.InvalidLogin:
+            module.fail_json(msg='exception while connecting to vCenter {}, login failure, check username and password'.format(params['vcenter']))
+        except requests.exceptions.ConnectionError:
+            module.fail_json(msg='exception while connecting to vCenter {}, check hostname, FQDN or IP'.format(params['vcenter']))
+        contents[key] = content
+        existing[key] = getVmNames(content)
+    return contents, existing
+
+
+def mark_as_template(vm, name):
+    # returns an error message instead of raising, it fails only the appliances of this template
+    if vm is None:
+        return 'Template VM {} was not found after its upload'.format(name)
+    try:
+        vm.MarkAsTemplate()
+    except vmodl.MethodFault as ex:
+        return 'Error marking {} as a template: {}'.format(name, ex.msg)
+    return None
+
+
+def deploy_from_templates(module, contents, existing, params_by_name, appliances):
+    # Appliances sharing an OVA (by content hash), deployment size and vCenter
+    # share one template. A missing template is uploaded once with ovftool,
+    # then every appliance is cloned from it with its own OVF properties.
+    limits = (module.params['max_concurrent'], module.params['max_per_datastore'], module.params['max_per_host'])
+    groups = collections.OrderedDict()
+    for appliance in appliances:
+        params = params_by_name[appliance['name']]
+        name = getTemplateName(params, getOvaDigest(getOvaFile(params)))
+        groups.setdefault((params['vcenter'], params['vcenter_user'], name), []).append(appliance)
+
+    uploads = []
+    for (vcenter, vcenter_user, name), members in groups.items():
+        if name not in existing[(vcenter, vcenter_user)]:
+            params = params_by_name[members[0]['name']]
+            uploads.append(dict(members[0], name=name, command=buildTemplateCommand(params, name)))
+    uploaded = deployAppliances(uploads, *limits) if uploads else {}
+
+    deployed = {}
+    clones = []
+    inventories = {}
+    for (vcenter, vcenter_user, name), members in groups.items():
+        key = (vcenter, vcenter_user)
+        outcome = uploaded.get(name)
+        if outcome is not None and outcome['rc'] != 0:
+            for appliance in members:
+                deployed[appliance['name']] = dict(outcome, vmname=appliance['name'], template=name)
+            continue
+        if outcome is not None:
+            existing[key] = getVmNames(contents[key])
+            error = mark_as_template(existing[key].get(name), name)
+            if error is not None:
+                for appliance in members:
+                    deployed[appliance['name']] = dict(outcome, rc=1, output=[error], vmname=appliance['name'], template=name)
+                continue
+        template = existing[key][name]
+        for appliance in members:
+            params = params_by_name[appliance['name']]
+            scope = (key, params['datacenter'])
+            if scope not in inventories:
+                inventories[scope] = getInventory(contents[key], params['datacenter'])
+            clones.append(dict(appliance, template=template, template_name=name, params=params,
+                               inventory=inventories[scope]))
+    if clones:
+        deployed.update(deployAppliances(clones, *limits, deploy=cloneAppliance))
+    for clone in clones:
+        result = deployed[clone['name']]
+        result['template'] = clone['template_name']
+        if clone['template_name'] in uploaded:
+            outcome = uploaded[clone['template_name']]
+            result.update(template_upload_duration=outcome['duration'], throughput_mbps=outcome.get('throughput_mbps'))
+    return deployed
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            items=dict(required=True, type='list'),
+            ovftool_path=dict(type='str'),
+            datacenter=dict(type='str'),
+            datastore=dict(type='str'),
+            portgroup=dict(type='str'),
+            portgroup_ext=dict(type='str'),
+            portgroup_transport=dict(type='str'),
+            cluster=dict(type='str'),
+            vmname=dict(type='str'),
+            hostname=dict(type='str'),
+            dns_server=dict(type='str'),
+            ntp_server=dict(type='str'),
+            dns_domain=dict(type='str'),
+            gateway=dict(type='str'),
+            ip_address=dict(type='str'),
+            netmask=dict(type='str'),
+            admin_password=dict(type='str', no_log=True),
+            cli_password=dict(type='str', no_log=True),
+            ssh_enabled=dict(default=False),
+            allow_ssh_root_login=dict(default=False),
+            path_to_ova=dict(type='str'),
+            ova_file=dict(type='str'),
+            disk_mode=dict(default='thin'),
+            vcenter=dict(type='str'),
+            vcenter_user=dict(type='str'),
+            vcenter_passwd=dict(type='str', no_log=True),
+            deployment_size=dict(required=False, type='str'),
+            resource_pool=dict(required=False, type='str'),
+            max_concurrent=dict(type='int', default=4),
+            max_per_datastore=dict(type='int', default=2),
+            max_per_host=dict(type='int', default=2),
+            from_template=dict(type='bool', default=False)
+        ),
+        supports_check_mode=True
+    )
+
+    if not HAS_PYVMOMI:
+        module.fail_json(msg='pyVmomi is required for this module')
+
+    items = getBulkItems(module, ITEM_KEYS, required=DEPLOY_PARAMS + ['vcenter', 'vcenter_user', 'vcenter_passwd'],
+                         unique=['vmname'], secrets=SECRET_KEYS)
+    contents, existing = get_existing_vms(module, items)
+    params_by_name = dict((params['vmname'], params) for params in items)
+
+    results = []
+    appliances = []
+    for params in items:
+        result = dict(vmname=params['vmname'], changed=False)
+        results.append(result)
+        if params['vmname'] in existing[(params['vcenter'], params['vcenter_user'])]:
+            result['msg'] = 'A VM with the name {} was already present'.format(params['vmname'])
+            continue
+        secrets = [params['vcenter_passwd'], params['admin_password'], params['cli_password']]
+        command = buildOvfCommand(params)
+        result.update(changed=True, command=maskCommand(command, secrets))
+        if module.check_mode:
+            continue
+        try:
+            size = os.path.getsize(getOvaFile(params))
+        except OSError as ex:
+            result.update(changed=False, failed=True, msg='Cannot read OVA file: {}'.format(ex))
+            continue
+        appliances.append(dict(name=params['vmname'], command=command, secrets=secrets, size=size,
+                               datastore=params['datastore'], host=params['cluster']))
+
+    if appliances:
+        if module.params['from_template']:
+            deployed = deploy_from_templates(module, contents, existing, params_by_name, appliances)
+        else:
+            deployed = deployAppliances(appliances, module.params['max_concurrent'],
+                                        module.params['max_per_datastore'], module.params['max_per_host'])
+        for result in results:
+            if result['vmname'] not in deployed:
+                continue
+            outcome = deployed[result['vmname']]
+            result.update(duration=outcome['duration'], progress=outcome['progress'], rc=outcome['rc'],
+                          throughput_mbps=outcome.get('throughput_mbps'))
+            for key in ('template', 'template_upload_duration'):
+                if key in outcome:
+                    result[key] = outcome[key]
+            if outcome['rc'] != 0:
+                result.update(changed=False, failed=True, output=outcome['output'],
+                              msg='Failed to deploy OVA, error message is: {}'.format(
+                                  ' '.join(outcome['output'][-3:])))
+
+    changed = any(result['changed'] for result in results)
+    failed = [result for result in results if result.get('failed')]
+    if failed:
+        module.fail_json(msg='{} of {} appliances failed to deploy'.format(len(failed), len(results)),
+                         changed=changed, results=results)
+    module.exit_json(changed=changed, results=results)
+
+from ansible.module_utils.basic import *
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# coding=utf-8
+#
+# Copyright © 2015 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import os
+import tarfile
+import time
+
+from ansible.module_utils.nsxt_ova_cache import extractOva, updateManifest
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            ova_file=dict(type='path'),
+            dest=dict(required=True, type='path'),
+            state=dict(default='extracted', choices=['extracted', 'manifest']),
+            cache_dir=dict(type='path'),
+            chunk_size=dict(type='int')
+        ),
+        required_if=[['state', 'extracted', ['ova_file']]],
+        supports_check_mode=False
+    )
+
+    start = time.time()
+    source = module.params['dest'] if module.params['state'] == 'manifest' else module.params['ova_file']
+    try:
+        if module.params['state'] == 'manifest':
+            result = updateManifest(module.params['dest'], chunk_size=module.params['chunk_size'])
+        else:
+            result = extractOva(module.params['ova_file'], module.params['dest'],
+                                cache_dir=module.params['cache_dir'], chunk_size=module.params['chunk_size'])
+            result.pop('files')
+            ovf_files = [name for name in result['extracted'] + result['linked'] + result['skipped']
+                         if name.endswith('.ovf')]
+            result['ovf_file'] = os.path.join(module.params['dest'], ovf_files[0]) if ovf_files else None
+    except (IOError, OSError, ValueError) as ex:
+        module.fail_json(msg='Failed to process {}: {}'.format(source, ex))
+    except tarfile.TarError as ex:
+        module.fail_json(msg='{} is not a valid OVA: {}'.format(source, ex))
+
+    result['duration'] = round(time.time() - start, 1)
+    module.exit_json(**result)
+
+from ansible.module_utils.basic import *
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import time
+
+try:
+    from com.vmware.vapi.std.errors_client import Error
+    HAS_PYNSXT = True
+except ImportError:
+    HAS_PYNSXT = False
+
+from ansible.module_utils.nsxt_connection import getStubConfig
+from ansible.module_utils.nsxt_bulk import apiErrorMessage
+from ansible.module_utils.nsxt_reconcile import RECONCILERS, checkObjectParams, objectName
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            objects=dict(required=True, type='list'),
+            continue_on_error=dict(required=False, type='bool', default=False),
+            nsx_manager=dict(required=True, type='str'),
+            nsx_username=dict(required=True, type='str'),
+            nsx_passwd=dict(required=True, type='str', no_log=True)
+        ),
+        supports_check_mode=True
+    )
+
+    if not HAS_PYNSXT:
+        module.fail_json(msg='pynsxt is required for this module')
+
+    # validate everything up front so a typo does not leave a half applied batch
+    checked = []
+    for index, obj in enumerate(module.params['objects']):
+        if not isinstance(obj, dict):
+            module.fail_json(msg="objects[%d] must be a dictionary" % (index))
+        params, error = checkObjectParams(obj.get('type'), obj)
+        if error:
+            module.fail_json(msg="objects[%d]: %s" % (index, error))
+        checked.append((obj['type'], params))
+
+    # one connection, session and set of name indexes for the whole batch;
+    # objects are applied in the given order so later entries can refer to
+    # earlier ones by name
+    stub_config = getStubConfig(module)
+    results = []
+    failed = False
+    for obj_type, params in checked:
+        result = dict(type=obj_type, object_name=objectName(obj_type, params), changed=False)
+        start = time.time()
+        try:
+            result.update(RECONCILERS[obj_type](module, stub_config, params))
+        except Error as ex:
+            result.update(failed=True, msg='API Error: %s' % (apiErrorMessage(ex)))
+        except ValueError as ex:
+            result.update(failed=True, msg=str(ex))
+        result['elapsed'] = round(time.time() - start, 3)
+        results.append(result)
+        if result.get('failed'):
+            failed = True
+            if not module.params['continue_on_error']:
+                break
+
+    changed = any(result['changed'] for result in results)
+    if failed:
+        module.fail_json(msg="%d of %d objects failed" % (len([r for r in results if r.get('failed')]), len(checked)),
+                         changed=changed, results=results)
+    module.exit_json(changed=changed, results=results,
+                     message="%d objects processed, %d changed" % (len(results), len([r for r in results if r['changed']])))
+
+from ansible.module_utils.basic import *
+
+if __name__ == "__main__":
+    main()
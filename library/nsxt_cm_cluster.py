@@ -20,7 +20,7 @@
 __author__ = 'yasensim'
 
 import os
-import requests, time
+import time
 
 try:
     from com.vmware.nsx.fabric_client import ComputeManagers
@@ -57,53 +57,49 @@ try:
     from com.vmware.nsx.model_client import HostNode
 
     from com.vmware.vapi.std.errors_client import NotFound
-    from vmware.vapi.lib import connect
-    from vmware.vapi.security.user_password import \
-        create_user_password_security_context
-    from vmware.vapi.stdlib.client.factories import StubConfigurationFactory
     from com.vmware.nsx.model_client import ApiError
     from com.vmware.vapi.std.errors_client import Error
     HAS_PYNSXT = True
 except ImportError:
     HAS_PYNSXT = False
 
+from ansible.module_utils.nsxt_connection import getStubConfig
+from ansible.module_utils.nsxt_lookup import findByField, getObjectByName, iterPages
+from ansible.module_utils.nsxt_resolver import ReferenceResolver
+
 
 def listComputeManagers(module, stub_config):
-    cm_list = []
+    cm_svc = ComputeManagers(stub_config)
     try:
-        cm_svc = ComputeManagers(stub_config)
-        cm_list = cm_svc.list()
+        for cm in iterPages(cm_svc.list):
+            yield cm
     except Error as ex:
         api_error = ex.data.convert_to(ApiError)
         module.fail_json(msg='API Error listing Compute Managers: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-    return cm_list
 
 def getCMByName(module, stub_config):
-    result = listComputeManagers(module, stub_config)
-    for vs in result.results:
-        cm = vs.convert_to(ComputeManager)
-        if cm.display_name == module.params['cm_name']:
-            return cm
+    cm_svc = ComputeManagers(stub_config)
+    cm = getObjectByName(module, 'ComputeManager', module.params['cm_name'],
+                         lambda: listComputeManagers(module, stub_config), cm_svc.get, ComputeManager)
+    if cm:
+        return cm
     module.fail_json(msg='No Compute Manager %s is found, please specify the right cm_name value!' % (module.params['cm_name']))
     return None
 
 def listCMClusters(module, stub_config):
     cm = getCMByName(module, stub_config)
-    cc_list = []
+    cc_svc = ComputeCollections(stub_config)
     try:
-        cc_svc = ComputeCollections(stub_config)
-        cc_list = cc_svc.list(origin_id=cm.id)
+        for cc in iterPages(cc_svc.list, origin_id=cm.id):
+            yield cc
     except Error as ex:
         api_error = ex.data.convert_to(ApiError)
-        module.fail_json(msg='API Error listing Compute Managers: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-    return cc_list
+        module.fail_json(msg='API Error listing Compute Collections: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
 
 def getClusterByName(module, stub_config):
-    result = listCMClusters(module, stub_config)
-    for vs in result.results:
-        cc = vs.convert_to(ComputeCollection)
-        if cc.display_name == module.params['display_name']:
-            return cc
+    cc = findByField(listCMClusters(module, stub_config), 'display_name', module.params['display_name'], ComputeCollection)
+    if cc:
+        return cc
     module.fail_json(msg='No Cluster with name %s found in Compute Manager %s' % (module.params['display_name'], module.params['cm_name']))
     return None
 
@@ -120,42 +116,45 @@ def getFabricTemplates(module, stub_config, cc):
 
 
 
-def getTransportZoneEndPoint(module, stub_config):
-    tz_endpoints = []
+def listTransportZones(module, stub_config):
     transportzones_svc = TransportZones(stub_config)
     try:
-        tzs = transportzones_svc.list()
+        for tz in iterPages(transportzones_svc.list):
+            yield tz
     except Error as ex:
         api_error = ex.data.convert_to(ApiError)
         module.exit_json(changed=False, message='Error listing Transport Zones: %s'%(api_error))
 
-    for tz_name in module.params['transport_zone_endpoints']:
-        for vs in tzs.results:
-            fn = vs.convert_to(TransportZone)
-            if fn.display_name == tz_name:
-                ep=TransportZoneEndPoint(transport_zone_id=fn.id)
-                tz_endpoints.append(ep)
+def getTransportZoneEndPoint(module, resolver):
+    tz_endpoints = []
+    for tz_name in module.params['transport_zone_endpoints'] or []:
+        tz_id = resolver.transportZoneId(tz_name)
+        if tz_id:
+            ep=TransportZoneEndPoint(transport_zone_id=tz_id)
+            tz_endpoints.append(ep)
     return tz_endpoints
 
-def getUplinkProfileId(module, stub_config, prof_name):
+def listHostSwitchProfiles(module, stub_config):
     hsp_svc = HostSwitchProfiles(stub_config)
     try:
-        hsps = hsp_svc.list()
+        for hsp in iterPages(hsp_svc.list):
+            yield hsp
     except Error as ex:
         api_error = ex.data.convert_to(ApiError)
-        module.exit_json(changed=False, message='Error listing Transport Zones: %s'%(api_error))
+        module.exit_json(changed=False, message='Error listing Host Switch Profiles: %s'%(api_error))
 
-    for vs in hsps.results:
-        fn = vs.convert_to(UplinkHostSwitchProfile)
-        if fn.display_name == prof_name:
-            return fn.id
+def getReferenceResolver(module, stub_config):
+    return ReferenceResolver(stub_config, listers=dict(
+        TransportZone=lambda: listTransportZones(module, stub_config),
+        HostSwitchProfile=lambda: listHostSwitchProfiles(module, stub_config)
+    ))
 
 
-def createHostSwitchList(module, stub_config):
+def createHostSwitchList(module, resolver):
     hs_list= []
     for hostswitch in module.params['host_switch']:
         pnic_list = []
-        uplink_profile_id=getUplinkProfileId(module, stub_config, hostswitch['uplink_profile'])
+        uplink_profile_id=resolver.uplinkProfileId(hostswitch['uplink_profile'])
         hsprof_list = []
 
         hsptie=HostSwitchProfileTypeIdEntry(
@@ -189,9 +188,9 @@ def createHostSwitchList(module, stub_config):
         hs_list.append(hs)
     return hs_list
 
-def createTransportNodeTemplate(module, stub_config, cc):
-    tz_endpoints=getTransportZoneEndPoint(module, stub_config)
-    hs_list = createHostSwitchList(module, stub_config)
+def createTransportNodeTemplate(module, stub_config, cc, resolver):
+    tz_endpoints=getTransportZoneEndPoint(module, resolver)
+    hs_list = createHostSwitchList(module, resolver)
     cctnt_svc = ComputeCollectionTransportNodeTemplates(stub_config)
 
 
@@ -211,15 +210,16 @@ def createTransportNodeTemplate(module, stub_config, cc):
     return 1
 
 def createTnTemplate(module, stub_config, cc):
+    resolver = getReferenceResolver(module, stub_config)
     cctnt_svc = ComputeCollectionTransportNodeTemplates(stub_config)
     changed = False
     try:
         cctnt_list = cctnt_svc.list(compute_collection_id=cc.external_id)
-        desiredTZs = getTransportZoneEndPoint(module, stub_config)
+        desiredTZs = getTransportZoneEndPoint(module, resolver)
         if cctnt_list.results[0].transport_zone_endpoints != desiredTZs:
             cctnt_list.results[0].transport_zone_endpoints = desiredTZs
             changed = True
-        hs_list = createHostSwitchList(module, stub_config)
+        hs_list = createHostSwitchList(module, resolver)
         hs_spec = StandardHostSwitchSpec(host_switches=hs_list)
         tmp_hs_spec = cctnt_list.results[0].host_switch_spec
         real_hs_spec = tmp_hs_spec.convert_to(StandardHostSwitchSpec)
@@ -245,7 +245,7 @@ def createTnTemplate(module, stub_config, cc):
             cctnt_svc.update(cctnt_list.results[0].id, cctnt_list.results[0])
             module.exit_json(changed=True, msg=str(cctnt_list), id=cctnt_list.results[0].id)
     except (AttributeError, IndexError):
-        createTransportNodeTemplate(module, stub_config, cc)
+        createTransportNodeTemplate(module, stub_config, cc, resolver)
         changed = True
     return changed
 
@@ -269,15 +269,7 @@ def main():
 
     if not HAS_PYNSXT:
         module.fail_json(msg='pynsxt is required for this module')
-    session = requests.session()
-    session.verify = False
-    nsx_url = 'https://%s:%s' % (module.params['nsx_manager'], 443)
-    connector = connect.get_requests_connector(
-        session=session, msg_protocol='rest', url=nsx_url)
-    stub_config = StubConfigurationFactory.new_std_configuration(connector)
-    security_context = create_user_password_security_context(module.params["nsx_username"], module.params["nsx_passwd"])
-    connector.set_security_context(security_context)
-    requests.packages.urllib3.disable_warnings()
+    stub_config = getStubConfig(module)
     #tags=None
     tags=[ ]
     tags.append(Tag(scope='generated', tag=time.strftime("%Y-%m-%d %H:%M:%S %z") ) )
@@ -19,10 +19,6 @@
 
 __author__ = 'yasensim'
 
-import ssl
-import socket
-import hashlib
-import requests, time
 try:
     from com.vmware.nsx.fabric_client import ComputeManagers
     from com.vmware.nsx.model_client import ComputeManager
@@ -31,81 +27,86 @@ try:
     from com.vmware.nsx.fabric.compute_managers_client import Status
 
     from com.vmware.vapi.std.errors_client import NotFound
-    from vmware.vapi.lib import connect
-    from vmware.vapi.security.user_password import \
-        create_user_password_security_context
-    from vmware.vapi.stdlib.client.factories import StubConfigurationFactory
     from com.vmware.nsx.model_client import ApiError
     from com.vmware.vapi.std.errors_client import Error
     HAS_PYNSXT = True
 except ImportError:
     HAS_PYNSXT = False
 
-def get_thumb(module):
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.settimeout(1)
-    wrappedSocket = ssl.wrap_socket(sock)
+from ansible.module_utils.nsxt_connection import getStubConfig
+from ansible.module_utils.nsxt_lookup import getObjectByName, invalidateNameIndex, iterPages
+from ansible.module_utils.nsxt_thumbprint import getFreshThumbprint, getThumbprint
+from ansible.module_utils.nsxt_wait import WAIT_SUCCESS, WAIT_TIMEOUT, getWaitTimeout, stateIn, waitFor
 
+def get_thumb(module):
     try:
-        wrappedSocket.connect((module.params['server'], 443))
-    except:
-        response = False
-    else:
-        der_cert_bin = wrappedSocket.getpeercert(True)
-        pem_cert = ssl.DER_cert_to_PEM_cert(wrappedSocket.getpeercert(True))
-    thumb_md5 = hashlib.md5(der_cert_bin).hexdigest()
-    thumb_sha1 = hashlib.sha1(der_cert_bin).hexdigest()
-    thumb_sha256 = hashlib.sha256(der_cert_bin).hexdigest()
-#    print("MD5: " + thumb_md5)
-#    print("SHA1: " + thumb_sha1)
-#    print("SHA256: " + thumb_sha256.upper())
-    sha = thumb_sha256.upper()
-    sha = ":".join(sha[i:i+2] for i in range(0, len(sha), 2))
-#    print(sha)
-    wrappedSocket.close()
-    return sha
+        return getThumbprint(module.params['server'])
+    except (IOError, OSError, ValueError) as ex:
+        module.fail_json(msg='Error reading certificate from %s: %s'%(module.params['server'], str(ex)))
 
 def listComputeManagers(module, stub_config):
+    cm_svc = ComputeManagers(stub_config)
     try:
-        cm_svc = ComputeManagers(stub_config)
+        for cm in iterPages(cm_svc.list):
+            yield cm
     except Error as ex:
         api_error = ex.data.convert_to(ApiError)
-        module.fail_json(msg='API Error listing Compute Managers: %s'%(api_error))
-    return cm_svc.list()
+        module.fail_json(msg='API Error listing Compute Managers: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
 
 
-def createComputeManager(module, stub_config):
-    cm_svc = ComputeManagers(stub_config)
-    if module.params['thumbprint'] == 'x':
-        module.params['thumbprint'] = get_thumb(module)
-    newNode = ComputeManager(
-	display_name=module.params['display_name'],
-	server=module.params['server'],
-	origin_type=module.params['origin_type'],
+def buildComputeManager(params):
+    return ComputeManager(
+	display_name=params['display_name'],
+	server=params['server'],
+	origin_type=params['origin_type'],
 	credential=UsernamePasswordLoginCredential(
-            username=module.params['username'],
-            password=module.params['passwd'],
-            thumbprint=module.params['thumbprint']
+            username=params['username'],
+            password=params['passwd'],
+            thumbprint=params['thumbprint']
         )
     )
+
+
+def createWithFreshThumbprint(cm_svc, params, cached):
+    # a cached thumbprint is stale once vCenter was re-certified,
+    # read the certificate again and retry once if it changed
+    try:
+        return cm_svc.create(buildComputeManager(params))
+    except Error:
+        thumbprint = getFreshThumbprint(params['server'], stale=params['thumbprint']) if cached else None
+        if thumbprint is None:
+            raise
+    params['thumbprint'] = thumbprint
+    return cm_svc.create(buildComputeManager(params))
+
+
+def createComputeManager(module, stub_config):
+    cm_svc = ComputeManagers(stub_config)
+    cached = False
+    if module.params['thumbprint'] == 'x':
+        entry = get_thumb(module)
+        module.params['thumbprint'] = entry['thumbprint']
+        cached = entry['cached']
+    newNode = buildComputeManager(module.params)
     if module.check_mode:
         module.exit_json(changed=True, debug_out=str(newNode), id="1111")
     try:
-        cm_svc.create(newNode)
+        createWithFreshThumbprint(cm_svc, module.params, cached)
     except Error as ex:
         api_error = ex.data.convert_to(ApiError)
         module.fail_json(msg='API Error creating Compute Manager: %s'%(api_error))
-    time.sleep(20)
-    resultCm = getCMByName(module, stub_config)
+    invalidateNameIndex(module, 'ComputeManager')
+    status, resultCm = waitFor(lambda: getCMByName(module, stub_config), lambda cm: cm is not None,
+                               timeout=getWaitTimeout(120))
+    if resultCm is None:
+        module.fail_json(msg='Compute Manager %s was not found after it was created'%(module.params['display_name']))
     status_svc = Status(stub_config)
-    while True:
-        cm_status = status_svc.get(resultCm.id)
-        if cm_status.connection_status == "CONNECTING":
-            time.sleep(5)
-        elif cm_status.connection_status == "UP":
-            return resultCm
-        else:
-            module.fail_json(msg='Error in Compute Manager status: %s'%(str(cm_status)))
+    # DOWN is not final here, the status lags behind right after registration
+    status, cm_status = waitFor(lambda: status_svc.get(resultCm.id), lambda cm_status: cm_status.connection_status == "UP",
+                                timeout=getWaitTimeout(300))
+    if status == WAIT_SUCCESS:
+        return resultCm
+    module.fail_json(msg='Error in Compute Manager status: %s'%(str(cm_status)))
 
 
 def deleteCm(module, cm, stub_config):
@@ -114,25 +115,30 @@ def deleteCm(module, cm, stub_config):
     cm_name = cm.display_name
     try:
         cm_svc.delete(cm_id)
+        invalidateNameIndex(module, 'ComputeManager')
     except Error as ex:
         api_error = ex.data.convert_to(ApiError)
         module.fail_json(msg='API Error Deleting node: %s'%(api_error))
     status_svc = Status(stub_config)
-    while True:
-        try:
-            fn_status = status_svc.get(cm_id)
-            time.sleep(10)
-        except Error as ex:
-            module.exit_json(changed=True, object_id=cm_id, object_name=cm_name, msg="Compute Manager Deleted")
+    status, gone = waitFor(lambda: isCMGone(status_svc, cm_id), stateIn(True), timeout=getWaitTimeout(300))
+    if status == WAIT_TIMEOUT:
+        module.fail_json(changed=True, object_id=cm_id, object_name=cm_name,
+                         msg='Timed out waiting for Compute Manager %s to be deleted'%(cm_name))
+    module.exit_json(changed=True, object_id=cm_id, object_name=cm_name, msg="Compute Manager Deleted")
+
+
+def isCMGone(status_svc, cm_id):
+    try:
+        status_svc.get(cm_id)
+    except Error:
+        return True
+    return False
 
 
 def getCMByName(module, stub_config):
-    result = listComputeManagers(module, stub_config)
-    for vs in result.results:
-        cm = vs.convert_to(ComputeManager)
-        if cm.display_name == module.params['display_name']:
-            return cm
-    return None
+    cm_svc = ComputeManagers(stub_config)
+    return getObjectByName(module, 'ComputeManager', module.params['display_name'],
+                           lambda: listComputeManagers(module, stub_config), cm_svc.get, ComputeManager)
 
 def main():
     module = AnsibleModule(
@@ -153,15 +159,7 @@ def main():
 
     if not HAS_PYNSXT:
         module.fail_json(msg='pynsxt is required for this module')
-    session = requests.session()
-    session.verify = False
-    nsx_url = 'https://%s:%s' % (module.params['nsx_manager'], 443)
-    connector = connect.get_requests_connector(
-        session=session, msg_protocol='rest', url=nsx_url)
-    stub_config = StubConfigurationFactory.new_std_configuration(connector)
-    security_context = create_user_password_security_context(module.params["nsx_username"], module.params["nsx_passwd"])
-    connector.set_security_context(security_context)
-    requests.packages.urllib3.disable_warnings()
+    stub_config = getStubConfig(module)
 
     if module.params['state'] == "present":
         cm = getCMByName(module, stub_config)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+
+import threading
+import time
+
+from ansible.module_utils.nsxt_bulk import getBulkItems
+from ansible.module_utils.nsxt_connection import createSession
+from ansible.module_utils.nsxt_ready import probeController, waitReady
+from ansible.module_utils.nsxt_ssh import HAS_PARAMIKO, SshSession
+from ansible.module_utils.nsxt_topology import runGraph
+from ansible.module_utils.nsxt_wait import WAIT_SUCCESS, getWaitTimeout, waitFor
+
+ITEM_KEYS = ['name', 'address', 'ssh_username', 'ssh_password', 'primary']
+
+
+class StepError(Exception):
+    pass
+
+
+def runStep(result, step, action):
+    start = time.time()
+    try:
+        return action()
+    finally:
+        result['steps'].append(dict(step=step, elapsed=round(time.time() - start, 3)))
+
+
+def runCli(session, args, timeout, retry_on=None, deadline=None):
+    # the controller CLI reports time-outs on stdout, those are retried with
+    # backoff until the deadline
+    def attempt():
+        rc, out, err = session.nsxcli(args, timeout)
+        if rc != 0:
+            raise StepError('"%s" failed on %s: %s' % (' '.join(args[:2]), session.address, (err or out).strip()))
+        return out.strip()
+    if retry_on is None:
+        return attempt()
+    status, out = waitFor(attempt, lambda out: retry_on not in out, timeout=deadline, initial=5, maximum=30)
+    if status != WAIT_SUCCESS:
+        raise StepError('"%s" on %s still reports %s' % (' '.join(args[:2]), session.address, retry_on))
+    return out
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            items=dict(required=True, type='list'),
+            ssh_username=dict(required=False, type='str', default='root'),
+            ssh_password=dict(required=False, type='str', no_log=True),
+            shared_secret=dict(required=True, type='str', no_log=True),
+            nsx_manager=dict(required=True, type='str'),
+            nsx_username=dict(required=False, type='str', default='admin'),
+            nsx_passwd=dict(required=True, type='str', no_log=True),
+            max_concurrent_joins=dict(required=False, type='int', default=1),
+            command_timeout=dict(required=False, type='int', default=300),
+            timeout=dict(required=False, type='int')
+        ),
+        supports_check_mode=True
+    )
+
+    if not HAS_PARAMIKO:
+        module.fail_json(msg='paramiko is required for this module')
+
+    controllers = getBulkItems(module, ITEM_KEYS, required=['address', 'ssh_password'], unique=['address'],
+                               secrets=['ssh_password'])
+    for controller in controllers:
+        controller['name'] = controller['name'] or controller['address']
+        controller['role'] = 'controller'
+        controller['ports'] = [22]
+    primaries = [controller for controller in controllers if controller['primary']]
+    if len(primaries) > 1:
+        module.fail_json(msg="only one controller can be the primary, got %s" % (', '.join(c['name'] for c in primaries)))
+    primary = primaries[0] if primaries else controllers[0]
+    manager = dict(address=module.params['nsx_manager'], username=module.params['nsx_username'],
+                   password=module.params['nsx_passwd'])
+    timeout = module.params['timeout'] or getWaitTimeout(1800)
+    command_timeout = module.params['command_timeout']
+
+    session = createSession()
+    members = set(controller['name'] for controller in controllers
+                  if probeController(session, controller, manager, 5, True) is None)
+    results = dict((controller['name'], dict(name=controller['name'], address=controller['address'],
+                                             member=controller['name'] in members, changed=False, steps=[]))
+                   for controller in controllers)
+    ordered = [results[controller['name']] for controller in controllers]
+    if len(members) == len(controllers):
+        module.exit_json(changed=False, results=ordered, msg="All controllers are already in the control cluster")
+    if module.check_mode:
+        for name, result in results.items():
+            result['changed'] = name not in members
+        module.exit_json(changed=True, results=ordered)
+
+    by_name = dict((controller['name'], controller) for controller in controllers)
+    sessions = {}
+    thumbprints = {}
+    join_slots = threading.Semaphore(max(1, module.params['max_concurrent_joins']))
+    start = time.time()
+
+    def prepare(name):
+        # host key, shared secret, certificate thumbprint and the management
+        # plane connection, for every controller at the same time
+        controller = by_name[name]
+        result = results[name]
+        ssh = runStep(result, 'connect', lambda: SshSession(controller['address'], controller['ssh_username'],
+                                                           controller['ssh_password']))
+        sessions[name] = ssh
+        result['host_key'] = ssh.host_key
+        if name in members:
+            return dict()
+        runStep(result, 'security_model', lambda: runCli(
+            ssh, ['set', 'control-cluster', 'security-model', 'shared-secret', 'secret', module.params['shared_secret']],
+            command_timeout))
+        if name != primary['name']:
+            thumbprints[name] = runStep(result, 'thumbprint', lambda: runCli(
+                ssh, ['get', 'control-cluster', 'certificate', 'thumbprint'], command_timeout))
+        status, waiting_for = runStep(result, 'management_plane', lambda: waitFor(
+            lambda: probeController(session, controller, manager, 5, False), lambda waiting_for: waiting_for is None,
+            timeout=timeout, initial=2, maximum=30))
+        if status != WAIT_SUCCESS:
+            raise StepError('%s is still waiting for %s' % (name, waiting_for))
+        return dict()
+
+    def initialize(name):
+        result = results[name]
+        if name in members:
+            return dict()
+        runStep(result, 'initialize', lambda: runCli(sessions[name], ['initialize', 'control-cluster'], command_timeout,
+                                                     retry_on='initialization timed out', deadline=timeout))
+        runStep(result, 'activate', lambda: runCli(sessions[name], ['activate', 'control-cluster'], command_timeout,
+                                                   retry_on='activation timed out', deadline=timeout))
+        result['changed'] = True
+        return dict()
+
+    def join(name):
+        controller = by_name[name]
+        result = results[name]
+        if name in members:
+            return dict()
+        # membership changes go through the primary, max_concurrent_joins at a time
+        with join_slots:
+            runStep(result, 'join', lambda: runCli(
+                sessions[primary['name']], ['join', 'control-cluster', controller['address'], 'thumbprint', thumbprints[name]],
+                command_timeout))
+            runStep(result, 'activate', lambda: runCli(sessions[name], ['activate', 'control-cluster'], command_timeout,
+                                                       retry_on='activation timed out', deadline=timeout))
+        result['changed'] = True
+        return dict()
+
+    steps = dict(prepare=prepare, initialize=initialize, join=join)
+
+    def worker(key, resolved):
+        try:
+            return steps[key[0]](key[1])
+        except StepError as ex:
+            return dict(failed=True, msg=str(ex))
+        except Exception as ex:
+            return dict(failed=True, msg='%s: %s' % (key[1], ex))
+
+    order = [('prepare', controller['name']) for controller in controllers]
+    deps = dict((key, {}) for key in order)
+    order.append(('initialize', primary['name']))
+    deps[('initialize', primary['name'])] = {('prepare', primary['name']): None}
+    for controller in controllers:
+        if controller['name'] != primary['name']:
+            key = ('join', controller['name'])
+            order.append(key)
+            deps[key] = {('initialize', primary['name']): None, ('prepare', controller['name']): None}
+    try:
+        outcomes = runGraph(order, deps, worker, len(order))
+    finally:
+        for ssh in sessions.values():
+            ssh.close()
+    for key in order:
+        outcome = outcomes[key]
+        if outcome.get('failed'):
+            result = results[key[1]]
+            result['failed'] = True
+            result.setdefault('msg', outcome['msg'])
+
+    if not any(result.get('failed') for result in ordered):
+        cluster_start = time.time()
+        ready = waitReady(controllers, manager=manager, timeout=timeout, control_cluster=True)
+        for name, outcome in ready.items():
+            results[name]['steps'].append(dict(step='cluster_status', elapsed=outcome['elapsed']))
+            if outcome.get('failed'):
+                results[name].update(failed=True, msg=outcome['msg'])
+        cluster_time = round(time.time() - cluster_start, 3)
+    else:
+        cluster_time = None
+
+    failed = [result for result in ordered if result.get('failed')]
+    summary = dict(elapsed=round(time.time() - start, 3), cluster_status_time=cluster_time)
+    if failed:
+        module.fail_json(msg="%d of %d controllers failed: %s" % (len(failed), len(ordered),
+                                                                   '; '.join(result['msg'] for result in failed)),
+                         results=ordered, summary=summary)
+    module.exit_json(changed=True, results=ordered, summary=summary)
+
+from ansible.module_utils.basic import *
+
+if __name__ == "__main__":
+    main()
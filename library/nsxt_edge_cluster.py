@@ -19,90 +19,13 @@
 
 __author__ = 'yasensim'
 
-import os
-import requests, time
-
 try:
-    from com.vmware.nsx.model_client import Tag
-    from com.vmware.nsx.model_client import EdgeCluster
-    from com.vmware.nsx.model_client import EdgeClusterMember
-    from com.vmware.nsx_client import TransportNodes
-    from com.vmware.nsx.model_client import TransportNode
-    from com.vmware.nsx_client import EdgeClusters
-
-    from com.vmware.vapi.std.errors_client import NotFound
-    from vmware.vapi.lib import connect
-    from vmware.vapi.security.user_password import \
-        create_user_password_security_context
-    from vmware.vapi.stdlib.client.factories import StubConfigurationFactory
-    from com.vmware.nsx.model_client import ApiError
     from com.vmware.vapi.std.errors_client import Error
     HAS_PYNSXT = True
 except ImportError:
     HAS_PYNSXT = False
 
-def listEdgeClusters(module, stub_config):
-    ec_list = []
-    try:
-        ec_svc = EdgeClusters(stub_config)
-        ec_list = ec_svc.list()
-    except Error as ex:
-        api_error = ex.date.convert_to(ApiError)
-        module.fail_json(msg='API Error listing Edge Clusters: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-    return ec_list
-
-def getEdgeClusterByName(module, stub_config):
-    result = listEdgeClusters(module, stub_config)
-    for vs in result.results:
-        ec = vs.convert_to(EdgeCluster)
-        if ec.display_name == module.params['display_name']:
-            return ec
-    return None
-
-def listTransportNodes(module, stub_config):
-    try:
-        fabricnodes_svc = TransportNodes(stub_config)
-    except Error as ex:
-        api_error = ex.data.convert_to(ApiError)
-        module.fail_json(msg='API Error listing nodes: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-    return fabricnodes_svc.list()
-
-def getTransportNodeByName(name, module, stub_config):
-    result = listTransportNodes(module, stub_config)
-    for vs in result.results:
-        fn = vs.convert_to(TransportNode)
-        if fn.display_name == name:
-            return fn
-    return None
-
-def simplifyClusterMembersList(memberList):
-    idList = []
-    for member in memberList:
-        idList.append(member.transport_node_id)
-    return idList
-
-def findTag(tags, key):
-    for tag in tags:
-        if tag.scope == key:
-            return tag
-    return None
-
-def compareTags(existing_tags, new_tags):
-    if existing_tags is None or new_tags is None:
-        return False
-
-    for tag1 in new_tags:
-        key = tag1.scope
-        if key == 'generated' or key == 'modified':
-            continue
-
-        tag2 =  findTag(existing_tags, key)
-        if tag2 is None:
-            return False
-
-        if tag1.tag != tag2.tag:
-            return False
-    return True
+from ansible.module_utils.nsxt_reconcile import runModule
 
 def main():
     module = AnsibleModule(
@@ -121,82 +44,7 @@ def main():
 
     if not HAS_PYNSXT:
         module.fail_json(msg='pynsxt is required for this module')
-    session = requests.session()
-    session.verify = False
-    nsx_url = 'https://%s:%s' % (module.params['nsx_manager'], 443)
-    connector = connect.get_requests_connector(
-        session=session, msg_protocol='rest', url=nsx_url)
-    stub_config = StubConfigurationFactory.new_std_configuration(connector)
-    security_context = create_user_password_security_context(module.params["nsx_username"], module.params["nsx_passwd"])
-    connector.set_security_context(security_context)
-    requests.packages.urllib3.disable_warnings()
-
-    tags=[ ]
-    tags.append(Tag(scope='created-by', tag=os.getenv("NSX_T_INSTALLER", "nsx-t-gen") ) )
-
-    if module.params['tags'] is not None:
-        for key, value in module.params['tags'].items():
-            tag=Tag(scope=key, tag=value)
-            tags.append(tag)
-
-    member_list = []
-    if module.params['members']:
-        for tnode_name in module.params['members']:
-            member = getTransportNodeByName(tnode_name, module, stub_config)
-            edgeClusterMember = EdgeClusterMember(transport_node_id=member.id)
-            member_list.append(edgeClusterMember)
-    elif module.params['members'] is None:
-        member_list = None
-    ec_svc = EdgeClusters(stub_config)
-    ec = getEdgeClusterByName(module, stub_config)
-    if module.params['state'] == 'present':
-        if ec is None:
-            tags.append(Tag(scope='generated', tag=time.strftime("%Y-%m-%d %H:%M:%S %z") ) )
-            new_ec = EdgeCluster(
-                display_name=module.params['display_name'],
-                description=module.params['description'],
-                members=member_list,
-                tags=tags
-            )
-            if module.check_mode:
-                module.exit_json(changed=True, debug_out=str(new_ec), id="1111")
-            new_ec = ec_svc.create(new_ec)
-            module.exit_json(changed=True, object_name=module.params['display_name'], id=new_ec.id, message="Edge Cluster with name %s created!"%(module.params['display_name']))
-        elif ec:
-            changed = False
-            if not compareTags(ec.tags, tags):
-                tags.append(findTag(ec.tags, 'generated'))
-                tags.append(Tag(scope='modified', tag=time.strftime("%Y-%m-%d %H:%M:%S %z") ) )
-                ec.tags=tags
-                changed = True
-            desiredList = []
-            realisedList = []
-            if module.params['members']:
-                desiredList = simplifyClusterMembersList(member_list)
-            if ec.members:
-                realisedList = simplifyClusterMembersList(ec.members)
-            if desiredList != realisedList:
-                ec.members=member_list
-                changed = True
-            if changed:
-                if module.check_mode:
-                    module.exit_json(changed=True, debug_out=str(ec), id=ec.id)
-                new_ec = ec_svc.update(ec.id, ec)
-                module.exit_json(changed=True, object_name=module.params['display_name'], id=new_ec.id, message="Edge Cluster with name %s has changed tags!"%(module.params['display_name']))
-
-            module.exit_json(changed=False, object_name=module.params['display_name'], id=ec.id, message="Edge Cluster with name %s already exists!"%(module.params['display_name']))
-
-    elif module.params['state'] == "absent":
-        if ec:
-            if module.check_mode:
-                module.exit_json(changed=True, debug_out=str(ec))
-
-            ec_svc.delete(ec.id)
-            module.exit_json(changed=True, object_name=module.params['display_name'], message="Edge Cluster with name %s deleted!"%(module.params['display_name']))
-        if module.check_mode:
-            module.exit_json(changed=False, debug_out="no Edge Cluster with name %s" % (module.params['display_name']))
-
-        module.exit_json(changed=False, object_name=module.params['display_name'], message="Edge Cluster with name %s does not exist!"%(module.params['display_name']))
+    runModule(module, 'edge_cluster')
 
 from ansible.module_utils.basic import *
 
@@ -20,7 +20,6 @@
 __author__ = 'yasensim'
 
 
-import requests, time
 try:
     from com.vmware.nsx.fabric.nodes_client import Status
     from com.vmware.nsx.fabric_client import Nodes
@@ -28,65 +27,106 @@ try:
     from com.vmware.nsx.model_client import HostNodeLoginCredential
     from com.vmware.nsx.model_client import HostNode
     from com.vmware.vapi.std.errors_client import NotFound
-    from vmware.vapi.lib import connect
-    from vmware.vapi.security.user_password import \
-        create_user_password_security_context
-    from vmware.vapi.stdlib.client.factories import StubConfigurationFactory
     from com.vmware.nsx.model_client import ApiError
     from com.vmware.vapi.std.errors_client import Error
     HAS_PYNSXT = True
 except ImportError:
     HAS_PYNSXT = False
 
+from ansible.module_utils.nsxt_connection import getPoolSize, getStubConfig
+from ansible.module_utils.nsxt_bulk import apiErrorMessage, exitBulk, getBulkItems
+from ansible.module_utils.nsxt_lookup import addToNameIndex, getObjectByName, invalidateNameIndex, iterPages, mapByField
+from ansible.module_utils.nsxt_realization import getFabricNodeWatcher
+from ansible.module_utils.nsxt_thumbprint import collectThumbprints, getFreshThumbprint, getThumbprint
+from ansible.module_utils.nsxt_topology import runGraph
+from ansible.module_utils.nsxt_wait import WAIT_SUCCESS, WAIT_TIMEOUT, getWaitTimeout, stateIn, waitFor
+
 
 def listNodes(module, stub_config):
+    fabricnodes_svc = Nodes(stub_config)
     try:
-        fabricnodes_svc = Nodes(stub_config)
+        for fn in iterPages(fabricnodes_svc.list):
+            yield fn
     except Error as ex:
         api_error = ex.data.convert_to(ApiError)
         module.fail_json(msg='API Error listing nodes: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-    return fabricnodes_svc.list()
 
 
-def createNode(module, stub_config):
-    if module.params['os_type'] == "ESXI":
-        os_type=HostNode.OS_TYPE_ESXI
-    elif module.params['os_type'] == "RHEL":
-        os_type=HostNode.OS_TYPE_RHELKVM
-    elif module.params['os_type'] == "UBUNTU":
-        os_type=HostNode.OS_TYPE_UBUNTUKVM
+OS_TYPES = dict(ESXI='OS_TYPE_ESXI', RHEL='OS_TYPE_RHELKVM', UBUNTU='OS_TYPE_UBUNTUKVM')
 
+def buildHostNode(params):
     ip_addr = []
-    ip_addr.append(module.params['ip_address'])
-    fnodes_svc = Nodes(stub_config)
-    newNode = HostNode(
-	display_name=module.params['display_name'],
+    ip_addr.append(params['ip_address'])
+    return HostNode(
+	display_name=params['display_name'],
 	ip_addresses=ip_addr,
-	os_type=os_type,
-	os_version=module.params['os_version'],
+	os_type=getattr(HostNode, OS_TYPES[params['os_type']]),
+	os_version=params['os_version'],
 	host_credential=HostNodeLoginCredential(
-            username=module.params['node_username'],
-            password=module.params['node_passwd'],
-            thumbprint=module.params['thumbprint']
+            username=params['node_username'],
+            password=params['node_passwd'],
+            thumbprint=params['thumbprint']
         )
     )
+
+
+def createNode(module, stub_config):
+    fnodes_svc = Nodes(stub_config)
+    cached = False
+    if not module.params['thumbprint']:
+        try:
+            entry = getThumbprint(module.params['ip_address'])
+        except (IOError, OSError, ValueError) as ex:
+            module.fail_json(msg='Error reading certificate from %s: %s'%(module.params['ip_address'], str(ex)))
+        module.params['thumbprint'] = entry['thumbprint']
+        cached = entry['cached']
     try:
-        fnodes_svc.create(newNode)
+        createWithFreshThumbprint(fnodes_svc, module.params, cached)
     except Error as ex:
         api_error = ex.data.convert_to(ApiError)
         module.fail_json(msg='API Error creating node: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-    time.sleep(20)
-    resultNode = getNodeByName(module, stub_config)
+    invalidateNameIndex(module, 'Node')
+    status, resultNode = waitFor(lambda: getNodeByName(module, stub_config), lambda node: node is not None,
+                                 timeout=getWaitTimeout(120))
+    if resultNode is None:
+        module.fail_json(msg='Node %s was not found after it was created'%(module.params['display_name']))
     status_svc = Status(stub_config)
-    while True:
-        fn_status = status_svc.get(resultNode.id)
-        if fn_status.host_node_deployment_status == "INSTALL_IN_PROGRESS":
-            time.sleep(10)
-        elif fn_status.host_node_deployment_status == "INSTALL_SUCCESSFUL":
-            time.sleep(5)
-            return resultNode
-        else:
-            module.fail_json(msg='Error in Node status: %s'%(str(fn_status)))
+    status, fn_status = waitFor(lambda: getNodeStatus(status_svc, resultNode.id), isInstallDone,
+                                failure=isInstallFailed, timeout=getWaitTimeout(1800), maximum=30)
+    if status == WAIT_SUCCESS:
+        return resultNode
+    if status == WAIT_TIMEOUT:
+        module.fail_json(msg='Timed out waiting for Node installation, last status: %s'%(str(fn_status)))
+    module.fail_json(msg='Error in Node status: %s'%(str(fn_status)))
+
+
+def createWithFreshThumbprint(fnodes_svc, params, cached):
+    # a cached thumbprint is stale once the host was reimaged or re-certified,
+    # read the certificate again and retry once if it changed
+    try:
+        return fnodes_svc.create(buildHostNode(params))
+    except Error:
+        thumbprint = getFreshThumbprint(params['ip_address'], stale=params['thumbprint']) if cached else None
+        if thumbprint is None:
+            raise
+    params['thumbprint'] = thumbprint
+    return fnodes_svc.create(buildHostNode(params))
+
+
+def getNodeStatus(status_svc, node_id):
+    try:
+        return status_svc.get(node_id)
+    except NotFound:
+        # the status is only published once the manager has picked the node up
+        return None
+
+
+def isInstallDone(fn_status):
+    return fn_status is not None and fn_status.host_node_deployment_status == "INSTALL_SUCCESSFUL"
+
+
+def isInstallFailed(fn_status):
+    return fn_status is not None and fn_status.host_node_deployment_status.endswith("_FAILED")
 
 
 def deleteNode(module, node, stub_config):
@@ -95,57 +135,149 @@ def deleteNode(module, node, stub_config):
     node_name = node.display_name
     try:
         fnodes_svc.delete(node_id)
+        invalidateNameIndex(module, 'Node')
     except Error as ex:
         api_error = ex.data.convert_to(ApiError)
         module.exit_json(changed=False, object_id=node_id, object_name=node_name, message=api_error)
 
         module.fail_json(msg='API Error Deleting node: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
     status_svc = Status(stub_config)
-    while True:
-        try:
-            fn_status = status_svc.get(node_id)
-            time.sleep(10)
-        except Error as ex:
-            module.exit_json(changed=True, object_id=node_id, object_name=node_name)
+    status, gone = waitFor(lambda: isNodeGone(status_svc, node_id), stateIn(True), timeout=getWaitTimeout(600))
+    if status == WAIT_TIMEOUT:
+        module.fail_json(changed=True, object_id=node_id, object_name=node_name,
+                         msg='Timed out waiting for Node %s to be deleted'%(node_name))
+    module.exit_json(changed=True, object_id=node_id, object_name=node_name)
+
+
+def isNodeGone(status_svc, node_id):
+    try:
+        status_svc.get(node_id)
+    except Error:
+        return True
+    return False
 
 
 def getNodeByName(module, stub_config):
-    result = listNodes(module, stub_config)
-    for vs in result.results:
-        fn = vs.convert_to(Node)
-        if fn.display_name == module.params['display_name']:
-            return fn
-    return None
+    fabricnodes_svc = Nodes(stub_config)
+    return getObjectByName(module, 'Node', module.params['display_name'],
+                           lambda: listNodes(module, stub_config),
+                           lambda node_id: fabricnodes_svc.get(node_id).convert_to(Node), Node)
+
+BULK_KEYS = ['display_name', 'ip_address', 'node_username', 'node_passwd', 'thumbprint', 'os_type', 'os_version', 'state']
+
+def reconcileBulk(module, stub_config):
+    items = getBulkItems(module, BULK_KEYS, required=['display_name'], unique=['display_name'],
+                         secrets=['node_passwd', 'thumbprint'])
+    for index, params in enumerate(items):
+        missing = [key for key in ('ip_address', 'os_type', 'os_version') if not params[key]]
+        if params['state'] == 'present' and missing:
+            module.fail_json(msg="items[%d]: missing required parameter %s" % (index, ', '.join(missing)))
+        if params['os_type'] and params['os_type'] not in OS_TYPES:
+            module.fail_json(msg="items[%d]: os_type must be one of %s" % (index, ', '.join(sorted(OS_TYPES))))
+    existing = mapByField(listNodes(module, stub_config), 'display_name',
+                          [params['display_name'] for params in items], Node)
+    results = []
+    pending = {}
+    for params in items:
+        name = params['display_name']
+        node = existing.get(name)
+        result = dict(object_name=name, changed=False, id=node.id if node else None)
+        results.append(result)
+        if params['state'] == 'absent' and node is None:
+            result['message'] = "No Node with name %s" % (name)
+        elif params['state'] == 'present' and node is not None:
+            result['message'] = "Node with name %s already exists!" % (name)
+        else:
+            result['changed'] = True
+            pending[name] = (params, result)
+            if module.check_mode:
+                result['message'] = "Node with name %s will be %s" % (name, 'created' if node is None else 'deleted')
+    if module.check_mode or not pending:
+        exitBulk(module, results)
+
+    max_concurrent = module.params['max_concurrent'] or getPoolSize()
+    # thumbprints that were not given are read from all new hosts at once
+    missing = [params for params, result in pending.values()
+               if params['state'] == 'present' and not params['thumbprint']]
+    cached = set()
+    if missing:
+        thumbprints = collectThumbprints([params['ip_address'] for params in missing])
+        for params in missing:
+            entry = thumbprints[params['ip_address']]
+            if entry.get('failed'):
+                pending.pop(params['display_name'])[1].update(failed=True, changed=False, msg=entry['msg'])
+            else:
+                params['thumbprint'] = entry['thumbprint']
+                if entry['cached']:
+                    cached.add(params['display_name'])
+
+    fnodes_svc = Nodes(stub_config)
+    status_svc = Status(stub_config)
+    watcher = getFabricNodeWatcher(module, stub_config)
+    timeout = getWaitTimeout(1800)
+
+    def prepare(name, resolved):
+        # a worker holds its slot until the host is installed or removed, so
+        # max_concurrent caps the installs running on the manager at once
+        params, result = pending[name]
+        try:
+            if params['state'] == 'absent':
+                fnodes_svc.delete(result['id'])
+                invalidateNameIndex(module, 'Node')
+            else:
+                result['id'] = createWithFreshThumbprint(fnodes_svc, params, name in cached).id
+                addToNameIndex(module, 'Node', name, result['id'])
+        except Error as ex:
+            return dict(failed=True, changed=False, msg='API Error: %s' % (apiErrorMessage(ex)))
+        if params['state'] == 'absent':
+            status, gone = waitFor(lambda: isNodeGone(status_svc, result['id']), stateIn(True), timeout=getWaitTimeout(600))
+            if status == WAIT_TIMEOUT:
+                return dict(status=status, failed=True, msg="Timed out waiting for Node %s to be deleted" % (name))
+            return dict(status=status, message="Node with name %s deleted" % (name))
+        watcher.watch(result['id'], timeout)
+        realized = watcher.wait(result['id'])
+        outcome = dict(status=realized['status'], deployment_status=realized['state'], install_time=realized['elapsed'])
+        if realized['status'] != WAIT_SUCCESS:
+            outcome.update(failed=True, msg="Node %s install %s, last status: %s" % (name, realized['status'], realized['state']))
+        else:
+            outcome['message'] = "Node with name %s installed" % (name)
+        return outcome
+
+    order = [params['display_name'] for params in items if params['display_name'] in pending]
+    outcomes = runGraph(order, dict((name, {}) for name in order), prepare, max_concurrent)
+    for name in order:
+        pending[name][1].update(outcomes[name])
+    exitBulk(module, results)
 
 def main():
     module = AnsibleModule(
         argument_spec=dict(
-            display_name=dict(required=True, type='str'),
-            ip_address=dict(required=True, type='str'),
+            display_name=dict(required=False, type='str'),
+            items=dict(required=False, type='list', default=None),
+            max_concurrent=dict(required=False, type='int', default=None),
+            ip_address=dict(required=False, type='str'),
             node_username=dict(required=False, type='str'),
             node_passwd=dict(required=False, type='str', no_log=True),
             thumbprint=dict(required=False, type='str', no_log=True),
-            os_type=dict(required=True, type='str', choices=['ESXI', 'RHEL', 'UBUNTU']),
-            os_version=dict(required=True, type='str', choices=['6.5.0', '7.4', '16.04']),
+            os_type=dict(required=False, type='str', choices=['ESXI', 'RHEL', 'UBUNTU']),
+            os_version=dict(required=False, type='str', choices=['6.5.0', '7.4', '16.04']),
             state=dict(required=False, type='str', default="present", choices=['present', 'absent']),
             nsx_manager=dict(required=True, type='str'),
             nsx_username=dict(required=True, type='str'),
             nsx_passwd=dict(required=True, type='str', no_log=True)
         ),
+        required_one_of=[['display_name', 'items']],
         supports_check_mode=True
     )
 
     if not HAS_PYNSXT:
         module.fail_json(msg='pynsxt is required for this module')
-    session = requests.session()
-    session.verify = False
-    nsx_url = 'https://%s:%s' % (module.params['nsx_manager'], 443)
-    connector = connect.get_requests_connector(
-        session=session, msg_protocol='rest', url=nsx_url)
-    stub_config = StubConfigurationFactory.new_std_configuration(connector)
-    security_context = create_user_password_security_context(module.params["nsx_username"], module.params["nsx_passwd"])
-    connector.set_security_context(security_context)
-    requests.packages.urllib3.disable_warnings()
+    stub_config = getStubConfig(module)
+    if module.params['items']:
+        reconcileBulk(module, stub_config)
+    missing = [key for key in ('ip_address', 'os_type', 'os_version') if not module.params[key]]
+    if missing:
+        module.fail_json(msg='missing required arguments: %s' % (', '.join(missing)))
     if module.params['state'] == "present":
         node = getNodeByName(module, stub_config)
         if node is None:
@@ -20,7 +20,7 @@
 __author__ = 'yasensim'
 
 import os
-import requests, time
+import time
 
 try:
     from com.vmware.nsx.model_client import IpBlock
@@ -29,33 +29,28 @@ try:
     from com.vmware.nsx.pools_client import IpBlocks
 
     from com.vmware.vapi.std.errors_client import NotFound
-    from vmware.vapi.lib import connect
-    from vmware.vapi.security.user_password import \
-        create_user_password_security_context
-    from vmware.vapi.stdlib.client.factories import StubConfigurationFactory
     from com.vmware.nsx.model_client import ApiError
     from com.vmware.vapi.std.errors_client import Error
     HAS_PYNSXT = True
 except ImportError:
     HAS_PYNSXT = False
 
+from ansible.module_utils.nsxt_connection import getStubConfig
+from ansible.module_utils.nsxt_lookup import addToNameIndex, getObjectByName, invalidateNameIndex, iterPages
+
 def listIpBlocks(module, stub_config):
-    ipblock_list = []
+    ipblock_svc = IpBlocks(stub_config)
     try:
-        ipblock_svc = IpBlocks(stub_config)
-        ipblock_list = ipblock_svc.list()
+        for ipblock in iterPages(ipblock_svc.list):
+            yield ipblock
     except Error as ex:
-        api_error = ex.date.convert_to(ApiError)
+        api_error = ex.data.convert_to(ApiError)
         module.fail_json(msg='API Error listing IP BLOCKS: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-    return ipblock_list
 
 def getIpBlockByName(module, stub_config):
-    result = listIpBlocks(module, stub_config)
-    for vs in result.results:
-        ipblock = vs.convert_to(IpBlock)
-        if ipblock.display_name == module.params['display_name']:
-            return ipblock
-    return None
+    ipblock_svc = IpBlocks(stub_config)
+    return getObjectByName(module, 'IpBlock', module.params['display_name'],
+                           lambda: listIpBlocks(module, stub_config), ipblock_svc.get, IpBlock)
 
 def findTag(tags, key):
     for tag in tags:
@@ -97,15 +92,7 @@ def main():
 
     if not HAS_PYNSXT:
         module.fail_json(msg='pynsxt is required for this module')
-    session = requests.session()
-    session.verify = False
-    nsx_url = 'https://%s:%s' % (module.params['nsx_manager'], 443)
-    connector = connect.get_requests_connector(
-        session=session, msg_protocol='rest', url=nsx_url)
-    stub_config = StubConfigurationFactory.new_std_configuration(connector)
-    security_context = create_user_password_security_context(module.params["nsx_username"], module.params["nsx_passwd"])
-    connector.set_security_context(security_context)
-    requests.packages.urllib3.disable_warnings()
+    stub_config = getStubConfig(module)
     #tags=None
     tags=[ ]
     tags.append(Tag(scope='created-by', tag=os.getenv("NSX_T_INSTALLER", "nsx-t-gen") ) )
@@ -132,6 +119,7 @@ def main():
                 if module.check_mode:
                     module.exit_json(changed=True, debug_out=str(new_ipblock), id="1111")
                 new_ipblock = ipblock_svc.create(new_ipblock)
+                addToNameIndex(module, 'IpBlock', new_ipblock.display_name, new_ipblock.id)
                 module.exit_json(changed=True, object_name=module.params['display_name'], id=new_ipblock.id, message="IP BLOCK with name %s created!"%(module.params['display_name']))
         elif ipblock:
             changed = False
@@ -157,6 +145,7 @@ def main():
             if module.check_mode:
                 module.exit_json(changed=True, debug_out=str(ipblock), id=ipblock.id)
             ipblock_svc.delete(ipblock.id)
+            invalidateNameIndex(module, 'IpBlock')
             module.exit_json(changed=True, object_name=module.params['display_name'], message="IP Block with name %s deleted!"%(module.params['display_name']))
         module.exit_json(changed=False, object_name=module.params['display_name'], message="IP Block with name %s does not exist!"%(module.params['display_name']))
 
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+
+from ansible.module_utils.nsxt_ssh import HAS_PARAMIKO, collectHostKeys, getKnownHostName, updateKnownHosts
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            hosts=dict(required=True, type='list'),
+            port=dict(required=False, type='int', default=22),
+            path=dict(required=False, type='str', default='~/.ssh/known_hosts'),
+            hash_hosts=dict(required=False, type='bool', default=True),
+            timeout=dict(required=False, type='int', default=10),
+            refresh=dict(required=False, type='bool', default=False),
+            on_key_change=dict(required=False, type='str', default='replace', choices=['replace', 'fail']),
+            max_concurrent=dict(required=False, type='int', default=50)
+        ),
+        supports_check_mode=True
+    )
+
+    if not HAS_PARAMIKO:
+        module.fail_json(msg='paramiko is required for this module')
+
+    hosts = [host for host in module.params['hosts'] if host]
+    collected = collectHostKeys(hosts, port=module.params['port'], timeout=module.params['timeout'],
+                                refresh=module.params['refresh'], max_workers=module.params['max_concurrent'])
+    results = []
+    keys = {}
+    for host in sorted(collected, key=hosts.index):
+        entry = collected[host]
+        result = dict(host=host, elapsed=entry['elapsed'])
+        if entry.get('failed'):
+            result.update(failed=True, msg=entry['msg'])
+        else:
+            keys[getKnownHostName(host, module.params['port'])] = (entry['type'], entry['key'])
+            result.update(type=entry['type'], fingerprint=entry['fingerprint'], cached=entry['cached'],
+                          key_changed=entry['key_changed'])
+        results.append(result)
+    changed_keys = [result['host'] for result in results if result.get('key_changed')]
+    failed = [result for result in results if result.get('failed')]
+    if failed:
+        module.fail_json(msg="%d of %d host keys could not be read" % (len(failed), len(results)), results=results)
+    if changed_keys and module.params['on_key_change'] == 'fail':
+        module.fail_json(msg="SSH host keys changed for %s" % (', '.join(changed_keys)), results=results,
+                         changed_keys=changed_keys)
+    try:
+        written = updateKnownHosts(module.params['path'], keys, hash_hosts=module.params['hash_hosts'],
+                                   check_mode=module.check_mode)
+    except (IOError, OSError) as ex:
+        module.fail_json(msg="Error writing %s: %s" % (module.params['path'], str(ex)), results=results)
+    module.exit_json(changed=written['changed'], results=results, changed_keys=changed_keys,
+                     updated=written['updated'])
+
+from ansible.module_utils.basic import *
+
+if __name__ == "__main__":
+    main()
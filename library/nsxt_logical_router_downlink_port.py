@@ -20,7 +20,7 @@
 __author__ = 'yasensim'
 
 import os
-import requests, time
+import time
 
 try:
     from com.vmware.nsx.model_client import Tag
@@ -30,33 +30,31 @@ try:
     from com.vmware.nsx.model_client import IPSubnet
 
     from com.vmware.vapi.std.errors_client import NotFound
-    from vmware.vapi.lib import connect
-    from vmware.vapi.security.user_password import \
-        create_user_password_security_context
-    from vmware.vapi.stdlib.client.factories import StubConfigurationFactory
     from com.vmware.nsx.model_client import ApiError
     from com.vmware.vapi.std.errors_client import Error
     HAS_PYNSXT = True
 except ImportError:
     HAS_PYNSXT = False
 
+from ansible.module_utils.nsxt_connection import getStubConfig
+from ansible.module_utils.nsxt_lookup import addToNameIndex, getObjectByName, invalidateNameIndex, iterPages
+
 def listLogicalRouterPorts(module, stub_config):
-    lrp_list = []
+    lrp_svc = LogicalRouterPorts(stub_config)
     try:
-        lrp_svc = LogicalRouterPorts(stub_config)
-        lrp_list = lrp_svc.list(logical_router_id=module.params['logical_router_id'], resource_type='LogicalRouterDownLinkPort')
+        for lrp in iterPages(lrp_svc.list, logical_router_id=module.params['logical_router_id'], resource_type='LogicalRouterDownLinkPort'):
+            yield lrp
     except Error as ex:
-        api_error = ex.date.convert_to(ApiError)
+        api_error = ex.data.convert_to(ApiError)
         module.fail_json(msg='API Error listing Logical Router Ports: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-    return lrp_list
 
 def getLogicalRouterPortByName(module, stub_config):
-    result = listLogicalRouterPorts(module, stub_config)
-    for vs in result.results:
-        lrp = vs.convert_to(LogicalRouterDownLinkPort)
-        if lrp.display_name == module.params['display_name']:
-            return lrp
-    return None
+    lrp_svc = LogicalRouterPorts(stub_config)
+    return getObjectByName(module, 'LogicalRouterDownLinkPort:%s' % (module.params['logical_router_id']), module.params['display_name'],
+                           lambda: listLogicalRouterPorts(module, stub_config),
+                           lambda lrp_id: lrp_svc.get(lrp_id).convert_to(LogicalRouterDownLinkPort),
+                           LogicalRouterDownLinkPort, stub_config=stub_config,
+                           search_filters=dict(logical_router_id=module.params['logical_router_id']))
 
 def findTag(tags, key):
     for tag in tags:
@@ -102,15 +100,7 @@ def main():
 
     if not HAS_PYNSXT:
         module.fail_json(msg='pynsxt is required for this module')
-    session = requests.session()
-    session.verify = False
-    nsx_url = 'https://%s:%s' % (module.params['nsx_manager'], 443)
-    connector = connect.get_requests_connector(
-        session=session, msg_protocol='rest', url=nsx_url)
-    stub_config = StubConfigurationFactory.new_std_configuration(connector)
-    security_context = create_user_password_security_context(module.params["nsx_username"], module.params["nsx_passwd"])
-    connector.set_security_context(security_context)
-    requests.packages.urllib3.disable_warnings()
+    stub_config = getStubConfig(module)
     #tags=None
     tags=[ ]
     tags.append(Tag(scope='created-by', tag=os.getenv("NSX_T_INSTALLER", "nsx-t-gen") ) )
@@ -145,6 +135,7 @@ def main():
                 module.exit_json(changed=True, debug_out=str(new_lrp), id="1111")
             new_lrp_temp = lrp_svc.create(new_lrp)
             new_lrp = new_lrp_temp.convert_to(LogicalRouterDownLinkPort)
+            addToNameIndex(module, 'LogicalRouterDownLinkPort:%s' % (module.params['logical_router_id']), new_lrp.display_name, new_lrp.id)
             module.exit_json(changed=True, object_name=module.params['display_name'], id=new_lrp.id, message="Logical Router Port with name %s created!"%(module.params['display_name']))
         elif lrp:
             changed = False
@@ -170,6 +161,7 @@ def main():
             if module.check_mode:
                 module.exit_json(changed=True, debug_out=str(lrp), id=lrp.id)
             lrp_svc.delete(lrp.id)
+            invalidateNameIndex(module, 'LogicalRouterDownLinkPort:%s' % (module.params['logical_router_id']))
             module.exit_json(changed=True, object_name=module.params['display_name'], message="Logical Router Port with name %s deleted!"%(module.params['display_name']))
         module.exit_json(changed=False, object_name=module.params['display_name'], message="Logical Router Port with name %s does not exist!"%(module.params['display_name']))
 
@@ -19,146 +19,93 @@
 
 __author__ = 'yasensim'
 
-import os
-import requests, time
-
 try:
-    from com.vmware.nsx.model_client import Tag
     from com.vmware.nsx_client import LogicalPorts
     from com.vmware.nsx.model_client import LogicalPort
 
     from com.vmware.vapi.std.errors_client import NotFound
-    from vmware.vapi.lib import connect
-    from vmware.vapi.security.user_password import \
-        create_user_password_security_context
-    from vmware.vapi.stdlib.client.factories import StubConfigurationFactory
     from com.vmware.nsx.model_client import ApiError
     from com.vmware.vapi.std.errors_client import Error
     HAS_PYNSXT = True
 except ImportError:
     HAS_PYNSXT = False
 
+from ansible.module_utils.nsxt_connection import getStubConfig
+from ansible.module_utils.nsxt_lookup import iterPages, mapByField
+from ansible.module_utils.nsxt_bulk import applyBatchResults, batchOperation, bulkArgumentSpec, exitBulk, getBulkItems, runBatch
+from ansible.module_utils.nsxt_reconcile import buildLogicalPort, retag, runModule
+
 def listLogicalSwitchPorts(module, stub_config):
-    lsp_list = []
+    lsp_svc = LogicalPorts(stub_config)
     try:
-        lsp_svc = LogicalPorts(stub_config)
-        lsp_list = lsp_svc.list()
+        for lsp in iterPages(lsp_svc.list):
+            yield lsp
     except Error as ex:
-        api_error = ex.date.convert_to(ApiError)
+        api_error = ex.data.convert_to(ApiError)
         module.fail_json(msg='API Error listing Logical Switch Ports: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-    return lsp_list
-
-def getLogicalSwitchPortByName(module, stub_config):
-    result = listLogicalSwitchPorts(module, stub_config)
-    for vs in result.results:
-        lsp = vs.convert_to(LogicalPort)
-        if lsp.display_name == module.params['display_name']:
-            return lsp
-    return None
 
-def findTag(tags, key):
-    for tag in tags:
-        if tag.scope == key:
-            return tag
-    return None
-
-def compareTags(existing_tags, new_tags):
-    if existing_tags is None or new_tags is None:
-        return False
-
-    for tag1 in new_tags:
-        key = tag1.scope
-        if key == 'generated' or key == 'modified':
+BULK_KEYS = ['display_name', 'description', 'admin_state', 'logical_switch_id', 'tags', 'state']
+
+def reconcileBulk(module, stub_config):
+    items = getBulkItems(module, BULK_KEYS, required=['display_name'], unique=['display_name'])
+    existing = mapByField(listLogicalSwitchPorts(module, stub_config), 'display_name',
+                          [params['display_name'] for params in items], LogicalPort)
+    results = []
+    operations = []
+    for params in items:
+        name = params['display_name']
+        result = dict(object_name=name, changed=False)
+        results.append(result)
+        lsp = existing.get(name)
+        if params['state'] == 'absent':
+            if lsp is None:
+                result['message'] = "Logical Switch Port with name %s does not exist!" % (name)
+            else:
+                result['id'] = lsp.id
+                operations.append(batchOperation('DELETE', '/v1/logical-ports/%s' % (lsp.id), result=result))
             continue
-
-        tag2 =  findTag(existing_tags, key)
-        if tag2 is None:
-            return False
-
-        if tag1.tag != tag2.tag:
-            return False
-    return True
+        if lsp is None:
+            if not params['logical_switch_id']:
+                result.update(failed=True, msg="logical_switch_id is required to create Logical Switch Port %s" % (name))
+                continue
+            new_lsp = buildLogicalPort(params, params['logical_switch_id'])
+            operations.append(batchOperation('POST', '/v1/logical-ports', new_lsp, result=result))
+        elif retag(lsp, params):
+            result['id'] = lsp.id
+            operations.append(batchOperation('PUT', '/v1/logical-ports/%s' % (lsp.id), lsp, result=result))
+        else:
+            result.update(id=lsp.id, message="Logical Switch Port with name %s already exists!" % (name))
+
+    runBatch(module, stub_config, operations)
+    applyBatchResults(module, operations, 'LogicalPort', 'Logical Switch Port with name')
+    exitBulk(module, results)
 
 def main():
+    argument_spec = dict(
+        display_name=dict(required=False, type='str'),
+        description=dict(required=False, type='str', default=None),
+        admin_state=dict(required=False, type='str', default='UP', choices=['UP', 'DOWN']),
+        logical_switch_id=dict(required=False, type='str'),
+        switching_profile_ids=dict(required=False, type='list', default=None),
+        tags=dict(required=False, type='dict', default=None),
+        state=dict(required=False, type='str', default="present", choices=['present', 'absent']),
+        nsx_manager=dict(required=True, type='str'),
+        nsx_username=dict(required=True, type='str'),
+        nsx_passwd=dict(required=True, type='str', no_log=True)
+    )
+    argument_spec.update(bulkArgumentSpec())
     module = AnsibleModule(
-        argument_spec=dict(
-            display_name=dict(required=True, type='str'),
-            description=dict(required=False, type='str', default=None),
-            admin_state=dict(required=False, type='str', default='UP', choices=['UP', 'DOWN']),
-            logical_switch_id=dict(required=True, type='str'),
-            switching_profile_ids=dict(required=False, type='list', default=None),
-            tags=dict(required=False, type='dict', default=None),
-            state=dict(required=False, type='str', default="present", choices=['present', 'absent']),
-            nsx_manager=dict(required=True, type='str'),
-            nsx_username=dict(required=True, type='str'),
-            nsx_passwd=dict(required=True, type='str', no_log=True)
-        ),
+        argument_spec=argument_spec,
+        required_one_of=[['display_name', 'items'], ['logical_switch_id', 'items']],
         supports_check_mode=True
     )
 
     if not HAS_PYNSXT:
         module.fail_json(msg='pynsxt is required for this module')
-    session = requests.session()
-    session.verify = False
-    nsx_url = 'https://%s:%s' % (module.params['nsx_manager'], 443)
-    connector = connect.get_requests_connector(
-        session=session, msg_protocol='rest', url=nsx_url)
-    stub_config = StubConfigurationFactory.new_std_configuration(connector)
-    security_context = create_user_password_security_context(module.params["nsx_username"], module.params["nsx_passwd"])
-    connector.set_security_context(security_context)
-    requests.packages.urllib3.disable_warnings()
-    #tags=None
-    tags=[ ]
-    tags.append(Tag(scope='created-by', tag=os.getenv("NSX_T_INSTALLER", "nsx-t-gen") ) )
-
-    if module.params['tags'] is not None:
-        #tags = []
-        for key, value in module.params['tags'].items():
-            tag=Tag(scope=key, tag=value)
-            tags.append(tag)
-    lsp_svc = LogicalPorts(stub_config)
-    lsp = getLogicalSwitchPortByName(module, stub_config)
-    if module.params['state'] == 'present':
-        if lsp is None:
-            tags.append(Tag(scope='generated', tag=time.strftime("%Y-%m-%d %H:%M:%S %z") ) )
-
-            new_lsp = LogicalPort(
-                display_name=module.params['display_name'],
-                description=module.params['description'],
-                address_bindings=None,
-                admin_state=module.params['admin_state'],
-                attachment=None,
-                logical_switch_id=module.params['logical_switch_id'],
-                switching_profile_ids=None,
-                tags=tags
-            )
-            if module.check_mode:
-                module.exit_json(changed=True, debug_out=str(new_lsp), id="1111")
-            new_lsp = lsp_svc.create(new_lsp)
-            module.exit_json(changed=True, object_name=module.params['display_name'], id=new_lsp.id, message="Logical Switch Port with name %s created!"%(module.params['display_name']))
-        elif lsp:
-            changed = False
-            #if tags != lsp.tags:
-            if not compareTags(lsp.tags, tags):
-                changed = True
-                tags.append(findTag(lsp.tags, 'generated'))
-                tags.append(Tag(scope='modified', tag=time.strftime("%Y-%m-%d %H:%M:%S %z") ) )
-
-                lsp.tags=tags
-                if module.check_mode:
-                    module.exit_json(changed=True, debug_out=str(lsp), id=lsp.id)
-                new_lsp = lsp_svc.update(lsp.id, lsp)
-            if changed:
-                module.exit_json(changed=True, object_name=module.params['display_name'], id=new_lsp.id, message="Logical Switch Port with name %s has changed tags!"%(module.params['display_name']))
-            module.exit_json(changed=False, object_name=module.params['display_name'], id=lsp.id, message="Logical Switch Port with name %s already exists!"%(module.params['display_name']))
-
-    elif module.params['state'] == "absent":
-        if lsp:
-            if module.check_mode:
-                module.exit_json(changed=True, debug_out=str(lsp), id=lsp.id)
-            lsp_svc.delete(lsp.id)
-            module.exit_json(changed=True, object_name=module.params['display_name'], message="Logical Switch Port with name %s deleted!"%(module.params['display_name']))
-        module.exit_json(changed=False, object_name=module.params['display_name'], message="Logical Switch Port with name %s does not exist!"%(module.params['display_name']))
+    stub_config = getStubConfig(module)
+    if module.params['items']:
+        reconcileBulk(module, stub_config)
+    runModule(module, 'logical_switch_port', stub_config)
 
 from ansible.module_utils.basic import *
 
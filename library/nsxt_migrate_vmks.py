@@ -20,7 +20,6 @@
 __author__ = 'yasensim'
 
 
-import requests, time
 try:
     from com.vmware.nsx.model_client import HostNode
     from com.vmware.nsx_client import TransportNodes
@@ -32,16 +31,17 @@ try:
     from com.vmware.nsx.model_client import LogicalSwitch
 
     from com.vmware.vapi.std.errors_client import NotFound
-    from vmware.vapi.lib import connect
-    from vmware.vapi.security.user_password import \
-        create_user_password_security_context
-    from vmware.vapi.stdlib.client.factories import StubConfigurationFactory
     from com.vmware.nsx.model_client import ApiError
     from com.vmware.vapi.std.errors_client import Error
     HAS_PYNSXT = True
 except ImportError:
     HAS_PYNSXT = False
 
+from ansible.module_utils.nsxt_connection import getStubConfig
+from ansible.module_utils.nsxt_lookup import getIdByName, getObjectByName, iterPages
+from ansible.module_utils.nsxt_realization import getTransportNodeWatcher
+from ansible.module_utils.nsxt_wait import WAIT_SUCCESS, getWaitTimeout
+
 
 def migrateVmks(module, stub_config):
     node = getTransportNodeByName(module, stub_config)
@@ -62,9 +62,16 @@ def migrateVmks(module, stub_config):
         for key, value in module.params["pnics"].items():
             pnic=Pnic(device_name=value, uplink_name=key)
             pnic_list.append(pnic)
+        # let the vmk migration realize before touching the pnics
+        watcher = getTransportNodeWatcher(module, stub_config)
+        watcher.watch(node.id, getWaitTimeout(300))
+        realized = watcher.wait(node.id)
+        if realized['status'] != WAIT_SUCCESS:
+            # pnics are only moved once the vmks are safely on the new switches
+            module.fail_json(changed=True, id=node.id, name=node.display_name, pnics="not updated",
+                             msg='VMK migration on Transport Node %s %s, last state: %s'%(node.display_name, realized['status'], realized['state']))
         migrated_node = getTransportNodeByName(module, stub_config)
         migrated_node.host_switches[0].pnics=pnic_list
-        time.sleep(10)
 
         try:
             rs = tn_svc.update(migrated_node.id, migrated_node)
@@ -77,43 +84,38 @@ def migrateVmks(module, stub_config):
 
 
 def listLogicalSwitches(module, stub_config):
-    ls_list = []
+    logicalswitches_svc = LogicalSwitches(stub_config)
     try:
-        logicalswitches_svc = LogicalSwitches(stub_config)
-        ls_list = logicalswitches_svc.list()
+        for ls in iterPages(logicalswitches_svc.list):
+            yield ls
     except Error as ex:
         api_error = ex.data.convert_to(ApiError)
-        module.fail_json(msg='API Error listing Logical Switchess: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-    return ls_list
+        module.fail_json(msg='API Error listing Logical Switches: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
 
 
 def getLogicalSwitchIdByName(module, ls_name, stub_config):
-    result = listLogicalSwitches(module, stub_config)
-    lsid = ""
-    for vs in result.results:
-        fn = vs.convert_to(LogicalSwitch)
-        if fn.display_name == ls_name:
-            lsid = fn.id
+    lsid = getIdByName(module, 'LogicalSwitch', ls_name,
+                       lambda: listLogicalSwitches(module, stub_config), LogicalSwitch,
+                       stub_config=stub_config) or ""
     if len(lsid) < 5:
         module.fail_json(msg='No Logical Switch with name %s found!'%(ls_name))
     return lsid
 
 def listTransportNodes(module, stub_config):
+    tn_svc = TransportNodes(stub_config)
     try:
-        fabricnodes_svc = TransportNodes(stub_config)
+        for tn in iterPages(tn_svc.list):
+            yield tn
     except Error as ex:
         api_error = ex.data.convert_to(ApiError)
-        module.fail_json(msg='API Error listing nodes: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-    return fabricnodes_svc.list()
+        module.fail_json(msg='API Error listing Transport Nodes: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
 
 
 def getTransportNodeByName(module, stub_config):
-    result = listTransportNodes(module, stub_config)
-    for vs in result.results:
-        fn = vs.convert_to(TransportNode)
-        if fn.display_name == module.params['display_name']:
-            return fn
-    return None
+    tn_svc = TransportNodes(stub_config)
+    return getObjectByName(module, 'TransportNode', module.params['display_name'],
+                           lambda: listTransportNodes(module, stub_config), tn_svc.get, TransportNode,
+                           stub_config=stub_config)
 
 
 def main():
@@ -132,15 +134,7 @@ def main():
 
     if not HAS_PYNSXT:
         module.fail_json(msg='pynsxt is required for this module')
-    session = requests.session()
-    session.verify = False
-    nsx_url = 'https://%s:%s' % (module.params['nsx_manager'], 443)
-    connector = connect.get_requests_connector(
-        session=session, msg_protocol='rest', url=nsx_url)
-    stub_config = StubConfigurationFactory.new_std_configuration(connector)
-    security_context = create_user_password_security_context(module.params["nsx_username"], module.params["nsx_passwd"])
-    connector.set_security_context(security_context)
-    requests.packages.urllib3.disable_warnings()
+    stub_config = getStubConfig(module)
 
     migrateVmks(module, stub_config)
 
@@ -19,203 +19,123 @@
 
 __author__ = 'yasensim'
 
-import os
-import requests, time
-
 try:
-    from com.vmware.nsx.model_client import Tag
     from com.vmware.nsx.model_client import LogicalRouter
     from com.vmware.nsx_client import LogicalRouters
 
     from com.vmware.nsx.logical_routers.routing_client import StaticRoutes
-    from com.vmware.nsx.model_client import StaticRouteNextHop
     from com.vmware.nsx.model_client import StaticRoute
 
     from com.vmware.vapi.std.errors_client import NotFound
-    from vmware.vapi.lib import connect
-    from vmware.vapi.security.user_password import \
-        create_user_password_security_context
-    from vmware.vapi.stdlib.client.factories import StubConfigurationFactory
     from com.vmware.nsx.model_client import ApiError
     from com.vmware.vapi.std.errors_client import Error
     HAS_PYNSXT = True
 except ImportError:
     HAS_PYNSXT = False
 
+from ansible.module_utils.nsxt_connection import getStubConfig
+from ansible.module_utils.nsxt_lookup import getIdByName, iterPages, mapByField
+from ansible.module_utils.nsxt_bulk import applyBatchResults, batchOperation, bulkArgumentSpec, exitBulk, getBulkItems, runBatch
+from ansible.module_utils.nsxt_reconcile import buildStaticRoute, runModule, updateStaticRoute
+
 def listLogicalRouters(module, stub_config):
-    lr_list = []
+    lr_svc = LogicalRouters(stub_config)
     try:
-        lr_svc = LogicalRouters(stub_config)
-        lr_list = lr_svc.list()
+        for lr in iterPages(lr_svc.list):
+            yield lr
     except Error as ex:
-        api_error = ex.date.convert_to(ApiError)
+        api_error = ex.data.convert_to(ApiError)
         module.fail_json(msg='API Error listing Logical Routers: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-    return lr_list
-
-def getLogicalRouterByName(module, stub_config):
-    result = listLogicalRouters(module, stub_config)
-    for vs in result.results:
-        lr = vs.convert_to(LogicalRouter)
-        if lr.display_name == module.params['router_name']:
-            return lr
-    return None
 
 def listStaticRoutes(module, stub_config, lrid):
-    lr_list = []
+    sr_svc = StaticRoutes(stub_config)
     try:
-        lr_svc = StaticRoutes(stub_config)
-        lr_list = lr_svc.list(logical_router_id=lrid)
+        for sr in iterPages(sr_svc.list, logical_router_id=lrid):
+            yield sr
     except Error as ex:
-        api_error = ex.date.convert_to(ApiError)
-        module.fail_json(msg='API Error listing Logical Routers: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-    return lr_list
-
-def getStaticRouteByNetwork(module, stub_config, lrid):
-    result = listStaticRoutes(module, stub_config, lrid)
-    for vs in result.results:
-        lr = vs.convert_to(StaticRoute)
-        if lr.network == module.params['network']:
-            return lr
-    return None
-
-def simplifyNextHopList(nextHopList):
-    ipList = []
-    for member in nextHopList:
-        ipList.append(member.ip_address)
-    return ipList
-
-def findTag(tags, key):
-    for tag in tags:
-        if tag.scope == key:
-            return tag
-    return None
-
-def compareTags(existing_tags, new_tags):
-    if existing_tags is None or new_tags is None:
-        return False
-
-    for tag1 in new_tags:
-        key = tag1.scope
-        if key == 'generated' or key == 'modified':
+        api_error = ex.data.convert_to(ApiError)
+        module.fail_json(msg='API Error listing Static Routes: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
+
+BULK_KEYS = ['network', 'description', 'next_hops', 'admin_distance', 'router_name', 'router_id', 'tags', 'state']
+
+def reconcileBulk(module, stub_config):
+    items = getBulkItems(module, BULK_KEYS, required=['network', 'next_hops'], unique=['router_id', 'router_name', 'network'])
+    router_ids = {}
+    for params in items:
+        if not params['router_id'] and params['router_name'] and params['router_name'] not in router_ids:
+            router_ids[params['router_name']] = getIdByName(module, 'LogicalRouter', params['router_name'],
+                                                            lambda: listLogicalRouters(module, stub_config), LogicalRouter,
+                                                            stub_config=stub_config)
+    # one static route listing per router, however many routes it gets
+    networks = {}
+    for params in items:
+        lrid = params['router_id'] or router_ids.get(params['router_name'])
+        params['lrid'] = lrid
+        if lrid:
+            networks.setdefault(lrid, []).append(params['network'])
+    existing = {}
+    for lrid, wanted in networks.items():
+        existing[lrid] = mapByField(listStaticRoutes(module, stub_config, lrid), 'network', wanted, StaticRoute)
+
+    results = []
+    operations = []
+    for params in items:
+        network = params['network']
+        lrid = params['lrid']
+        result = dict(object_name=network, changed=False, router_id=lrid)
+        results.append(result)
+        if not lrid:
+            result.update(failed=True, msg="Logical Router %s not found for Static Route %s" % (params['router_name'], network))
             continue
+        sroute = existing[lrid].get(network)
+        uri = '/v1/logical-routers/%s/routing/static-routes' % (lrid)
+        if params['state'] == 'absent':
+            if sroute is None:
+                result['message'] = "Static Route for %s does not exist!" % (network)
+            else:
+                result['id'] = sroute.id
+                operations.append(batchOperation('DELETE', '%s/%s' % (uri, sroute.id), result=result))
+            continue
+        if sroute is None:
+            operations.append(batchOperation('POST', uri, buildStaticRoute(params), result=result))
+            continue
+        result['id'] = sroute.id
+        if updateStaticRoute(sroute, params):
+            operations.append(batchOperation('PUT', '%s/%s' % (uri, sroute.id), sroute, result=result))
+        else:
+            result['message'] = "Static Route for %s already exists!" % (network)
 
-        tag2 =  findTag(existing_tags, key)
-        if tag2 is None:
-            return False
-
-        if tag1.tag != tag2.tag:
-            return False
-    return True
+    runBatch(module, stub_config, operations)
+    applyBatchResults(module, operations, label='Static Route for')
+    exitBulk(module, results)
 
 def main():
+    argument_spec = dict(
+        network=dict(required=False, type='str'),
+        description=dict(required=False, type='str', default=None),
+        next_hops=dict(required=False, type='list', default=None),
+        admin_distance=dict(required=False, type='int', default=1),
+        router_name=dict(required=False, type='str', default=None),
+        router_id=dict(required=False, type='str', default=None),
+        tags=dict(required=False, type='dict', default=None),
+        state=dict(required=False, type='str', default="present", choices=['present', 'absent']),
+        nsx_manager=dict(required=True, type='str'),
+        nsx_username=dict(required=True, type='str'),
+        nsx_passwd=dict(required=True, type='str', no_log=True)
+    )
+    argument_spec.update(bulkArgumentSpec())
     module = AnsibleModule(
-        argument_spec=dict(
-            network=dict(required=True, type='str'),
-            description=dict(required=False, type='str', default=None),
-            next_hops=dict(required=True, type='list', default=None),
-            admin_distance=dict(required=False, type='int', default=1),
-            router_name=dict(required=False, type='str', default=None),
-            router_id=dict(required=False, type='str', default=None),
-            tags=dict(required=False, type='dict', default=None),
-            state=dict(required=False, type='str', default="present", choices=['present', 'absent']),
-            nsx_manager=dict(required=True, type='str'),
-            nsx_username=dict(required=True, type='str'),
-            nsx_passwd=dict(required=True, type='str', no_log=True)
-        ),
+        argument_spec=argument_spec,
+        required_one_of=[['network', 'items'], ['next_hops', 'items']],
         supports_check_mode=True
     )
 
     if not HAS_PYNSXT:
         module.fail_json(msg='pynsxt is required for this module')
-    session = requests.session()
-    session.verify = False
-    nsx_url = 'https://%s:%s' % (module.params['nsx_manager'], 443)
-    connector = connect.get_requests_connector(
-        session=session, msg_protocol='rest', url=nsx_url)
-    stub_config = StubConfigurationFactory.new_std_configuration(connector)
-    security_context = create_user_password_security_context(module.params["nsx_username"], module.params["nsx_passwd"])
-    connector.set_security_context(security_context)
-    requests.packages.urllib3.disable_warnings()
-    #tags=None
-    tags=[ ]
-    tags.append(Tag(scope='created-by', tag=os.getenv("NSX_T_INSTALLER", "nsx-t-gen") ) )
-
-    if module.params['tags'] is not None:
-        #tags = []
-        for key, value in module.params['tags'].items():
-            tag=Tag(scope=key, tag=value)
-            tags.append(tag)
-    lrid = ""
-    if module.params['router_id']:
-        lrid = module.params['router_id']
-    elif module.params['router_name']:
-        lr_svc = LogicalRouters(stub_config)
-        lr = getLogicalRouterByName(module, stub_config)
-        lrid = lr.id
-    sroute = getStaticRouteByNetwork(module, stub_config, lrid)
-    next_hop_list = []
-    for next_hop in module.params['next_hops']:
-        staticRouteNextHop = StaticRouteNextHop(
-            administrative_distance=module.params['admin_distance'],
-            ip_address = next_hop,
-            logical_router_port_id=None
-        )
-        next_hop_list.append(staticRouteNextHop)
-    sr_svc = StaticRoutes(stub_config)
-    if module.params['state'] == 'present':
-        if sroute is None:
-            tags.append(Tag(scope='generated', tag=time.strftime("%Y-%m-%d %H:%M:%S %z") ) )
-
-            new_static_route = StaticRoute(
-                display_name=None,
-                network=module.params['network'],
-                next_hops=next_hop_list,
-                description=module.params['description'],
-                tags=tags
-            )
-
-            if module.check_mode:
-                module.exit_json(changed=True, debug_out=str(new_static_route), id="1111")
-            try:
-                new_static_route = sr_svc.create(lrid, new_static_route)
-                module.exit_json(changed=True, object_name=module.params['network'], id=new_static_route.id,
-                                 message="Static Route with for %s with id %s was created on router with id %s!"%(module.params['network'], new_static_route.id, lrid))
-            except Error as ex:
-                module.fail_json(msg='API Error creating Static Route: %s'%(str(ex)))
-        elif sroute:
-            changed = False
-            #if tags != sroute.tags:
-            if not compareTags(sroute.tags, tags):
-                tags.append(findTag(sroute.tags, 'generated'))
-                tags.append(Tag(scope='modified', tag=time.strftime("%Y-%m-%d %H:%M:%S %z") ) )
-
-                sroute.tags=tags
-                changed = True
-            nhopList1 = simplifyNextHopList(sroute.next_hops)
-            nhopList2 = simplifyNextHopList(next_hop_list)
-            if nhopList1 != nhopList2:
-                sroute.next_hops=next_hop_list
-                changed = True
-            if changed:
-                if module.check_mode:
-                    module.exit_json(changed=True, debug_out=str(sroute), id=lrid)
-                new_static_route = sr_svc.update(lrid, sroute.id, sroute)
-                module.exit_json(changed=True, object_name=module.params['network'], id=new_static_route.id,
-                                 message="Static Route for %s has changed tags!"%(module.params['network']))
-            module.exit_json(changed=False, object_name=module.params['network'], id=sroute.id, router_id=lrid,
-                             message="Static Route for %s already exists!"%(module.params['network']))
-
-    elif module.params['state'] == "absent":
-        if sroute:
-            if module.check_mode:
-                module.exit_json(changed=True, debug_out=str(sroute), id=lrid)
-            try:
-                sr_svc.delete(lrid, sroute.id)
-                module.exit_json(changed=True, object_name=module.params['network'], message="Static Route for %s deleted!"%(module.params['network']))
-            except Error as ex:
-                api_error = ex.date.convert_to(ApiError)
-                module.fail_json(msg='API Error deleting Logical Routers: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-        module.exit_json(changed=False, object_name=module.params['network'], message="Static Route for %s does not exist!"%(module.params['network']))
+    stub_config = getStubConfig(module)
+    if module.params['items']:
+        reconcileBulk(module, stub_config)
+    runModule(module, 'static_route', stub_config)
 
 from ansible.module_utils.basic import *
 
@@ -20,41 +20,37 @@
 __author__ = 'yasensim'
 
 
-import requests, time
+import time
 try:
     from com.vmware.nsx.model_client import LogicalRouter
     from com.vmware.nsx_client import LogicalRouters
     from com.vmware.nsx.model_client import HaVipConfig
     from com.vmware.nsx.model_client import VIPSubnet
     from com.vmware.vapi.std.errors_client import NotFound
-    from vmware.vapi.lib import connect
-    from vmware.vapi.security.user_password import \
-        create_user_password_security_context
-    from vmware.vapi.stdlib.client.factories import StubConfigurationFactory
     from com.vmware.nsx.model_client import ApiError
     from com.vmware.vapi.std.errors_client import Error
     HAS_PYNSXT = True
 except ImportError:
     HAS_PYNSXT = False
 
+from ansible.module_utils.nsxt_connection import getStubConfig
+from ansible.module_utils.nsxt_lookup import getObjectByName, iterPages
+
 
 def listLogicalRouters(module, stub_config):
-    lr_list = []
+    lr_svc = LogicalRouters(stub_config)
     try:
-        lr_svc = LogicalRouters(stub_config)
-        lr_list = lr_svc.list()
+        for lr in iterPages(lr_svc.list):
+            yield lr
     except Error as ex:
-        api_error = ex.date.convert_to(ApiError)
+        api_error = ex.data.convert_to(ApiError)
         module.fail_json(msg='API Error listing Logical Routers: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-    return lr_list
 
 def getLogicalRouterByName(module, stub_config):
-    result = listLogicalRouters(module, stub_config)
-    for vs in result.results:
-        lr = vs.convert_to(LogicalRouter)
-        if lr.display_name == module.params['t0_router']:
-            return lr
-    return None
+    lr_svc = LogicalRouters(stub_config)
+    return getObjectByName(module, 'LogicalRouter', module.params['t0_router'],
+                           lambda: listLogicalRouters(module, stub_config), lr_svc.get, LogicalRouter,
+                           stub_config=stub_config)
 
 
 
@@ -75,15 +71,7 @@ def main():
 
     if not HAS_PYNSXT:
         module.fail_json(msg='pynsxt is required for this module')
-    session = requests.session()
-    session.verify = False
-    nsx_url = 'https://%s:%s' % (module.params['nsx_manager'], 443)
-    connector = connect.get_requests_connector(
-        session=session, msg_protocol='rest', url=nsx_url)
-    stub_config = StubConfigurationFactory.new_std_configuration(connector)
-    security_context = create_user_password_security_context(module.params["nsx_username"], module.params["nsx_passwd"])
-    connector.set_security_context(security_context)
-    requests.packages.urllib3.disable_warnings()
+    stub_config = getStubConfig(module)
 
     lr_svc = LogicalRouters(stub_config)
     lr = getLogicalRouterByName(module, stub_config)
@@ -19,74 +19,13 @@
 
 __author__ = 'yasensim'
 
-import os
-import requests, time
-
 try:
-    from com.vmware.nsx.model_client import Tag
-    from com.vmware.nsx.model_client import LogicalRouter
-    from com.vmware.nsx_client import LogicalRouters
-    from com.vmware.nsx_client import LogicalRouterPorts
-    from com.vmware.nsx.model_client import LogicalRouterPort
-    from com.vmware.vapi.std.errors_client import NotFound
-    from vmware.vapi.lib import connect
-    from vmware.vapi.security.user_password import \
-        create_user_password_security_context
-    from vmware.vapi.stdlib.client.factories import StubConfigurationFactory
-    from com.vmware.nsx.model_client import ApiError
     from com.vmware.vapi.std.errors_client import Error
     HAS_PYNSXT = True
 except ImportError:
     HAS_PYNSXT = False
 
-def listLogicalRouters(module, stub_config):
-    lr_list = []
-    try:
-        lr_svc = LogicalRouters(stub_config)
-        lr_list = lr_svc.list()
-    except Error as ex:
-        api_error = ex.date.convert_to(ApiError)
-        module.fail_json(msg='API Error listing Logical Routers: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-    return lr_list
-
-def getLogicalRouterByName(module, stub_config):
-    result = listLogicalRouters(module, stub_config)
-    for vs in result.results:
-        lr = vs.convert_to(LogicalRouter)
-        if lr.display_name == module.params['display_name']:
-            return lr
-    return None
-
-def deleteAllPortsOnRouter(lr, module, stub_config):
-    lrp_svc = LogicalRouterPorts(stub_config)
-    lrpList = lrp_svc.list(logical_router_id=lr.id)
-    if lrpList.results:
-        for vs in lrpList.results:
-            lrp = vs.convert_to(LogicalRouterPort)
-            lrp_svc.delete(lrp.id, force=True)
-
-def findTag(tags, key):
-    for tag in tags:
-        if tag.scope == key:
-            return tag
-    return None
-
-def compareTags(existing_tags, new_tags):
-    if existing_tags is None or new_tags is None:
-        return False
-
-    for tag1 in new_tags:
-        key = tag1.scope
-        if key == 'generated' or key == 'modified':
-            continue
-
-        tag2 =  findTag(existing_tags, key)
-        if tag2 is None:
-            return False
-
-        if tag1.tag != tag2.tag:
-            return False
-    return True
+from ansible.module_utils.nsxt_reconcile import runModule
 
 def main():
     module = AnsibleModule(
@@ -98,6 +37,7 @@ def main():
             high_availability_mode=dict(required=False, type='str', default='ACTIVE_STANDBY', choices=['ACTIVE_STANDBY', 'ACTIVE_ACTIVE']),
             tags=dict(required=False, type='dict', default=None),
             state=dict(required=False, type='str', default="present", choices=['present', 'absent']),
+            max_concurrent=dict(required=False, type='int', default=None),
             nsx_manager=dict(required=True, type='str'),
             nsx_username=dict(required=True, type='str'),
             nsx_passwd=dict(required=True, type='str', no_log=True)
@@ -107,71 +47,7 @@ def main():
 
     if not HAS_PYNSXT:
         module.fail_json(msg='pynsxt is required for this module')
-    session = requests.session()
-    session.verify = False
-    nsx_url = 'https://%s:%s' % (module.params['nsx_manager'], 443)
-    connector = connect.get_requests_connector(
-        session=session, msg_protocol='rest', url=nsx_url)
-    stub_config = StubConfigurationFactory.new_std_configuration(connector)
-    security_context = create_user_password_security_context(module.params["nsx_username"], module.params["nsx_passwd"])
-    connector.set_security_context(security_context)
-    requests.packages.urllib3.disable_warnings()
-    #tags=None
-    tags=[ ]
-    tags.append(Tag(scope='created-by', tag=os.getenv("NSX_T_INSTALLER", "nsx-t-gen") ) )
-
-    if module.params['tags'] is not None:
-        #tags = []
-        for key, value in module.params['tags'].items():
-            tag=Tag(scope=key, tag=value)
-            tags.append(tag)
-    lr_svc = LogicalRouters(stub_config)
-    lr = getLogicalRouterByName(module, stub_config)
-    if module.params['state'] == 'present':
-        if lr is None:
-            tags.append(Tag(scope='generated', tag=time.strftime("%Y-%m-%d %H:%M:%S %z") ) )
-            new_lr = LogicalRouter(
-                display_name=module.params['display_name'],
-                description=module.params['description'],
-                failover_mode=module.params['failover_mode'],
-                edge_cluster_id=module.params['edge_cluster_id'],
-                router_type='TIER0',
-                high_availability_mode=module.params['high_availability_mode'],
-                tags=tags
-            )
-            if module.check_mode:
-                module.exit_json(changed=True, debug_out=str(new_lr), id="1111")
-            try:
-                new_lr = lr_svc.create(new_lr)
-                module.exit_json(changed=True, object_name=module.params['display_name'], id=new_lr.id, message="Logical Router with name %s created!"%(module.params['display_name']))
-            except Error as ex:
-                module.fail_json(msg='API Error listing Logical Routers: %s'%(str(ex)))
-        elif lr:
-            #if tags != lr.tags:
-            if not compareTags(lr.tags, tags):
-                tags.append(findTag(lr.tags, 'generated'))
-                tags.append(Tag(scope='modified', tag=time.strftime("%Y-%m-%d %H:%M:%S %z") ) )
-                lr.tags=tags
-                if module.check_mode:
-                    module.exit_json(changed=True, debug_out=str(lr), id=lr.id)
-                new_lr = lr_svc.update(lr.id, lr)
-                module.exit_json(changed=True, object_name=module.params['display_name'], id=new_lr.id, message="Logical Router with name %s has changed tags!"%(module.params['display_name']))
-            module.exit_json(changed=False, object_name=module.params['display_name'], id=lr.id, message="Logical Router with name %s already exists!"%(module.params['display_name']))
-
-    elif module.params['state'] == "absent":
-
-        if lr:
-            if module.check_mode:
-                module.exit_json(changed=True, debug_out=str(lr), id=lr.id)
-            try:
-                deleteAllPortsOnRouter(lr, module, stub_config)
-                lr_svc.delete(lr.id)
-            except Error as ex:
-                api_error = ex.date.convert_to(ApiError)
-                module.fail_json(msg='API Error deleting Logical Routers: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-
-            module.exit_json(changed=True, object_name=module.params['display_name'], message="Logical Router with name %s deleted!"%(module.params['display_name']))
-        module.exit_json(changed=False, object_name=module.params['display_name'], message="Logical Router with name %s does not exist!"%(module.params['display_name']))
+    runModule(module, 't0_router')
 
 from ansible.module_utils.basic import *
 
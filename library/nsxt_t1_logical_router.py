@@ -19,333 +19,267 @@
 
 __author__ = 'yasensim'
 
-import os
-import requests, time
-
 try:
-    from com.vmware.nsx.model_client import Tag
     from com.vmware.nsx.model_client import LogicalRouter
     from com.vmware.nsx_client import LogicalRouters
     from com.vmware.nsx.model_client import LogicalRouterLinkPortOnTIER1
-    from com.vmware.nsx.model_client import LogicalRouterLinkPortOnTIER0
-    from com.vmware.nsx.model_client import ResourceReference
     from com.vmware.nsx_client import LogicalRouterPorts
     from com.vmware.nsx.model_client import LogicalRouterPort
-    from com.vmware.nsx.model_client import AdvertisementConfig
-    from com.vmware.nsx.logical_routers.routing_client import Advertisement
 
     from com.vmware.vapi.std.errors_client import NotFound
-    from vmware.vapi.lib import connect
-    from vmware.vapi.security.user_password import \
-        create_user_password_security_context
-    from vmware.vapi.stdlib.client.factories import StubConfigurationFactory
     from com.vmware.nsx.model_client import ApiError
     from com.vmware.vapi.std.errors_client import Error
     HAS_PYNSXT = True
 except ImportError:
     HAS_PYNSXT = False
 
+from ansible.module_utils.nsxt_connection import getStubConfig
+from ansible.module_utils.nsxt_lookup import addToNameIndex, getRawField, invalidateNameIndex, iterPages, mapByField
+from ansible.module_utils.nsxt_ports import deleteRouterPorts
+from ansible.module_utils.nsxt_bulk import apiErrorMessage, applyBatchResults, batchOperation, bulkArgumentSpec, exitBulk, getBulkItems, runBatch
+from ansible.module_utils.nsxt_reconcile import buildLogicalRouter, buildT0LinkPort, buildT1LinkPort, runModule, updateLogicalRouter
+from ansible.module_utils.nsxt_topology import runGraph
+
 def listLogicalRouters(module, stub_config):
-    lr_list = []
+    lr_svc = LogicalRouters(stub_config)
     try:
-        lr_svc = LogicalRouters(stub_config)
-        lr_list = lr_svc.list()
+        for lr in iterPages(lr_svc.list):
+            yield lr
     except Error as ex:
-        api_error = ex.date.convert_to(ApiError)
+        api_error = ex.data.convert_to(ApiError)
         module.fail_json(msg='API Error listing Logical Routers: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-    return lr_list
-
-def getLogicalRouterByName(module, stub_config):
-    result = listLogicalRouters(module, stub_config)
-    for vs in result.results:
-        lr = vs.convert_to(LogicalRouter)
-        if lr.display_name == module.params['display_name']:
-            return lr
-    return None
 
-
-
-def connectT0(t1, module, stub_config):
-    t0port = None
+def listLinkPorts(module, stub_config, resource_type):
     lrp_svc = LogicalRouterPorts(stub_config)
-
-    t0_lrp=LogicalRouterLinkPortOnTIER0(
-        display_name="t0-downlink-to_%s"%(t1.display_name),
-        logical_router_id=module.params['connected_t0_id'],
-        description=t1.id
-    )
-    try:
-        port = lrp_svc.create(t0_lrp)
-        t0port = port.convert_to(LogicalRouterLinkPortOnTIER0)
-    except Error as ex:
-        api_error = ex.date.convert_to(ApiError)
-        module.fail_json(msg='API Error creating T0 port: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-
-    t1_lrp=LogicalRouterLinkPortOnTIER1(
-        display_name="%s-uplinklink-to_t0"%(t1.display_name),
-        description=module.params['connected_t0_id'],
-        logical_router_id=t1.id,
-        linked_logical_router_port_id=ResourceReference(target_id=t0port.id)
-    )
     try:
-        t1port = lrp_svc.create(t1_lrp)
+        for lrp in iterPages(lrp_svc.list, resource_type=resource_type):
+            yield lrp
     except Error as ex:
-        api_error = ex.date.convert_to(ApiError)
-        module.fail_json(msg='API Error creating T1 port: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-
-    return True
+        api_error = ex.data.convert_to(ApiError)
+        module.fail_json(msg='API Error listing Logical Router Ports: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
+
+def getT0Links(module, stub_config):
+    # T1 router id -> (T1 link port id, T0 link port id, T0 router id), built
+    # from one listing of each link port type instead of a lookup per router
+    t0_routers = {}
+    for vs in listLinkPorts(module, stub_config, 'LogicalRouterLinkPortOnTIER0'):
+        t0_routers[getRawField(vs, 'id')] = getRawField(vs, 'logical_router_id')
+    links = {}
+    for vs in listLinkPorts(module, stub_config, 'LogicalRouterLinkPortOnTIER1'):
+        lrp = vs.convert_to(LogicalRouterLinkPortOnTIER1)
+        t0port_id = lrp.linked_logical_router_port_id.target_id if lrp.linked_logical_router_port_id else None
+        links[lrp.logical_router_id] = (lrp.id, t0port_id, t0_routers.get(t0port_id))
+    return links
+
+def applyPortResults(module, operations, message):
+    for operation in operations:
+        result = operation['result']
+        if operation['error']:
+            result.update(failed=True, msg="Logical Router with name %s: %s" % (result['object_name'], operation['error']))
+        else:
+            result['changed'] = True
+            if 'message' not in result:
+                result['message'] = message % (result['object_name'])
 
-def deleteAllPortsOnRouter(lr, module, stub_config):
-    lrp_svc = LogicalRouterPorts(stub_config)
-    lrpList = lrp_svc.list(logical_router_id=lr.id)
-    if lrpList.results:
-        for vs in lrpList.results:
-            lrp = vs.convert_to(LogicalRouterPort)
-            lrp_svc.delete(lrp.id, force=True)
+BULK_KEYS = ['display_name', 'description', 'failover_mode', 'edge_cluster_id', 'pinned_to_edges',
+             'connected_t0_id', 'high_availability_mode', 'tags', 'state']
 
-def compareLrpT0T1(lr, module, stub_config):
-    changed = False
-    t0id = None
-    lrp_svc = LogicalRouterPorts(stub_config)
-    lrpList = lrp_svc.list(logical_router_id=lr.id, resource_type='LogicalRouterLinkPortOnTIER1')
-    if lrpList.results:
-        lrp = lrpList.results[0].convert_to(LogicalRouterLinkPortOnTIER1)
-        t0port_id = lrp.linked_logical_router_port_id.target_id
-        t1port_id = lrp.id
-        t0tmp = lrp_svc.get(t0port_id)
-        t0lrp = t0tmp.convert_to(LogicalRouterLinkPortOnTIER0)
-        t0id = t0lrp.logical_router_id
-    if t0id:
-        if t0id != module.params['connected_t0_id']:
-            changed = True
-            if t1port_id:
-                if module.check_mode:
-                    module.exit_json(changed=True, debug_out="Connection to T0 will be deleted")
-                lrp_svc.delete(t1port_id, force=True)
-                lrp_svc.delete(t0port_id, force=True)
-            if module.params['connected_t0_id']:
-                if module.check_mode:
-                    module.exit_json(changed=True, debug_out="T1 will be connected to T0")
-                changed = connectT0(lr, module, stub_config)
-    elif not t0id:
-        if t0id != module.params['connected_t0_id']:
+def reconcileBulk(module, stub_config):
+    if module.params['advertise']:
+        module.fail_json(msg='advertise is not supported together with items, configure route advertisement per router')
+    items = getBulkItems(module, BULK_KEYS, required=['display_name'], unique=['display_name'])
+    existing = mapByField(listLogicalRouters(module, stub_config), 'display_name',
+                          [params['display_name'] for params in items], LogicalRouter)
+    links = getT0Links(module, stub_config)
+    results = []
+    plans = []
+    for params in items:
+        name = params['display_name']
+        result = dict(object_name=name, changed=False)
+        results.append(result)
+        lr = existing.get(name)
+        # router: (method, body) to send, unlink: the current link ports to
+        # remove, link: whether a new pair of link ports is needed afterwards
+        plan = dict(params=params, result=result, router=None, unlink=None, link=False)
+        if params['state'] == 'absent':
+            if lr is None:
+                result['message'] = "Logical Router with name %s does not exist!" % (name)
+                continue
+            result['id'] = lr.id
+            plan['router'] = ('DELETE', lr)
+            plans.append(plan)
+            continue
+        if lr is None:
+            new_lr = buildLogicalRouter(params, 'TIER1', params['edge_cluster_id'])
+            plan.update(router=('POST', new_lr), link=bool(params['connected_t0_id']))
+            plans.append(plan)
+            continue
+        result['id'] = lr.id
+        changed = updateLogicalRouter(lr, params, 'TIER1', params['edge_cluster_id'])
+        if changed:
+            plan['router'] = ('PUT', lr)
+        link = links.get(lr.id)
+        if (link[2] if link else None) != params['connected_t0_id']:
             changed = True
-            if module.params['connected_t0_id']:
-                if module.check_mode:
-                    module.exit_json(changed=True, debug_out="T1 will be connected to T0")
-                changed = connectT0(lr, module, stub_config)
-
-    return changed
-
-def findTag(tags, key):
-    for tag in tags:
-        if tag.scope == key:
-            return tag
-    return None
+            plan.update(unlink=link, link=bool(params['connected_t0_id']))
+        if changed:
+            plans.append(plan)
+        else:
+            result['message'] = "Logical Router with name %s already exists!" % (name)
 
-def compareTags(existing_tags, new_tags):
-    if existing_tags is None or new_tags is None:
-        return False
+    if module.params['max_concurrent'] and not module.params['atomic'] and not module.check_mode:
+        reconcileConcurrent(module, stub_config, plans)
+    else:
+        reconcileBatched(module, stub_config, plans)
+    exitBulk(module, results)
 
-    for tag1 in new_tags:
-        key = tag1.scope
-        if key == 'generated' or key == 'modified':
+def reconcileBatched(module, stub_config, plans):
+    lrp_svc = LogicalRouterPorts(stub_config)
+    port_deletes = []
+    router_ops = []
+    to_link = []
+    for plan in plans:
+        result = plan['result']
+        if plan['router'] and plan['router'][0] == 'DELETE':
+            for vs in iterPages(lrp_svc.list, logical_router_id=result['id']):
+                port_deletes.append(batchOperation('DELETE', '/v1/logical-router-ports/%s?force=true' % (getRawField(vs, 'id')), result=result))
+            router_ops.append(batchOperation('DELETE', '/v1/logical-routers/%s' % (result['id']), result=result))
             continue
-
-        tag2 =  findTag(existing_tags, key)
-        if tag2 is None:
-            return False
-
-        if tag1.tag != tag2.tag:
-            return False
-    return True
+        if plan['router']:
+            method, lr = plan['router']
+            uri = '/v1/logical-routers' if method == 'POST' else '/v1/logical-routers/%s' % (lr.id)
+            router_ops.append(batchOperation(method, uri, lr, result=result))
+        if plan['unlink']:
+            port_deletes.append(batchOperation('DELETE', '/v1/logical-router-ports/%s?force=true' % (plan['unlink'][0]), result=result))
+            if plan['unlink'][1]:
+                port_deletes.append(batchOperation('DELETE', '/v1/logical-router-ports/%s?force=true' % (plan['unlink'][1]), result=result))
+        if plan['link']:
+            to_link.append((plan['params'], result))
+
+    # ports go first so routers can be deleted and relinked afterwards
+    runBatch(module, stub_config, port_deletes)
+    applyPortResults(module, port_deletes, "Logical Router uplink on T1 with name %s has been modified!")
+    router_ops = [op for op in router_ops if not (op['method'] == 'DELETE' and op['result'].get('failed'))]
+    runBatch(module, stub_config, router_ops)
+    applyBatchResults(module, router_ops, 'LogicalRouter', 'Logical Router with name')
+
+    t0_ops = []
+    for params, result in to_link:
+        if result.get('failed') or not (result.get('id') or module.check_mode):
+            continue
+        t0_lrp = buildT0LinkPort(params['display_name'], result.get('id'), params['connected_t0_id'])
+        t0_ops.append(batchOperation('POST', '/v1/logical-router-ports', t0_lrp, result=result, params=params))
+    runBatch(module, stub_config, t0_ops)
+    t1_ops = []
+    for t0_op in t0_ops:
+        if t0_op['error']:
+            t0_op['result'].update(failed=True, msg="Logical Router with name %s: T0 port not created: %s" % (t0_op['result']['object_name'], t0_op['error']))
+            continue
+        params = t0_op['params']
+        t1_lrp = buildT1LinkPort(params['display_name'], t0_op['result'].get('id'), params['connected_t0_id'],
+                                 getRawField(t0_op['response'], 'id') if t0_op['response'] else None)
+        t1_ops.append(batchOperation('POST', '/v1/logical-router-ports', t1_lrp, result=t0_op['result']))
+    runBatch(module, stub_config, t1_ops)
+    applyPortResults(module, t1_ops, "Logical Router uplink on T1 with name %s has been modified!")
+    for operation in t1_ops:
+        if not operation['error']:
+            operation['result']['connected_t0_id'] = operation['body'].description
+
+def reconcileConcurrent(module, stub_config, plans):
+    # every router is taken through its own steps (router, old link ports,
+    # new T0 and T1 link ports) on one of max_concurrent workers, so a router
+    # is linked as soon as it exists instead of after the whole phase
+    lr_svc = LogicalRouters(stub_config)
+    lrp_svc = LogicalRouterPorts(stub_config)
+    by_name = dict((plan['result']['object_name'], plan) for plan in plans)
+
+    def reconcile(name, resolved):
+        plan = by_name[name]
+        params = plan['params']
+        result = plan['result']
+        outcome = dict(changed=False)
+        try:
+            if plan['router'] and plan['router'][0] == 'DELETE':
+                # this worker already holds one of the max_concurrent slots
+                ports = deleteRouterPorts(stub_config, result['id'], max_workers=1)
+                if ports['remaining']:
+                    outcome.update(failed=True, msg="Logical Router with name %s: %s" % (name, ports['msg']))
+                    return outcome
+                lr_svc.delete(result['id'])
+                outcome.update(changed=True, message="Logical Router with name %s deleted!" % (name))
+                return outcome
+            if plan['router']:
+                method, lr = plan['router']
+                if method == 'POST':
+                    result['id'] = lr_svc.create(lr).id
+                    addToNameIndex(module, 'LogicalRouter', name, result['id'])
+                    outcome['message'] = "Logical Router with name %s created!" % (name)
+                else:
+                    lr_svc.update(lr.id, lr)
+                    outcome['message'] = "Logical Router with name %s modified!" % (name)
+                outcome['changed'] = True
+            if plan['unlink']:
+                lrp_svc.delete(plan['unlink'][0], force=True)
+                if plan['unlink'][1]:
+                    lrp_svc.delete(plan['unlink'][1], force=True)
+                outcome['changed'] = True
+            if plan['link']:
+                t0port_id = getRawField(lrp_svc.create(buildT0LinkPort(name, result['id'], params['connected_t0_id'])), 'id')
+                try:
+                    lrp_svc.create(buildT1LinkPort(name, result['id'], params['connected_t0_id'], t0port_id))
+                except Error:
+                    # do not leave a T0 port behind that no T1 port links to
+                    try:
+                        lrp_svc.delete(t0port_id, force=True)
+                    except Error:
+                        pass
+                    raise
+                outcome.update(changed=True, connected_t0_id=params['connected_t0_id'])
+        except Error as ex:
+            outcome.update(failed=True, msg="Logical Router with name %s: API Error: %s" % (name, apiErrorMessage(ex)))
+            return outcome
+        outcome.setdefault('message', "Logical Router uplink on T1 with name %s has been modified!" % (name))
+        return outcome
+
+    order = [plan['result']['object_name'] for plan in plans]
+    outcomes = runGraph(order, dict((name, {}) for name in order), reconcile, module.params['max_concurrent'])
+    for name in order:
+        outcome = outcomes[name]
+        outcome.pop('elapsed', None)
+        by_name[name]['result'].update(outcome)
+    if any(plan['router'] and plan['router'][0] == 'DELETE' for plan in plans):
+        invalidateNameIndex(module, 'LogicalRouter')
 
 def main():
+    argument_spec = dict(
+        display_name=dict(required=False, type='str'),
+        description=dict(required=False, type='str', default=None),
+        failover_mode=dict(required=False, type='str', default=None, choices=['NON_PREEMPTIVE', 'PREEMPTIVE']),
+        edge_cluster_id=dict(required=False, type='str', default=None),
+        pinned_to_edges=dict(required=False, type='str', default=None),
+        connected_t0_id=dict(required=False, type='str', default=None),
+        high_availability_mode=dict(required=False, type='str', default='ACTIVE_STANDBY', choices=['ACTIVE_STANDBY', 'ACTIVE_ACTIVE']),
+        advertise=dict(required=False, type='dict', default=None),
+        tags=dict(required=False, type='dict', default=None),
+        max_concurrent=dict(required=False, type='int', default=None),
+        state=dict(required=False, type='str', default="present", choices=['present', 'absent']),
+        nsx_manager=dict(required=True, type='str'),
+        nsx_username=dict(required=True, type='str'),
+        nsx_passwd=dict(required=True, type='str', no_log=True)
+    )
+    argument_spec.update(bulkArgumentSpec())
     module = AnsibleModule(
-        argument_spec=dict(
-            display_name=dict(required=True, type='str'),
-            description=dict(required=False, type='str', default=None),
-            failover_mode=dict(required=False, type='str', default=None, choices=['NON_PREEMPTIVE', 'PREEMPTIVE']),
-            edge_cluster_id=dict(required=False, type='str', default=None),
-            pinned_to_edges=dict(required=False, type='str', default=None),
-            connected_t0_id=dict(required=False, type='str', default=None),
-            high_availability_mode=dict(required=False, type='str', default='ACTIVE_STANDBY', choices=['ACTIVE_STANDBY', 'ACTIVE_ACTIVE']),
-            advertise=dict(required=False, type='dict', default=None),
-            tags=dict(required=False, type='dict', default=None),
-            state=dict(required=False, type='str', default="present", choices=['present', 'absent']),
-            nsx_manager=dict(required=True, type='str'),
-            nsx_username=dict(required=True, type='str'),
-            nsx_passwd=dict(required=True, type='str', no_log=True)
-        ),
+        argument_spec=argument_spec,
+        required_one_of=[['display_name', 'items']],
         supports_check_mode=True
     )
 
     if not HAS_PYNSXT:
         module.fail_json(msg='pynsxt is required for this module')
-    session = requests.session()
-    session.verify = False
-    nsx_url = 'https://%s:%s' % (module.params['nsx_manager'], 443)
-    connector = connect.get_requests_connector(
-        session=session, msg_protocol='rest', url=nsx_url)
-    stub_config = StubConfigurationFactory.new_std_configuration(connector)
-    security_context = create_user_password_security_context(module.params["nsx_username"], module.params["nsx_passwd"])
-    connector.set_security_context(security_context)
-    requests.packages.urllib3.disable_warnings()
-    desired_adv_config = AdvertisementConfig()
-    if module.params['advertise']:
-        if 'enabled' in module.params['advertise']:
-            desired_adv_config.enabled = module.params['advertise']['enabled']
-        else:
-            desired_adv_config.enabled = True
-        if 'advertise_lb_snat_ip' in module.params['advertise'] and module.params['advertise']['advertise_lb_snat_ip']:
-            desired_adv_config.advertise_lb_snat_ip = module.params['advertise']['advertise_lb_snat_ip']
-        if 'advertise_lb_vip' in module.params['advertise'] and module.params['advertise']['advertise_lb_vip']:
-            desired_adv_config.advertise_lb_vip = module.params['advertise']['advertise_lb_vip']
-        if 'advertise_nat_routes' in module.params['advertise'] and module.params['advertise']['advertise_nat_routes']:
-            desired_adv_config.advertise_nat_routes = module.params['advertise']['advertise_nat_routes']
-        if 'advertise_nsx_connected_routes' in module.params['advertise'] and module.params['advertise']['advertise_nsx_connected_routes']:
-            desired_adv_config.advertise_nsx_connected_routes = module.params['advertise']['advertise_nsx_connected_routes']
-        if 'advertise_static_routes' in module.params['advertise'] and module.params['advertise']['advertise_static_routes']:
-            desired_adv_config.advertise_static_routes = module.params['advertise']['advertise_static_routes']
-
-    #tags=None
-    tags=[ ]
-    tags.append(Tag(scope='created-by', tag=os.getenv("NSX_T_INSTALLER", "nsx-t-gen") ) )
-
-    if module.params['tags'] is not None:
-        #tags = []
-        for key, value in module.params['tags'].items():
-            tag=Tag(scope=key, tag=value)
-            tags.append(tag)
-    lr_svc = LogicalRouters(stub_config)
-    lr = getLogicalRouterByName(module, stub_config)
-    if module.params['state'] == 'present':
-        if lr is None:
-            tags.append(Tag(scope='generated', tag=time.strftime("%Y-%m-%d %H:%M:%S %z") ) )
-            edge_cluster_id=module.params['edge_cluster_id']
-            pinned_to_edges=module.params['pinned_to_edges']
-
-            if not ( pinned_to_edges == 'True' or pinned_to_edges == 'true'):
-                edge_cluster_id = None
-
-            new_lr = LogicalRouter(
-                display_name=module.params['display_name'],
-                description=module.params['description'],
-                failover_mode=module.params['failover_mode'],
-                edge_cluster_id=edge_cluster_id,
-                router_type='TIER1',
-                high_availability_mode=module.params['high_availability_mode'],
-                tags=tags
-            )
-            if module.check_mode:
-                module.exit_json(changed=True, debug_out=str(new_lr), id="1111")
-            try:
-                new_lr = lr_svc.create(new_lr)
-                mylr = getLogicalRouterByName(module, stub_config)
-                if module.params['connected_t0_id']:
-                    connectT0(mylr, module, stub_config)
-                if module.params['advertise']:
-                    adv_svc = Advertisement(stub_config)
-                    adv_config = adv_svc.get(mylr.id)
-                    adv_config.enabled = desired_adv_config.enabled
-                    adv_config.advertise_lb_snat_ip = desired_adv_config.advertise_lb_snat_ip
-                    adv_config.advertise_lb_vip = desired_adv_config.advertise_lb_vip
-                    adv_config.advertise_nat_routes = desired_adv_config.advertise_nat_routes
-                    adv_config.advertise_nsx_connected_routes = desired_adv_config.advertise_nsx_connected_routes
-                    adv_config.advertise_static_routes = desired_adv_config.advertise_static_routes
-                    adv_svc.update(mylr.id, adv_config)
-                module.exit_json(changed=True, object_name=module.params['display_name'], id=mylr.id, message="Logical Router with name %s created!"%(module.params['display_name']))
-            except Error as ex:
-                module.fail_json(msg='API Error listing Logical Routers: %s'%(str(ex)))
-        elif lr:
-            adv_svc = Advertisement(stub_config)
-            adv_config = adv_svc.get(lr.id)
-            changed = False
-            #if tags != lr.tags:
-            if not compareTags(lr.tags, tags):
-                changed = True
-                tags.append(findTag(lr.tags, 'generated'))
-                tags.append(Tag(scope='modified', tag=time.strftime("%Y-%m-%d %H:%M:%S %z") ) )
-                lr.tags=tags
-            if module.params['edge_cluster_id'] != lr.edge_cluster_id:
-                lr.edge_cluster_id=module.params['edge_cluster_id']
-                changed = True
-            if changed:
-                if module.check_mode:
-                    module.exit_json(changed=True, debug_out=str(lr), id=lr.id)
-                new_lr = lr_svc.update(lr.id, lr)
-                module.exit_json(changed=True, object_name=module.params['display_name'], id=new_lr.id, message="Logical Router with name %s has been modified!"%(module.params['display_name']))
-            if compareLrpT0T1(lr, module, stub_config):
-                module.exit_json(changed=True, object_name=module.params['display_name'], id=lr.id, message="Logical Router uplink on T1 with name %s has been modified!"%(module.params['display_name']))
-            if module.params['advertise']:
-                changed = False
-                if ('enabled' not in module.params['advertise']):
-                    changed = False
-                elif module.params['advertise']['enabled'] != adv_config.enabled:
-                    adv_config.enabled = desired_adv_config.enabled
-                    changed = True
-                if ('advertise_lb_snat_ip' not in module.params['advertise']):
-                    if adv_config.advertise_lb_snat_ip:
-                        adv_config.advertise_lb_snat_ip = None
-                        changed = True
-                elif module.params['advertise']['advertise_lb_snat_ip'] != adv_config.advertise_lb_snat_ip:
-                    adv_config.advertise_lb_snat_ip = desired_adv_config.advertise_lb_snat_ip
-                    changed = True
-
-                if ('advertise_lb_vip' not in module.params['advertise']):
-                    if adv_config.advertise_lb_vip:
-                        adv_config.advertise_lb_vip = None
-                        changed = True
-                elif module.params['advertise']['advertise_lb_vip'] != adv_config.advertise_lb_vip:
-                    adv_config.advertise_lb_vip = desired_adv_config.advertise_lb_vip
-                    changed = True
-
-                if ('advertise_nat_routes' not in module.params['advertise']):
-                    if adv_config.advertise_nat_routes:
-                        adv_config.advertise_nat_routes = None
-                        changed = True
-                elif module.params['advertise']['advertise_nat_routes'] != adv_config.advertise_nat_routes:
-                    adv_config.advertise_nat_routes = desired_adv_config.advertise_nat_routes
-                    changed = True
-
-                if ('advertise_nsx_connected_routes' not in module.params['advertise']):
-                    if adv_config.advertise_nsx_connected_routes:
-                        adv_config.advertise_nsx_connected_routes = None
-                        changed = True
-                elif module.params['advertise']['advertise_nsx_connected_routes'] != adv_config.advertise_nsx_connected_routes:
-                    adv_config.advertise_nsx_connected_routes = desired_adv_config.advertise_nsx_connected_routes
-                    changed = True
-
-                if ('advertise_static_routes' not in module.params['advertise']):
-                    if adv_config.advertise_static_routes:
-                        adv_config.advertise_static_routes = None
-                        changed = True
-                elif module.params['advertise']['advertise_static_routes'] != adv_config.advertise_static_routes:
-                    adv_config.advertise_static_routes = desired_adv_config.advertise_static_routes
-                    changed = True
-
-                if changed:
-                    if module.check_mode:
-                        module.exit_json(changed=True, debug_out=str(adv_config), id=lr.id)
-                    adv_svc.update(lr.id, adv_config)
-                    module.exit_json(changed=True, object_name=module.params['display_name'], id=lr.id, message="Logical Router advertisement config on T1 with name %s has been modified!"%(module.params['display_name']))
-
-            module.exit_json(changed=False, object_name=module.params['display_name'], id=lr.id, message="Logical Router with name %s already exists!"%(module.params['display_name']))
-
-    elif module.params['state'] == "absent":
-        if lr:
-            if module.check_mode:
-                module.exit_json(changed=True, debug_out=str(lr), id=lr.id)
-            try:
-                deleteAllPortsOnRouter(lr, module, stub_config)
-                lr_svc.delete(lr.id)
-            except Error as ex:
-                api_error = ex.date.convert_to(ApiError)
-                module.fail_json(msg='API Error deleting Logical Routers: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-
-
-            module.exit_json(changed=True, object_name=module.params['display_name'], message="Logical Router with name %s deleted!"%(module.params['display_name']))
-        module.exit_json(changed=False, object_name=module.params['display_name'], message="Logical Router with name %s does not exist!"%(module.params['display_name']))
+    stub_config = getStubConfig(module)
+    if module.params['items']:
+        reconcileBulk(module, stub_config)
+    runModule(module, 't1_router', stub_config)
 
 from ansible.module_utils.basic import *
 
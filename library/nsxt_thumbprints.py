@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+from ansible.module_utils.nsxt_thumbprint import collectThumbprints
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            hosts=dict(required=True, type='list'),
+            port=dict(required=False, type='int', default=443),
+            timeout=dict(required=False, type='int', default=5),
+            refresh=dict(required=False, type='bool', default=False),
+            max_concurrent=dict(required=False, type='int', default=50)
+        ),
+        supports_check_mode=True
+    )
+
+    collected = collectThumbprints(module.params['hosts'], port=module.params['port'],
+                                   timeout=module.params['timeout'], refresh=module.params['refresh'],
+                                   max_workers=module.params['max_concurrent'])
+    thumbprints = {}
+    results = []
+    for endpoint in sorted(collected, key=module.params['hosts'].index):
+        entry = collected[endpoint]
+        result = dict(endpoint=endpoint, elapsed=entry['elapsed'])
+        if entry.get('failed'):
+            result.update(failed=True, msg=entry['msg'])
+        else:
+            thumbprints[endpoint] = entry['thumbprint']
+            result.update(thumbprint=entry['thumbprint'], serial=entry['serial'],
+                          cached=entry['cached'], rotated=entry['rotated'])
+        results.append(result)
+    failed = [result for result in results if result.get('failed')]
+    if failed:
+        module.fail_json(msg="%d of %d certificates could not be read" % (len(failed), len(results)),
+                         thumbprints=thumbprints, results=results)
+    module.exit_json(changed=False, thumbprints=thumbprints, results=results,
+                     rotated=[result['endpoint'] for result in results if result['rotated']])
+
+from ansible.module_utils.basic import *
+
+if __name__ == "__main__":
+    main()
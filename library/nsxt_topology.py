@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import time
+
+try:
+    from com.vmware.vapi.std.errors_client import Error
+    HAS_PYNSXT = True
+except ImportError:
+    HAS_PYNSXT = False
+
+try:
+    import yaml
+    HAS_YAML = True
+except ImportError:
+    HAS_YAML = False
+
+from ansible.module_utils.nsxt_connection import getPoolSize, getStubConfig
+from ansible.module_utils.nsxt_bulk import apiErrorMessage
+from ansible.module_utils.nsxt_reconcile import RECONCILERS, REFERENCES, checkObjectParams, objectName
+from ansible.module_utils.nsxt_topology import buildGraph, runGraph
+
+# topology sections and the object type each one holds, in the order results are reported
+SECTIONS = [
+    ('transport_zones', 'transport_zone'),
+    ('ip_pools', 'ip_pool'),
+    ('uplink_profiles', 'uplink_profile'),
+    ('transport_nodes', 'transport_node'),
+    ('edge_clusters', 'edge_cluster'),
+    ('t0_routers', 't0_router'),
+    ('t1_routers', 't1_router'),
+    ('logical_switches', 'logical_switch'),
+    ('logical_switch_ports', 'logical_switch_port'),
+    ('t0_uplinks', 't0_uplink'),
+    ('static_routes', 'static_route')
+]
+
+def loadTopology(module):
+    topology = module.params['topology']
+    if module.params['src']:
+        if not HAS_YAML:
+            module.fail_json(msg='PyYAML is required to read src')
+        try:
+            with open(module.params['src']) as src:
+                topology = yaml.safe_load(src)
+        except (IOError, OSError, yaml.YAMLError) as ex:
+            module.fail_json(msg='Error reading topology from %s: %s' % (module.params['src'], str(ex)))
+    if not isinstance(topology, dict):
+        module.fail_json(msg='topology must be a dictionary of sections')
+    unknown = [section for section in topology if section not in dict(SECTIONS)]
+    if unknown:
+        module.fail_json(msg="unsupported topology sections %s, expected %s" % (', '.join(sorted(unknown)), ', '.join(section for section, kind in SECTIONS)))
+    return topology
+
+def nodeName(kind, params):
+    # static routes and uplinks are only unique per router
+    if kind == 'static_route':
+        return '%s/%s' % (params['router_name'] or params['router_id'], params['network'])
+    if kind == 't0_uplink':
+        return '%s/%s' % (params['t0_router'], params['display_name'])
+    return objectName(kind, params)
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            topology=dict(required=False, type='dict', default=None),
+            src=dict(required=False, type='path', default=None),
+            max_workers=dict(required=False, type='int', default=None),
+            nsx_manager=dict(required=True, type='str'),
+            nsx_username=dict(required=True, type='str'),
+            nsx_passwd=dict(required=True, type='str', no_log=True)
+        ),
+        required_one_of=[['topology', 'src']],
+        mutually_exclusive=[['topology', 'src']],
+        supports_check_mode=True
+    )
+
+    if not HAS_PYNSXT:
+        module.fail_json(msg='pynsxt is required for this module')
+    topology = loadTopology(module)
+
+    nodes = []
+    for section, kind in SECTIONS:
+        for index, obj in enumerate(topology.get(section) or []):
+            if not isinstance(obj, dict):
+                module.fail_json(msg="%s[%d] must be a dictionary" % (section, index))
+            params, error = checkObjectParams(kind, obj)
+            if error:
+                module.fail_json(msg="%s[%d]: %s" % (section, index, error))
+            # the graph only orders creation, removals need the reverse order
+            if params['state'] != 'present':
+                module.fail_json(msg="%s[%d]: only state present is supported in a topology" % (section, index))
+            nodes.append((kind, nodeName(kind, params), params))
+    try:
+        deps = buildGraph(nodes, REFERENCES)
+    except ValueError as ex:
+        module.fail_json(msg='Invalid topology: %s' % (str(ex)))
+
+    stub_config = getStubConfig(module)
+    params_by_key = dict(((kind, name), params) for kind, name, params in nodes)
+
+    def reconcile(key, resolved):
+        kind = key[0]
+        params = dict(params_by_key[key])
+        for id_param, obj_id in resolved.items():
+            if obj_id:
+                params[id_param] = obj_id
+        try:
+            return RECONCILERS[kind](module, stub_config, params)
+        except Error as ex:
+            return dict(failed=True, changed=False, msg='API Error: %s' % (apiErrorMessage(ex)))
+        except ValueError as ex:
+            return dict(failed=True, changed=False, msg=str(ex))
+
+    start = time.time()
+    order = [(kind, name) for kind, name, params in nodes]
+    max_workers = module.params['max_workers'] or getPoolSize()
+    outcome = runGraph(order, deps, reconcile, max_workers)
+
+    results = []
+    for kind, name, params in nodes:
+        result = dict(type=kind, object_name=objectName(kind, params), changed=False)
+        result.update(outcome[(kind, name)])
+        result['depends_on'] = sorted('%s %s' % dep for dep in deps[(kind, name)])
+        results.append(result)
+    changed = any(result['changed'] for result in results)
+    failed = [result for result in results if result.get('failed')]
+    elapsed = round(time.time() - start, 3)
+    if failed:
+        module.fail_json(msg="%d of %d objects failed or were skipped" % (len(failed), len(results)),
+                         changed=changed, results=results, elapsed=elapsed)
+    module.exit_json(changed=changed, results=results, elapsed=elapsed,
+                     message="%d objects reconciled, %d changed" % (len(results), len([r for r in results if r['changed']])))
+
+from ansible.module_utils.basic import *
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+try:
+    from com.vmware.nsx_client import TransportNodes
+    from com.vmware.nsx.model_client import TransportNode
+
+    from com.vmware.vapi.std.errors_client import NotFound
+    from com.vmware.nsx.model_client import ApiError
+    from com.vmware.vapi.std.errors_client import Error
+    HAS_PYNSXT = True
+except ImportError:
+    HAS_PYNSXT = False
+
+from ansible.module_utils.nsxt_connection import getPoolSize, getStubConfig
+from ansible.module_utils.nsxt_bulk import apiErrorMessage, getBulkItems
+from ansible.module_utils.nsxt_lookup import addToNameIndex, invalidateNameIndex, iterPages, mapByField
+from ansible.module_utils.nsxt_realization import getTransportNodeWatcher
+from ansible.module_utils.nsxt_reconcile import isTransportNodeGone, mapResolver, planTransportNode
+from ansible.module_utils.nsxt_resolver import ReferenceResolver
+from ansible.module_utils.nsxt_topology import runGraph
+from ansible.module_utils.nsxt_wait import WAIT_SUCCESS, getWaitTimeout, stateIn, waitFor
+
+ITEM_KEYS = ['display_name', 'node_id', 'node_name', 'host_switch', 'transport_zone_endpoints', 'state']
+
+def listTransportNodes(module, stub_config):
+    tn_svc = TransportNodes(stub_config)
+    try:
+        for tn in iterPages(tn_svc.list):
+            yield tn
+    except Error as ex:
+        api_error = ex.data.convert_to(ApiError)
+        module.fail_json(msg='API Error listing Transport Nodes: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            items=dict(required=True, type='list'),
+            host_switch=dict(required=False, type='list', default=None),
+            transport_zone_endpoints=dict(required=False, type='list', default=None),
+            max_concurrent=dict(required=False, type='int', default=None),
+            wait=dict(required=False, type='bool', default=True),
+            state=dict(required=False, type='str', default="present", choices=['present', 'absent']),
+            nsx_manager=dict(required=True, type='str'),
+            nsx_username=dict(required=True, type='str'),
+            nsx_passwd=dict(required=True, type='str', no_log=True)
+        ),
+        supports_check_mode=True
+    )
+
+    if not HAS_PYNSXT:
+        module.fail_json(msg='pynsxt is required for this module')
+    items = getBulkItems(module, ITEM_KEYS, required=['display_name'], unique=['display_name'])
+    for index, params in enumerate(items):
+        if params['state'] == 'present' and not params['host_switch']:
+            module.fail_json(msg="items[%d]: host_switch is required for %s" % (index, params['display_name']))
+    stub_config = getStubConfig(module)
+    tn_svc = TransportNodes(stub_config)
+
+    # everything shared between the nodes is listed once up front
+    resolve = mapResolver(ReferenceResolver(stub_config))
+    existing = mapByField(listTransportNodes(module, stub_config), 'display_name',
+                          [params['display_name'] for params in items], TransportNode)
+    results = []
+    plans = {}
+    for params in items:
+        name = params['display_name']
+        node = existing.get(name)
+        result = dict(object_name=name, changed=False, id=node.id if node else None)
+        results.append(result)
+        try:
+            action, body, patch = planTransportNode(params, node, resolve)
+        except Error as ex:
+            result.update(action='error', failed=True, msg='API Error: %s' % (apiErrorMessage(ex)))
+            continue
+        except ValueError as ex:
+            result.update(action='error', failed=True, msg=str(ex))
+            continue
+        result['action'] = action
+        if patch:
+            result['patch'] = patch
+        if action in ('create', 'update', 'delete'):
+            result['changed'] = True
+            plans[name] = (action, body, result)
+
+    if module.check_mode or not plans:
+        module.exit_json(changed=any(result['changed'] for result in results), results=results)
+
+    watcher = getTransportNodeWatcher(module, stub_config)
+    timeout = getWaitTimeout(1800)
+
+    def submit(key, resolved):
+        action, body, result = plans[key]
+        try:
+            if action == 'create':
+                node = tn_svc.create(body)
+                addToNameIndex(module, 'TransportNode', node.display_name, node.id)
+                result['id'] = node.id
+            elif action == 'update':
+                tn_svc.update(body.id, body)
+            else:
+                tn_svc.delete(result['id'])
+                invalidateNameIndex(module, 'TransportNode')
+        except Error as ex:
+            return dict(failed=True, msg='API Error: %s' % (apiErrorMessage(ex)))
+        if not module.params['wait']:
+            return dict()
+        if action == 'delete':
+            status, gone = waitFor(lambda: isTransportNodeGone(tn_svc, result['id']), stateIn(True), timeout=timeout)
+            return dict(status='deleted' if status == WAIT_SUCCESS else 'deleting')
+        watcher.watch(result['id'], timeout)
+        return dict()
+
+    # creates and updates go out max_concurrent at a time, realization of
+    # all of them is then tracked together by the watcher
+    order = [key for key in (params['display_name'] for params in items) if key in plans]
+    max_concurrent = module.params['max_concurrent'] or getPoolSize()
+    submitted = runGraph(order, dict((key, {}) for key in order), submit, max_concurrent)
+    for key in order:
+        result = plans[key][2]
+        outcome = submitted[key]
+        result['submit_time'] = outcome['elapsed']
+        if outcome.get('failed'):
+            result.update(changed=False, failed=True, msg=outcome['msg'])
+        elif result['action'] == 'delete':
+            if 'status' in outcome:
+                result['status'] = outcome['status']
+        elif module.params['wait']:
+            realized = watcher.wait(result['id'])
+            result.update(status=realized['status'], state=realized['state'], realization_time=realized['elapsed'])
+            if realized['status'] != WAIT_SUCCESS:
+                result.update(failed=True, msg="Transport Node %s is %s after %ss" % (key, realized['state'], realized['elapsed']))
+
+    summary = dict((action, len([r for r in results if r.get('action') == action]))
+                   for action in ('create', 'update', 'unchanged', 'delete', 'absent', 'error'))
+    summary['failed'] = len([result for result in results if result.get('failed')])
+    changed = any(result['changed'] for result in results)
+    if summary['failed']:
+        module.fail_json(msg="%d of %d transport nodes failed" % (summary['failed'], len(results)),
+                         changed=changed, results=results, summary=summary)
+    module.exit_json(changed=changed, results=results, summary=summary)
+
+from ansible.module_utils.basic import *
+
+if __name__ == "__main__":
+    main()
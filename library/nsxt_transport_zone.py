@@ -19,65 +19,13 @@
 
 __author__ = 'yasensim'
 
-import os
-import requests, time
-
 try:
-    from com.vmware.nsx.model_client import TransportZone
-    from com.vmware.nsx.model_client import Tag
-    from com.vmware.nsx_client import TransportZones
-
-    from com.vmware.vapi.std.errors_client import NotFound
-    from vmware.vapi.lib import connect
-    from vmware.vapi.security.user_password import \
-        create_user_password_security_context
-    from vmware.vapi.stdlib.client.factories import StubConfigurationFactory
-    from com.vmware.nsx.model_client import ApiError
     from com.vmware.vapi.std.errors_client import Error
     HAS_PYNSXT = True
 except ImportError:
     HAS_PYNSXT = False
 
-def listTransportZones(module, stub_config):
-    tz_list = []
-    try:
-        tz_svc = TransportZones(stub_config)
-        tz_list = tz_svc.list()
-    except Error as ex:
-        api_error = ex.date.convert_to(ApiError)
-        module.fail_json(msg='API Error listing Transport Zones: %s, related error details: %s'%( str(api_error.error_message), str(api_error.related_errors) ))
-    return tz_list
-
-def getTransportZoneByName(module, stub_config):
-    result = listTransportZones(module, stub_config)
-    for vs in result.results:
-        tz = vs.convert_to(TransportZone)
-        if tz.display_name == module.params['display_name']:
-            return tz
-    return None
-
-def findTag(tags, key):
-    for tag in tags:
-        if tag.scope == key:
-            return tag
-    return None
-
-def compareTags(existing_tags, new_tags):
-    if existing_tags is None or new_tags is None:
-        return False
-
-    for tag1 in new_tags:
-        key = tag1.scope
-        if key == 'generated' or key == 'modified':
-            continue
-
-        tag2 =  findTag(existing_tags, key)
-        if tag2 is None:
-            return False
-
-        if tag1.tag != tag2.tag:
-            return False
-    return True
+from ansible.module_utils.nsxt_reconcile import runModule
 
 def main():
     module = AnsibleModule(
@@ -99,61 +47,7 @@ def main():
 
     if not HAS_PYNSXT:
         module.fail_json(msg='pynsxt is required for this module')
-    session = requests.session()
-    session.verify = False
-    nsx_url = 'https://%s:%s' % (module.params['nsx_manager'], 443)
-    connector = connect.get_requests_connector(
-        session=session, msg_protocol='rest', url=nsx_url)
-    stub_config = StubConfigurationFactory.new_std_configuration(connector)
-    security_context = create_user_password_security_context(module.params["nsx_username"], module.params["nsx_passwd"])
-    connector.set_security_context(security_context)
-    requests.packages.urllib3.disable_warnings()
-    #tags=None
-    tags=[ ]
-    tags.append(Tag(scope='created-by', tag=os.getenv("NSX_T_INSTALLER", "nsx-t-gen") ) )
-
-    if module.params['tags'] is not None:
-        #tags = []
-        for key, value in module.params['tags'].items():
-            tag=Tag(scope=key, tag=value)
-            tags.append(tag)
-    transportzones_svc = TransportZones(stub_config)
-    tz = getTransportZoneByName(module, stub_config)
-    if module.params['state'] == 'present':
-        if tz is None:
-            tags.append(Tag(scope='generated', tag=time.strftime("%Y-%m-%d %H:%M:%S %z") ) )
-            new_tz = TransportZone(
-                transport_type=module.params['transport_type'],
-                display_name=module.params['display_name'],
-                description=module.params['description'],
-                host_switch_name=module.params['host_switch_name'],
-                host_switch_mode=module.params['host_switch_mode'],
-                nested_nsx=module.params['nested_nsx'],
-                tags=tags
-            )
-            if module.check_mode:
-                module.exit_json(changed=True, debug_out=str(new_tz), id="1111")
-            new_tz = transportzones_svc.create(new_tz)
-            module.exit_json(changed=True, object_name=module.params['display_name'], id=new_tz.id, message="Transport Zone with name %s created!"%(module.params['display_name']))
-        elif tz:
-            #if tags != tz.tags:
-            if not compareTags(tz.tags, tags):
-                tags.append(findTag(tz.tags, 'generated'))
-                tags.append(Tag(scope='modified', tag=time.strftime("%Y-%m-%d %H:%M:%S %z") ) )
-                tz.tags=tags
-                if module.check_mode:
-                    module.exit_json(changed=True, debug_out=str(tz), id=tz.id)
-                new_tz = transportzones_svc.update(tz.id, tz)
-                module.exit_json(changed=True, object_name=module.params['display_name'], id=new_tz.id, message="Transport Zone with name %s has changed tags!"%(module.params['display_name']))
-            module.exit_json(changed=False, object_name=module.params['display_name'], id=tz.id, message="Transport Zone with name %s already exists!"%(module.params['display_name']))
-
-    elif module.params['state'] == "absent":
-        if tz:
-            if module.check_mode:
-                module.exit_json(changed=True, debug_out=str(tz), id=tz.id)
-            transportzones_svc.delete(tz.id)
-            module.exit_json(changed=True, object_name=module.params['display_name'], message="Transport Zone with name %s deleted!"%(module.params['display_name']))
-        module.exit_json(changed=False, object_name=module.params['display_name'], message="Transport Zone with name %s doe not exist!"%(module.params['display_name']))
+    runModule(module, 'transport_zone')
 
 from ansible.module_utils.basic import *
 
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+
+from ansible.module_utils.nsxt_bulk import getBulkItems
+from ansible.module_utils.nsxt_ready import ROLE_PORTS, waitReady
+
+ITEM_KEYS = ['name', 'address', 'role', 'ports', 'username', 'password']
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            items=dict(required=True, type='list'),
+            role=dict(required=False, type='str', choices=['manager', 'controller', 'edge']),
+            ports=dict(required=False, type='list'),
+            username=dict(required=False, type='str', default='admin'),
+            password=dict(required=False, type='str', no_log=True),
+            nsx_manager=dict(required=False, type='str'),
+            nsx_username=dict(required=False, type='str', default='admin'),
+            nsx_passwd=dict(required=False, type='str', no_log=True),
+            control_cluster=dict(required=False, type='bool', default=False),
+            timeout=dict(required=False, type='int'),
+            probe_timeout=dict(required=False, type='int', default=5)
+        ),
+        required_together=[['nsx_manager', 'nsx_passwd']],
+        supports_check_mode=True
+    )
+
+    appliances = getBulkItems(module, ITEM_KEYS, required=['address', 'role'], secrets=['password'])
+    for index, appliance in enumerate(appliances):
+        if appliance['role'] not in ROLE_PORTS:
+            module.fail_json(msg="items[%d]: role must be one of %s" % (index, ', '.join(sorted(ROLE_PORTS))))
+        if appliance['role'] == 'manager' and not appliance['password']:
+            module.fail_json(msg="items[%d]: a password is required to probe manager %s" % (index, appliance['address']))
+        appliance['name'] = appliance['name'] or appliance['address']
+        appliance['ports'] = [int(port) for port in (appliance['ports'] or ROLE_PORTS[appliance['role']])]
+    names = [appliance['name'] for appliance in appliances]
+    duplicates = sorted(set(name for name in names if names.count(name) > 1))
+    if duplicates:
+        module.fail_json(msg="duplicate appliances: %s" % (', '.join(duplicates)))
+    if module.params['control_cluster'] and not module.params['nsx_manager']:
+        module.fail_json(msg="nsx_manager is required to wait for the control cluster")
+    manager = None
+    if module.params['nsx_manager']:
+        manager = dict(address=module.params['nsx_manager'], username=module.params['nsx_username'],
+                       password=module.params['nsx_passwd'])
+    if module.check_mode:
+        module.exit_json(changed=False, results=[dict(name=appliance['name'], address=appliance['address'],
+                                                      role=appliance['role']) for appliance in appliances])
+
+    ready = waitReady(appliances, manager=manager, timeout=module.params['timeout'],
+                      probe_timeout=module.params['probe_timeout'], control_cluster=module.params['control_cluster'])
+    results = []
+    for appliance in appliances:
+        result = ready[appliance['name']]
+        result.setdefault('name', appliance['name'])
+        results.append(result)
+    failed = [result for result in results if result.get('failed')]
+    if failed:
+        module.fail_json(msg="%d of %d appliances are not ready: %s" % (len(failed), len(results),
+                                                                         '; '.join(result['msg'] for result in failed)),
+                         results=results)
+    module.exit_json(changed=False, results=results)
+
+from ansible.module_utils.basic import *
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+try:
+    from com.vmware.nsx_client import Batch
+    from com.vmware.nsx.model_client import ApiError
+    from com.vmware.nsx.model_client import BatchRequest
+    from com.vmware.nsx.model_client import BatchRequestItem
+    from com.vmware.vapi.std.errors_client import Error
+    HAS_BATCH = True
+except ImportError:
+    HAS_BATCH = False
+
+from ansible.module_utils.nsxt_lookup import addToNameIndex, getRawField, invalidateNameIndex
+
+BATCH_VERBS = dict(POST='created', PUT='modified', DELETE='deleted')
+
+
+def bulkArgumentSpec():
+    return dict(
+        items=dict(required=False, type='list', default=None),
+        batch_size=dict(required=False, type='int', default=50),
+        atomic=dict(required=False, type='bool', default=False),
+        continue_on_error=dict(required=False, type='bool', default=True)
+    )
+
+
+def getBulkItems(module, keys, required=(), unique=(), secrets=()):
+    # Every item inherits the top level module parameters and overrides them
+    # with its own keys, so shared settings such as tags are given once.
+    # Item values of the secrets keys are masked like no_log parameters,
+    # before any validation can report the items back.
+    for item in module.params['items']:
+        if isinstance(item, dict):
+            module.no_log_values.update(str(item[key]) for key in secrets if item.get(key))
+    items = []
+    for index, item in enumerate(module.params['items']):
+        if not isinstance(item, dict):
+            module.fail_json(msg="items[%d] must be a dictionary" % (index))
+        unknown = [key for key in item if key not in keys]
+        if unknown:
+            module.fail_json(msg="items[%d]: unsupported parameters %s" % (index, ', '.join(sorted(unknown))))
+        params = dict((key, module.params.get(key)) for key in keys)
+        params.update(item)
+        for key in required:
+            if params.get(key) is None:
+                module.fail_json(msg="items[%d]: missing required parameter %s" % (index, key))
+        items.append(params)
+    if unique:
+        seen = set()
+        for index, params in enumerate(items):
+            identity = tuple(params.get(key) for key in unique)
+            if identity in seen:
+                module.fail_json(msg="items[%d]: duplicate item for %s" % (index, ', '.join(str(value) for value in identity)))
+            seen.add(identity)
+    return items
+
+
+def batchOperation(method, uri, body=None, **kwargs):
+    operation = dict(method=method, uri=uri, body=body, code=None, response=None, error=None)
+    operation.update(kwargs)
+    return operation
+
+
+def apiErrorMessage(ex):
+    try:
+        api_error = ex.data.convert_to(ApiError)
+        return '%s, related error details: %s' % (str(api_error.error_message), str(api_error.related_errors))
+    except Exception:
+        return str(ex)
+
+
+def responseErrorMessage(code, body):
+    message = getRawField(body, 'error_message') if body is not None else None
+    return 'HTTP %s: %s' % (code, message if message else 'request failed')
+
+
+def runBatch(module, stub_config, operations):
+    # Send the operations as NSX batch requests, batch_size at a time, and
+    # record the status code and response body on each operation in place.
+    # atomic sends everything in one request so the manager can roll it back
+    # as a whole, and fails if that is more than batch_size; otherwise a failed chunk stops the rest unless
+    # continue_on_error is set.
+    if not operations:
+        return operations
+    if module.params['atomic'] and len(operations) > module.params['batch_size']:
+        module.fail_json(msg="atomic sends %d operations in one batch request, which exceeds batch_size %d"
+                             % (len(operations), module.params['batch_size']))
+    if module.check_mode:
+        return operations
+    if not HAS_BATCH:
+        module.fail_json(msg='this NSX SDK does not provide the batch API required for bulk mode')
+    atomic = module.params['atomic']
+    continue_on_error = module.params['continue_on_error'] and not atomic
+    batch_size = max(1, module.params['batch_size'])
+    batch_svc = Batch(stub_config)
+    stopped = False
+    for start in range(0, len(operations), batch_size):
+        chunk = operations[start:start + batch_size]
+        if stopped:
+            for operation in chunk:
+                operation['error'] = 'skipped after an earlier batch failed'
+            continue
+        request = BatchRequest(
+            continue_on_error=continue_on_error,
+            requests=[BatchRequestItem(method=op['method'], uri=op['uri'], body=op['body']) for op in chunk]
+        )
+        try:
+            response = batch_svc.create(request, atomic=atomic)
+        except Error as ex:
+            message = 'API Error sending batch: %s' % (apiErrorMessage(ex))
+            for operation in chunk:
+                operation['error'] = message
+            stopped = not continue_on_error
+            continue
+        results = response.results or []
+        for index, operation in enumerate(chunk):
+            if index >= len(results):
+                operation['error'] = 'not processed, an earlier request in the batch failed'
+                continue
+            operation['code'] = results[index].code
+            operation['response'] = results[index].body
+            if operation['code'] >= 300:
+                operation['error'] = responseErrorMessage(operation['code'], operation['response'])
+        if response.rolled_back:
+            for operation in chunk:
+                if operation['error'] is None:
+                    operation['error'] = 'rolled back, another request in the batch failed'
+        if response.has_errors and not continue_on_error:
+            stopped = True
+    return operations
+
+
+def applyBatchResults(module, operations, resource_type=None, label='Object'):
+    # Copy the outcome of every operation onto the result of its input item
+    # and keep the name index in line with what the batch created or deleted.
+    deleted = False
+    for operation in operations:
+        result = operation['result']
+        verb = BATCH_VERBS[operation['method']]
+        if module.check_mode:
+            result.update(changed=True, message="%s %s will be %s" % (label, result['object_name'], verb))
+            continue
+        if operation['error']:
+            result.update(failed=True, msg="%s %s not %s: %s" % (label, result['object_name'], verb, operation['error']))
+            continue
+        result['changed'] = True
+        if operation['method'] == 'POST':
+            result['id'] = getRawField(operation['response'], 'id')
+            if resource_type:
+                addToNameIndex(module, resource_type, result['object_name'], result['id'])
+        elif operation['method'] == 'DELETE':
+            deleted = True
+        result['message'] = "%s %s %s!" % (label, result['object_name'], verb)
+    if deleted and resource_type:
+        invalidateNameIndex(module, resource_type)
+    return operations
+
+
+def exitBulk(module, results):
+    changed = any(result['changed'] for result in results)
+    failed = [result for result in results if result.get('failed')]
+    if failed:
+        module.fail_json(msg="%d of %d items failed" % (len(failed), len(results)), changed=changed, results=results)
+    module.exit_json(changed=changed, results=results,
+                     message="%d items processed, %d changed" % (len(results), len([r for r in results if r['changed']])))
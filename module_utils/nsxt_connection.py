@@ -0,0 +1,239 @@
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import errno
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from vmware.vapi.lib import connect
+    from vmware.vapi.security.user_password import \
+        create_user_password_security_context
+    from vmware.vapi.stdlib.client.factories import StubConfigurationFactory
+    HAS_PYNSXT = True
+except ImportError:
+    HAS_PYNSXT = False
+
+# One authenticated session and stub configuration per (manager, user) for the
+# lifetime of the module process, so helpers and worker threads share the
+# keep-alive connections instead of opening their own.
+_sessions = {}
+_stub_configs = {}
+_lock = threading.Lock()
+_auth_lock = threading.Lock()
+
+SESSION_CREATE_PATH = '/api/session/create'
+
+
+def getPoolSize():
+    return int(os.getenv("NSX_T_POOL_SIZE", os.getenv("ANSIBLE_FORKS", "10")))
+
+
+def getNsxUrl(nsx_manager):
+    return 'https://%s:%s' % (nsx_manager, 443)
+
+
+def createSession(pool_size=None):
+    if pool_size is None:
+        pool_size = getPoolSize()
+    session = requests.session()
+    session.verify = False
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+    session.mount('https://', adapter)
+    session.headers.update({'Connection': 'keep-alive'})
+    requests.packages.urllib3.disable_warnings()
+    return session
+
+
+def getSession(nsx_manager, nsx_username):
+    key = (nsx_manager, nsx_username)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = createSession()
+            _sessions[key] = session
+    return session
+
+
+def getAuthMode():
+    return os.getenv("NSX_T_AUTH_MODE", "basic").lower()
+
+
+def getSessionCacheDir():
+    return os.path.expanduser(os.getenv("NSX_T_SESSION_CACHE_DIR", "~/.ansible/tmp/nsxt_sessions"))
+
+
+def getSessionTtl():
+    # NSX expires idle API sessions after 30 minutes, stay safely below that
+    return int(os.getenv("NSX_T_SESSION_TTL", "1500"))
+
+
+class CacheLock(object):
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+
+    def __enter__(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+        self.fd = None
+
+
+def getCacheFile(cache_name, key):
+    cache_dir = os.path.join(getSessionCacheDir(), cache_name) if cache_name else getSessionCacheDir()
+    try:
+        os.makedirs(cache_dir, 0o700)
+    except OSError as ex:
+        if ex.errno != errno.EEXIST:
+            raise
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, digest)
+
+
+def readCacheEntry(path, allow_expired=False):
+    try:
+        with open(path) as cache_file:
+            entry = json.load(cache_file)
+    except (IOError, OSError, ValueError):
+        return None
+    if not allow_expired and entry.get('expires', 0) <= time.time():
+        return None
+    return entry
+
+
+def writeCacheEntry(path, entry):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'w') as cache_file:
+            json.dump(entry, cache_file)
+        os.chmod(tmp_path, 0o600)
+        os.rename(tmp_path, path)
+    except (IOError, OSError):
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def createNsxSession(session, nsx_manager, nsx_username, nsx_passwd):
+    response = session.post('%s%s' % (getNsxUrl(nsx_manager), SESSION_CREATE_PATH),
+                            data={'j_username': nsx_username, 'j_password': nsx_passwd},
+                            headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    if response.status_code != 200 or 'JSESSIONID' not in response.cookies:
+        raise requests.exceptions.HTTPError('NSX session create for %s returned %s: %s'
+                                            % (nsx_username, response.status_code, response.text))
+    return dict(
+        jsessionid=response.cookies['JSESSIONID'],
+        xsrf_token=response.headers.get('X-XSRF-TOKEN'),
+        expires=time.time() + getSessionTtl()
+    )
+
+
+def getPasswordDigest(nsx_passwd):
+    return hashlib.sha256((nsx_passwd or '').encode('utf-8')).hexdigest()
+
+
+def getAuthToken(session, nsx_manager, nsx_username, nsx_passwd, stale_jsessionid=None):
+    # a wrong or rotated password must not pick up the session of the old one
+    path = getCacheFile(None, '%s|%s|%s' % (nsx_manager, nsx_username, getPasswordDigest(nsx_passwd)))
+    with CacheLock(path + '.lock'):
+        entry = readCacheEntry(path)
+        if entry is None or entry['jsessionid'] == stale_jsessionid:
+            entry = createNsxSession(session, nsx_manager, nsx_username, nsx_passwd)
+            writeCacheEntry(path, entry)
+    return entry
+
+
+def applyAuthToken(session, entry):
+    for cookie in list(session.cookies):
+        if cookie.name == 'JSESSIONID':
+            session.cookies.clear(cookie.domain, cookie.path, cookie.name)
+    session.cookies.set('JSESSIONID', entry['jsessionid'])
+    if entry['xsrf_token']:
+        session.headers['X-XSRF-TOKEN'] = entry['xsrf_token']
+
+
+def enableSessionAuth(session, nsx_manager, nsx_username, nsx_passwd):
+    current = dict(entry=getAuthToken(session, nsx_manager, nsx_username, nsx_passwd))
+    applyAuthToken(session, current['entry'])
+
+    def reauthenticate(response, **kwargs):
+        # A cached session may have been expired or revoked on the manager,
+        # log in again once and replay the request with the new token.
+        if response.status_code not in (401, 403) or getattr(response.request, 'nsxt_retried', False):
+            return response
+        if response.request.path_url.startswith(SESSION_CREATE_PATH):
+            return response
+        with _auth_lock:
+            stale = current['entry']['jsessionid']
+            try:
+                entry = getAuthToken(session, nsx_manager, nsx_username, nsx_passwd, stale_jsessionid=stale)
+            except requests.exceptions.RequestException:
+                return response
+            current['entry'] = entry
+            applyAuthToken(session, entry)
+        retry = response.request.copy()
+        retry.nsxt_retried = True
+        retry.headers.pop('Cookie', None)
+        retry.prepare_cookies(session.cookies)
+        if entry['xsrf_token']:
+            retry.headers['X-XSRF-TOKEN'] = entry['xsrf_token']
+        return session.send(retry, **kwargs)
+
+    session.hooks['response'].append(reauthenticate)
+
+
+def getStubConfig(module):
+    nsx_manager = module.params['nsx_manager']
+    nsx_username = module.params['nsx_username']
+    key = (nsx_manager, nsx_username, getPasswordDigest(module.params['nsx_passwd']))
+    with _lock:
+        stub_config = _stub_configs.get(key)
+    if stub_config is not None:
+        return stub_config
+
+    session = getSession(nsx_manager, nsx_username)
+    connector = connect.get_requests_connector(
+        session=session, msg_protocol='rest', url=getNsxUrl(nsx_manager))
+    stub_config = StubConfigurationFactory.new_std_configuration(connector)
+    if getAuthMode() == 'session':
+        try:
+            enableSessionAuth(session, nsx_manager, nsx_username, module.params["nsx_passwd"])
+        except (requests.exceptions.RequestException, IOError, OSError) as ex:
+            module.fail_json(msg='Error creating NSX API session: %s' % (str(ex)))
+    else:
+        security_context = create_user_password_security_context(nsx_username, module.params["nsx_passwd"])
+        connector.set_security_context(security_context)
+    with _lock:
+        _stub_configs.setdefault(key, stub_config)
+        return _stub_configs[key]
@@ -0,0 +1,97 @@
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+# Structural diff of transport node specs. List members are paired on their
+# name (host_switch_name, uplink_name, transport_zone_id) rather than their
+# position, and every difference is reported as one change with a field path
+# such as host_switches[hs1].pnics[uplink-1].device_name.
+
+
+def addChange(changes, path, op, old=None, new=None):
+    changes.append(dict(path=path, op=op, old=old, new=new))
+
+
+def diffValue(changes, path, old, new):
+    if old != new:
+        addChange(changes, path, 'replace', old, new)
+
+
+def diffKeyedList(changes, path, current, desired, key, describe, diff_item=None):
+    current_map = dict((getattr(item, key), item) for item in current or [])
+    desired_map = dict((getattr(item, key), item) for item in desired or [])
+    for name in sorted(set(current_map) | set(desired_map)):
+        item_path = '%s[%s]' % (path, name)
+        if name not in desired_map:
+            addChange(changes, item_path, 'remove', old=describe(current_map[name]))
+        elif name not in current_map:
+            addChange(changes, item_path, 'add', new=describe(desired_map[name]))
+        elif diff_item is not None:
+            diff_item(changes, item_path, current_map[name], desired_map[name])
+
+
+def diffProfileIds(changes, path, current, desired):
+    # only the profiles given in the spec are compared, the manager fills in
+    # defaults for the other profile types
+    current_map = dict((entry.key, entry.value) for entry in current or [])
+    for entry in desired or []:
+        entry_path = '%s[%s]' % (path, entry.key)
+        if entry.key not in current_map:
+            addChange(changes, entry_path, 'add', new=entry.value)
+        else:
+            diffValue(changes, entry_path, current_map[entry.key], entry.value)
+
+
+def diffPnic(changes, path, current, desired):
+    diffValue(changes, path + '.device_name', current.device_name, desired.device_name)
+
+
+def diffHostSwitch(changes, path, current, desired):
+    diffValue(changes, path + '.static_ip_pool_id', current.static_ip_pool_id, desired.static_ip_pool_id)
+    diffProfileIds(changes, path + '.host_switch_profile_ids',
+                   current.host_switch_profile_ids, desired.host_switch_profile_ids)
+    diffKeyedList(changes, path + '.pnics', current.pnics, desired.pnics,
+                  'uplink_name', lambda pnic: pnic.device_name, diffPnic)
+
+
+def diffTransportNode(node, host_switches, tz_endpoints):
+    changes = []
+    diffKeyedList(changes, 'host_switches', node.host_switches, host_switches,
+                  'host_switch_name', lambda hs: hs.host_switch_name, diffHostSwitch)
+    diffKeyedList(changes, 'transport_zone_endpoints', node.transport_zone_endpoints, tz_endpoints,
+                  'transport_zone_id', lambda ep: ep.transport_zone_id)
+    return changes
+
+
+def mergeHostSwitch(current, desired):
+    given = dict((entry.key, entry) for entry in desired.host_switch_profile_ids or [])
+    profiles = [given.pop(entry.key, entry) for entry in current.host_switch_profile_ids or []]
+    current.host_switch_profile_ids = profiles + list(given.values())
+    current.pnics = desired.pnics
+    current.static_ip_pool_id = desired.static_ip_pool_id
+    return current
+
+
+def mergeTransportNode(node, host_switches, tz_endpoints):
+    # applies the desired specs to the fetched node, keeping whatever the
+    # manager set on the members that stay
+    current = dict((hs.host_switch_name, hs) for hs in node.host_switches or [])
+    node.host_switches = [mergeHostSwitch(current[hs.host_switch_name], hs) if hs.host_switch_name in current else hs
+                          for hs in host_switches]
+    endpoints = dict((ep.transport_zone_id, ep) for ep in node.transport_zone_endpoints or [])
+    node.transport_zone_endpoints = [endpoints.get(ep.transport_zone_id, ep) for ep in tz_endpoints]
+    return node
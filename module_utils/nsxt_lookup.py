@@ -0,0 +1,308 @@
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+
+import os
+import time
+
+try:
+    from com.vmware.vapi.std.errors_client import Error
+    from com.vmware.vapi.std.errors_client import NotFound
+    HAS_PYNSXT = True
+except ImportError:
+    HAS_PYNSXT = False
+
+try:
+    from com.vmware.nsx_client import Search
+    HAS_SEARCH = True
+except ImportError:
+    HAS_SEARCH = False
+
+from ansible.module_utils.nsxt_connection import CacheLock, getCacheFile, readCacheEntry, writeCacheEntry
+
+
+_MISSING = object()
+
+
+def unwrapDataValue(data_value):
+    if hasattr(data_value, 'is_set'):
+        if not data_value.is_set():
+            return None
+        data_value = data_value.value
+    return getattr(data_value, 'value', data_value)
+
+
+def getRawField(vs, field):
+    # Read a field without a full binding conversion: typed results already
+    # expose it as an attribute, dynamic ones keep the raw struct value.
+    value = getattr(vs, field, _MISSING)
+    if value is not _MISSING:
+        return value
+    struct_value = vs.get_struct_value()
+    if not struct_value.has_field(field):
+        return None
+    return unwrapDataValue(struct_value.get_field(field))
+
+
+def findByField(items, field, value, model):
+    for vs in items:
+        if getRawField(vs, field) == value:
+            return vs.convert_to(model)
+    return None
+
+
+def mapByField(items, field, values, model):
+    # One scan for many lookups, converting only the wanted objects.
+    wanted = set(values)
+    found = {}
+    for vs in items:
+        value = getRawField(vs, field)
+        if value in wanted and value not in found:
+            found[value] = vs.convert_to(model)
+    return found
+
+
+def getPageSize():
+    page_size = os.getenv("NSX_T_PAGE_SIZE")
+    return int(page_size) if page_size else None
+
+
+def iterPages(list_func, page_size=None, **kwargs):
+    # Follow the NSX list cursor one page at a time so callers can stop early
+    # and large collections are never held in memory all at once.
+    if page_size is None:
+        page_size = getPageSize()
+    if page_size:
+        kwargs['page_size'] = page_size
+    cursor = None
+    while True:
+        result = list_func(cursor=cursor, **kwargs)
+        for item in result.results or []:
+            yield item
+        cursor = result.cursor
+        if not cursor:
+            break
+
+
+# managers whose search endpoint failed in this process
+_search_unavailable = set()
+
+
+def isSearchEnabled(module):
+    if not HAS_SEARCH or module.params['nsx_manager'] in _search_unavailable:
+        return False
+    return os.getenv("NSX_T_USE_SEARCH", "true").lower() in ('1', 'true', 'yes')
+
+
+def quoteSearchValue(value):
+    return '"%s"' % (str(value).replace('\\', '\\\\').replace('"', '\\"'))
+
+
+def buildSearchQuery(resource_type, display_name=None, tags=None, filters=None):
+    terms = ['resource_type:%s' % (resource_type)]
+    if display_name is not None:
+        terms.append('display_name:%s' % (quoteSearchValue(display_name)))
+    for field, value in sorted((filters or {}).items()):
+        terms.append('%s:%s' % (field, quoteSearchValue(value)))
+    for scope, tag in sorted((tags or {}).items()):
+        terms.append('tags.scope:%s AND tags.tag:%s' % (quoteSearchValue(scope), quoteSearchValue(tag)))
+    return ' AND '.join(terms)
+
+
+def hasTags(obj, tags):
+    existing = [(tag.scope, tag.tag) for tag in (obj.tags or [])]
+    for scope, tag in tags.items():
+        if (scope, tag) not in existing:
+            return False
+    return True
+
+
+def searchObjects(stub_config, resource_type, model, display_name=None, tags=None, filters=None):
+    # The search index tokenises values, so re-check the exact match on every hit
+    search_svc = Search(stub_config)
+    query = buildSearchQuery(resource_type, display_name=display_name, tags=tags, filters=filters)
+    for vs in iterPages(search_svc.list, query=query):
+        if display_name is not None and getRawField(vs, 'display_name') != display_name:
+            continue
+        obj = vs.convert_to(model)
+        if tags and not hasTags(obj, tags):
+            continue
+        yield obj
+
+
+def searchIdByName(module, stub_config, resource_type, name, model, filters=None):
+    search_type = resource_type.split(':')[0]
+    try:
+        obj = next(searchObjects(stub_config, search_type, model, display_name=name, filters=filters), None)
+    except Error:
+        _search_unavailable.add(module.params['nsx_manager'])
+        raise
+    if obj is not None:
+        return obj.id
+    # the search index trails writes by a few seconds, trust ids recorded by our own creates
+    return peekNameIndex(module, resource_type, name)
+
+
+def getIndexTtl():
+    return int(os.getenv("NSX_T_INDEX_TTL", "120"))
+
+
+def getIndexGrace():
+    return int(os.getenv("NSX_T_INDEX_GRACE", "15"))
+
+
+def getIndexFile(module, resource_type):
+    return getCacheFile('index', '%s|%s' % (module.params['nsx_manager'], resource_type))
+
+
+# index entries already parsed by this process, keyed by path and checked
+# against the file identity so batch runs do not re-read unchanged indexes
+_index_memo = {}
+
+
+def getFileStamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime, st.st_size)
+
+
+def loadIndexEntry(path):
+    stamp = getFileStamp(path)
+    memo = _index_memo.get(path)
+    if stamp is not None and memo is not None and memo[0] == stamp:
+        entry = memo[1]
+        return entry if entry.get('expires', 0) > time.time() else None
+    entry = readCacheEntry(path)
+    if entry is not None:
+        _index_memo[path] = (stamp, entry)
+    return entry
+
+
+def storeIndexEntry(path, entry):
+    writeCacheEntry(path, entry)
+    _index_memo[path] = (getFileStamp(path), entry)
+
+
+def buildNameIndex(list_func):
+    names = {}
+    for vs in list_func():
+        # NSX allows duplicate display names, keep the first match like the list scans did
+        names.setdefault(getRawField(vs, 'display_name'), getRawField(vs, 'id'))
+    return names
+
+
+def getNameIndex(module, resource_type, list_func, refresh=False, max_age=None):
+    # max_age rebuilds an index built more than max_age seconds ago
+    ttl = getIndexTtl()
+    if ttl <= 0:
+        return buildNameIndex(list_func)
+    path = getIndexFile(module, resource_type)
+    with CacheLock(path + '.lock'):
+        entry = None if refresh else loadIndexEntry(path)
+        if entry is not None and max_age is not None and entry.get('built', 0) < time.time() - max_age:
+            entry = None
+        if entry is None or entry.get('partial'):
+            entry = dict(names=buildNameIndex(list_func), built=time.time(), expires=time.time() + ttl)
+            storeIndexEntry(path, entry)
+    return entry['names']
+
+
+def addToNameIndex(module, resource_type, name, obj_id):
+    if getIndexTtl() <= 0:
+        return
+    path = getIndexFile(module, resource_type)
+    with CacheLock(path + '.lock'):
+        entry = loadIndexEntry(path)
+        if entry is None:
+            # only lookups through search read a partial index, list lookups rebuild it
+            entry = dict(names={}, partial=True, expires=time.time() + getIndexTtl())
+        entry['names'].setdefault(name, obj_id)
+        storeIndexEntry(path, entry)
+
+
+def peekNameIndex(module, resource_type, name):
+    if getIndexTtl() <= 0:
+        return None
+    entry = loadIndexEntry(getIndexFile(module, resource_type))
+    if entry is None:
+        return None
+    return entry['names'].get(name)
+
+
+def invalidateNameIndex(module, resource_type):
+    path = getIndexFile(module, resource_type)
+    with CacheLock(path + '.lock'):
+        _index_memo.pop(path, None)
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def getIdByName(module, resource_type, name, list_func, model, stub_config=None, search_filters=None):
+    if stub_config is not None and isSearchEnabled(module):
+        try:
+            obj_id = searchIdByName(module, stub_config, resource_type, name, model, search_filters)
+        except Error:
+            obj_id = None
+        if obj_id is not None:
+            return obj_id
+    obj_id = getNameIndex(module, resource_type, list_func).get(name)
+    if obj_id is None and getIndexTtl() > 0:
+        # objects created outside these modules are not in the index yet, an
+        # index built within the grace period is trusted so creates do not rescan
+        obj_id = getNameIndex(module, resource_type, list_func, max_age=getIndexGrace()).get(name)
+    return obj_id
+
+
+def getObjectByName(module, resource_type, name, list_func, get_func, model, stub_config=None, search_filters=None):
+    if stub_config is not None and isSearchEnabled(module):
+        try:
+            obj_id = searchIdByName(module, stub_config, resource_type, name, model, search_filters)
+        except Error:
+            obj_id = None
+        if obj_id is not None:
+            try:
+                obj = get_func(obj_id)
+            except NotFound:
+                obj = None
+            if obj is not None and obj.display_name == name:
+                return obj
+        # the search index trails writes, a miss is checked against the name index
+    if getIndexTtl() <= 0:
+        return findByField(list_func(), 'display_name', name, model)
+    refresh = False
+    max_age = None
+    for attempt in range(2):
+        obj_id = getNameIndex(module, resource_type, list_func, refresh=refresh, max_age=max_age).get(name)
+        if obj_id is None:
+            # a miss may be an object created outside these modules, rebuild
+            # once unless the index was built within the grace period
+            max_age = getIndexGrace()
+            continue
+        try:
+            obj = get_func(obj_id)
+        except NotFound:
+            refresh = True
+            continue
+        if obj.display_name == name:
+            return obj
+        refresh = True
+    return None
@@ -0,0 +1,382 @@
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import collections
+import hashlib
+import os
+import re
+import ssl
+import subprocess
+import threading
+import time
+
+import requests
+
+try:
+    from pyVim.connect import SmartConnect
+    from pyVim.task import WaitForTask
+    from pyVmomi import vim, vmodl
+    HAS_PYVMOMI = True
+except ImportError:
+    HAS_PYVMOMI = False
+
+from ansible.module_utils.nsxt_connection import getCacheFile, readCacheEntry, writeCacheEntry
+
+DEPLOY_PARAMS = ['ovftool_path', 'datacenter', 'datastore', 'portgroup', 'cluster', 'vmname', 'hostname', 'dns_server',
+                 'ntp_server', 'dns_domain', 'gateway', 'ip_address', 'netmask', 'admin_password', 'cli_password',
+                 'path_to_ova', 'ova_file']
+
+PROGRESS_RE = re.compile(r'(?:Disk progress|Progress): *(\d+)%')
+
+
+def connectToApi(vchost, vc_user, vc_pwd):
+    try:
+        service_instance = SmartConnect(host=vchost, user=vc_user, pwd=vc_pwd)
+    except (requests.ConnectionError, ssl.SSLError):
+        try:
+            context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+            context.verify_mode = ssl.CERT_NONE
+            service_instance = SmartConnect(host=vchost, user=vc_user, pwd=vc_pwd, sslContext=context)
+        except Exception as e:
+            raise Exception(e)
+    return service_instance.RetrieveContent()
+
+
+def getNamedObjects(content, vimtype, root=None):
+    # A single RetrieveContents call over a container view that asks for the
+    # name property only, instead of one property fetch per object.
+    container = content.viewManager.CreateContainerView(root or content.rootFolder, [vimtype], True)
+    try:
+        traversal_spec = vmodl.query.PropertyCollector.TraversalSpec(name='traverseView', path='view', skip=False,
+                                                                     type=vim.view.ContainerView)
+        object_spec = vmodl.query.PropertyCollector.ObjectSpec(obj=container, skip=True, selectSet=[traversal_spec])
+        property_spec = vmodl.query.PropertyCollector.PropertySpec(type=vimtype, pathSet=['name'], all=False)
+        filter_spec = vmodl.query.PropertyCollector.FilterSpec(objectSet=[object_spec], propSet=[property_spec])
+        objects = {}
+        for object_content in content.propertyCollector.RetrieveContents([filter_spec]):
+            for prop in object_content.propSet:
+                objects[prop.val] = object_content.obj
+        return objects
+    finally:
+        container.Destroy()
+
+
+def getVmNames(content):
+    return getNamedObjects(content, vim.VirtualMachine)
+
+
+def getInventory(content, datacenter):
+    # datastore, cluster and network names are only unique within a datacenter
+    datacenters = getNamedObjects(content, vim.Datacenter)
+    if datacenter not in datacenters:
+        return dict(datacenter=datacenters, datastore={}, compute={}, network={})
+    return dict(
+        datacenter=datacenters,
+        datastore=getNamedObjects(content, vim.Datastore, datacenters[datacenter].datastoreFolder),
+        compute=getNamedObjects(content, vim.ComputeResource, datacenters[datacenter].hostFolder),
+        network=getNamedObjects(content, vim.Network, datacenters[datacenter].networkFolder)
+    )
+
+
+def getOvaFile(params):
+    return '{}/{}'.format(params['path_to_ova'], params['ova_file'])
+
+
+def getViString(params):
+    vi_string = 'vi://{}:{}@{}/{}/host/{}/'.format(params['vcenter_user'], params['vcenter_passwd'], params['vcenter'],
+                                                   params['datacenter'], params['cluster'])
+    resource_pool = params['resource_pool']
+    if resource_pool is not None and resource_pool != '':
+        vi_string = '%s/Resources/%s' % (vi_string, resource_pool)
+    return vi_string
+
+
+def getOvfProperties(params):
+    return [('nsx_hostname', '{}'.format(params['hostname'])),
+            ('nsx_dns1_0', '{}'.format(params['dns_server'])),
+            ('nsx_domain_0', '{}'.format(params['dns_domain'])),
+            ('nsx_ntp_0', '{}'.format(params['ntp_server'])),
+            ('nsx_gateway_0', '{}'.format(params['gateway'])),
+            ('nsx_ip_0', '{}'.format(params['ip_address'])),
+            ('nsx_netmask_0', '{}'.format(params['netmask'])),
+            ('nsx_passwd_0', '{}'.format(params['admin_password'])),
+            ('nsx_cli_passwd_0', '{}'.format(params['cli_password'])),
+            ('nsx_isSSHEnabled', '{}'.format(params['ssh_enabled'])),
+            ('nsx_allowSSHRootLogin', '{}'.format(params['allow_ssh_root_login']))]
+
+
+def buildOvfCommand(params):
+    ovftool_exec = '{}/ovftool'.format(params['ovftool_path'])
+    ovf_command = [ovftool_exec]
+
+    ovf_base_options = ['--acceptAllEulas', '--skipManifestCheck', '--X:injectOvfEnv', '--powerOn', '--noSSLVerify',
+                        '--allowExtraConfig', '--diskMode={}'.format(params['disk_mode']),
+                        '--datastore={}'.format(params['datastore']),
+                        '--name={}'.format(params['vmname'])]
+
+    # Support switching deployment size
+    if params['deployment_size'] and params['deployment_size'] != '':
+        ovf_base_options.extend(['--deploymentOption={}'.format(params['deployment_size'])])
+
+    if params['portgroup_ext']:
+        ovf_base_options.extend(['--net:Network 0={}'.format(params['portgroup']),
+                                 '--net:Network 1={}'.format(params['portgroup_ext']),
+                                 '--net:Network 2={}'.format(params['portgroup_transport'])])
+    else:
+        ovf_base_options.extend(['--network={}'.format(params['portgroup'])])
+    ovf_command.extend(ovf_base_options)
+
+    ovf_ext_prop = ['--prop:{}={}'.format(key, value) for key, value in getOvfProperties(params)]
+    ovf_command.extend(ovf_ext_prop)
+
+    ovf_command.append(getOvaFile(params))
+    ovf_command.append(getViString(params))
+    return ovf_command
+
+
+def getHashChunkSize():
+    return int(os.getenv("NSX_T_HASH_CHUNK_SIZE", "1048576"))
+
+
+def hashFile(path, chunk_size=None):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(chunk_size or getHashChunkSize()), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def getCachedOvaDigest(path, stat):
+    entry = readCacheEntry(getCacheFile('ova', os.path.abspath(path)), allow_expired=True)
+    if entry is not None and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+        return entry['sha256']
+    return None
+
+
+def setCachedOvaDigest(path, stat, digest):
+    writeCacheEntry(getCacheFile('ova', os.path.abspath(path)),
+                    dict(size=stat.st_size, mtime=stat.st_mtime, sha256=digest, expires=0))
+
+
+def getOvaDigest(path):
+    # hashing a multi-GB OVA takes a while, so the digest is kept on disk
+    # until the file's size or modification time changes
+    stat = os.stat(path)
+    digest = getCachedOvaDigest(path, stat)
+    if digest is None:
+        digest = hashFile(path)
+        setCachedOvaDigest(path, stat, digest)
+    return digest
+
+
+def getTemplateName(params, digest):
+    name = '{}-{}'.format(os.path.splitext(params['ova_file'])[0], digest[:12])
+    if params['deployment_size']:
+        name = '{}-{}'.format(name, params['deployment_size'])
+    return name
+
+
+def buildTemplateCommand(params, name):
+    # the image is imported once without guest properties and left powered off
+    command = [arg for arg in buildOvfCommand(params) if arg != '--powerOn' and not arg.startswith('--prop:')]
+    return [('--name={}'.format(name) if arg.startswith('--name=') else arg) for arg in command]
+
+
+def getNetworkBacking(network):
+    if isinstance(network, vim.dvs.DistributedVirtualPortgroup):
+        return vim.vm.device.VirtualEthernetCard.DistributedVirtualPortBackingInfo(
+            port=vim.dvs.PortConnection(portgroupKey=network.key,
+                                        switchUuid=network.config.distributedVirtualSwitch.uuid))
+    return vim.vm.device.VirtualEthernetCard.NetworkBackingInfo(deviceName=network.name, network=network)
+
+
+def getResourcePool(compute, name):
+    if not name:
+        return compute.resourcePool
+    pools = list(compute.resourcePool.resourcePool)
+    while pools:
+        pool = pools.pop(0)
+        if pool.name == name:
+            return pool
+        pools.extend(pool.resourcePool)
+    raise ValueError('Resource pool {} not found in {}'.format(name, compute.name))
+
+
+def buildCloneSpec(template, params, inventory):
+    for kind, name in (('datacenter', params['datacenter']), ('datastore', params['datastore']),
+                       ('compute', params['cluster'])):
+        if name not in inventory[kind]:
+            raise ValueError('{} {} not found'.format(kind, name))
+    device_changes = []
+    nics = sorted([device for device in template.config.hardware.device
+                   if isinstance(device, vim.vm.device.VirtualEthernetCard)], key=lambda device: device.key)
+    portgroups = [params['portgroup'], params['portgroup_ext'], params['portgroup_transport']]
+    for nic, portgroup in zip(nics, portgroups):
+        if not portgroup:
+            continue
+        if portgroup not in inventory['network']:
+            raise ValueError('network {} not found'.format(portgroup))
+        nic.backing = getNetworkBacking(inventory['network'][portgroup])
+        device_changes.append(vim.vm.device.VirtualDeviceSpec(operation='edit', device=nic))
+    values = dict(getOvfProperties(params))
+    properties = []
+    for prop in template.config.vAppConfig.property:
+        if prop.id in values:
+            properties.append(vim.vApp.PropertySpec(operation='edit',
+                                                    info=vim.vApp.PropertyInfo(key=prop.key, value=values[prop.id])))
+    return vim.vm.CloneSpec(
+        location=vim.vm.RelocateSpec(datastore=inventory['datastore'][params['datastore']],
+                                     pool=getResourcePool(inventory['compute'][params['cluster']],
+                                                          params['resource_pool'])),
+        config=vim.vm.ConfigSpec(deviceChange=device_changes, vAppConfig=vim.vApp.VmConfigSpec(property=properties)),
+        powerOn=True,
+        template=False
+    )
+
+
+def cloneAppliance(appliance):
+    # appliance holds name, template, params and inventory, the clone copies
+    # the disks inside vCenter instead of uploading the OVA again
+    result = dict(vmname=appliance['name'], progress=0, started=time.time())
+    params = appliance['params']
+    try:
+        spec = buildCloneSpec(appliance['template'], params, appliance['inventory'])
+        folder = appliance['inventory']['datacenter'][params['datacenter']].vmFolder
+        WaitForTask(appliance['template'].Clone(folder=folder, name=appliance['name'], spec=spec))
+        result.update(rc=0, progress=100, output=[])
+    except (vmodl.MethodFault, ValueError, KeyError) as ex:
+        result.update(rc=1, output=[getattr(ex, 'msg', None) or str(ex)])
+    result['duration'] = round(time.time() - result['started'], 1)
+    return result
+
+
+def maskCommand(command, secrets):
+    masked = []
+    for arg in command:
+        for secret in secrets:
+            if secret:
+                arg = arg.replace(secret, '********')
+        masked.append(arg)
+    return masked
+
+
+def runOvftool(command, on_progress=None):
+    # ovftool redraws its progress with carriage returns, so the output is read
+    # as it arrives and split on both line endings. Progress lines go to the
+    # callback, the tail of everything else is kept for error messages.
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    tail = collections.deque(maxlen=20)
+    pending = b''
+    while True:
+        chunk = os.read(process.stdout.fileno(), 4096)
+        if not chunk:
+            break
+        lines = re.split(b'[\r\n]', pending + chunk)
+        pending = lines.pop()
+        for line in lines:
+            line = line.decode('utf-8', 'replace').strip()
+            if not line:
+                continue
+            match = PROGRESS_RE.search(line)
+            if match:
+                if on_progress is not None:
+                    on_progress(int(match.group(1)))
+            else:
+                tail.append(line)
+    if pending.strip():
+        tail.append(pending.decode('utf-8', 'replace').strip())
+    process.stdout.close()
+    return process.wait(), list(tail)
+
+
+def deployAppliance(appliance):
+    # appliance holds name, command, size and the secrets to mask in output
+    result = dict(vmname=appliance['name'], progress=0, started=time.time())
+
+    def progress(percent):
+        result['progress'] = percent
+        elapsed = time.time() - result['started']
+        if elapsed > 0:
+            result['throughput_mbps'] = round(appliance['size'] * percent / 100.0 / elapsed / 1048576, 1)
+
+    try:
+        rc, output = runOvftool(appliance['command'], progress)
+    except (IOError, OSError) as ex:
+        rc, output = -1, [str(ex)]
+    result['duration'] = round(time.time() - result['started'], 1)
+    result['rc'] = rc
+    result['output'] = maskCommand(output, appliance['secrets'])
+    if rc == 0:
+        result['progress'] = 100
+        if result['duration'] > 0:
+            result['throughput_mbps'] = round(appliance['size'] / result['duration'] / 1048576, 1)
+    return result
+
+
+def deployAppliances(appliances, max_workers, max_per_datastore, max_per_host, deploy=deployAppliance):
+    # Starts up to max_workers ovftool processes, never more than
+    # max_per_datastore writing to one datastore or max_per_host going to one
+    # target host or cluster. Returns the results keyed by appliance name.
+    cond = threading.Condition()
+    pending = list(appliances)
+    active = dict(datastore={}, host={})
+    limits = dict(datastore=max_per_datastore, host=max_per_host)
+    results = {}
+
+    def fits(appliance):
+        for kind in ('datastore', 'host'):
+            if limits[kind] and active[kind].get(appliance[kind], 0) >= limits[kind]:
+                return False
+        return True
+
+    def track(appliance, step):
+        for kind in ('datastore', 'host'):
+            active[kind][appliance[kind]] = active[kind].get(appliance[kind], 0) + step
+
+    def run():
+        while True:
+            with cond:
+                while True:
+                    if not pending:
+                        return
+                    ready = [appliance for appliance in pending if fits(appliance)]
+                    if ready:
+                        break
+                    cond.wait()
+                appliance = ready[0]
+                pending.remove(appliance)
+                track(appliance, 1)
+            # the slot is released and a result recorded whatever deploy raises
+            result = dict(vmname=appliance['name'], progress=0, duration=0, rc=-1, output=[])
+            try:
+                result = deploy(appliance)
+            except Exception as ex:
+                result['output'] = maskCommand([str(ex)], appliance.get('secrets', []))
+            finally:
+                with cond:
+                    track(appliance, -1)
+                    results[appliance['name']] = result
+                    cond.notify_all()
+
+    threads = [threading.Thread(target=run) for i in range(max(1, min(max_workers, len(pending))))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
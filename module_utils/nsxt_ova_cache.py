@@ -0,0 +1,366 @@
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import collections
+import errno
+import hashlib
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import time
+
+from ansible.module_utils.nsxt_connection import CacheLock, getCacheFile, getSessionCacheDir, readCacheEntry, \
+    writeCacheEntry
+from ansible.module_utils.nsxt_ova import getCachedOvaDigest, getHashChunkSize, setCachedOvaDigest
+
+MANIFEST_RE = re.compile(r'^(\w+)\((.+)\)\s*=\s*([0-9a-fA-F]+)$')
+# every stored member is indexed under both digests an OVA manifest may use
+STORE_ALGORITHMS = ('sha256', 'sha1')
+
+
+def getOvaCacheDir():
+    return os.path.expanduser(os.getenv("NSX_T_OVA_CACHE_DIR", os.path.join(getSessionCacheDir(), 'ova_members')))
+
+
+def getOvaCacheTtl():
+    return int(os.getenv("NSX_T_OVA_CACHE_TTL", "604800"))
+
+
+def makeDirs(path):
+    try:
+        os.makedirs(path)
+    except OSError as ex:
+        if ex.errno != errno.EEXIST:
+            raise
+
+
+def digestStream(source, algorithms, chunk_size=None, sink=None):
+    # all digests, and the copy to sink, are done in the same pass over source
+    digests = dict((algorithm, hashlib.new(algorithm)) for algorithm in algorithms)
+    size = 0
+    for chunk in iter(lambda: source.read(chunk_size or getHashChunkSize()), b''):
+        for digest in digests.values():
+            digest.update(chunk)
+        if sink is not None:
+            sink.write(chunk)
+        size += len(chunk)
+    return dict((algorithm, digest.hexdigest()) for algorithm, digest in digests.items()), size
+
+
+class HashingReader(object):
+
+    def __init__(self, source):
+        self.source = source
+        self.digest = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.source.read(size)
+        self.digest.update(data)
+        return data
+
+    def drain(self, chunk_size=None):
+        for chunk in iter(lambda: self.read(chunk_size or getHashChunkSize()), b''):
+            pass
+        return self.digest.hexdigest()
+
+
+def readManifest(path):
+    entries = collections.OrderedDict()
+    with open(path) as manifest:
+        for line in manifest:
+            match = MANIFEST_RE.match(line.strip())
+            if match:
+                entries.setdefault(match.group(2), {})[match.group(1).lower()] = match.group(3).lower()
+    return entries
+
+
+def writeManifest(path, entries):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'w') as manifest:
+        for name, digests in entries.items():
+            for algorithm in sorted(digests):
+                manifest.write('%s(%s)= %s\n' % (algorithm.upper(), name, digests[algorithm]))
+    os.chmod(tmp_path, 0o644)
+    os.rename(tmp_path, path)
+
+
+def fileInfo(path, digests):
+    stat = os.stat(path)
+    return dict(size=stat.st_size, mtime=stat.st_mtime, digests=digests)
+
+
+def isCurrent(path, info):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    return stat.st_size == info['size'] and stat.st_mtime == info['mtime']
+
+
+def matchesDigests(digests, expected):
+    common = set(digests) & set(expected)
+    return bool(common) and all(digests[algorithm] == expected[algorithm] for algorithm in common)
+
+
+def checkMemberName(name):
+    # OVA members are flat, refuse anything that would land outside dest
+    if not name or name in ('.', '..') or os.path.basename(name) != name:
+        raise ValueError('refusing to extract OVA member %r' % name)
+    return name
+
+
+class MemberStore(object):
+    # OVA members are kept once per content digest and hard linked into the
+    # extraction folders, so a new build only writes the members that changed
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        for subdir in STORE_ALGORITHMS + ('tmp', 'used'):
+            makeDirs(os.path.join(cache_dir, subdir))
+
+    def lock(self):
+        return CacheLock(os.path.join(self.cache_dir, '.lock'))
+
+    def objectPath(self, sha256):
+        return os.path.join(self.cache_dir, 'sha256', sha256)
+
+    def usedPath(self, sha256):
+        return os.path.join(self.cache_dir, 'used', sha256)
+
+    def touch(self, sha256):
+        # the last use is kept on a separate marker, touching the object itself
+        # would change the mtime of every folder linked to it
+        with open(self.usedPath(sha256), 'a'):
+            pass
+        os.utime(self.usedPath(sha256), None)
+
+    def lastUsed(self, sha256):
+        for path in (self.usedPath(sha256), self.objectPath(sha256)):
+            try:
+                return os.stat(path).st_mtime
+            except OSError:
+                continue
+        return 0
+
+    def isLinked(self, sha256, target):
+        try:
+            return os.path.samefile(self.objectPath(sha256), target)
+        except OSError:
+            return False
+
+    def find(self, digests):
+        for algorithm in STORE_ALGORITHMS:
+            if algorithm not in digests:
+                continue
+            if algorithm == 'sha256':
+                sha256 = digests[algorithm]
+            else:
+                try:
+                    with open(os.path.join(self.cache_dir, algorithm, digests[algorithm])) as index:
+                        sha256 = index.read().strip()
+                except (IOError, OSError):
+                    continue
+            if os.path.exists(self.objectPath(sha256)):
+                return sha256
+        return None
+
+    def add(self, source, algorithms, chunk_size=None):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.cache_dir, 'tmp'))
+        try:
+            with os.fdopen(fd, 'wb') as sink:
+                digests, size = digestStream(source, set(algorithms) | set(STORE_ALGORITHMS), chunk_size, sink)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        with self.lock():
+            if os.path.exists(self.objectPath(digests['sha256'])):
+                os.unlink(tmp_path)
+            else:
+                os.rename(tmp_path, self.objectPath(digests['sha256']))
+            for algorithm in STORE_ALGORITHMS[1:]:
+                with open(os.path.join(self.cache_dir, algorithm, digests[algorithm]), 'w') as index:
+                    index.write(digests['sha256'])
+        return digests, size
+
+    def link(self, sha256, target):
+        # returns the number of bytes copied, 0 when the member could be linked
+        source = self.objectPath(sha256)
+        tmp_path = '%s.%s.tmp' % (target, os.getpid())
+        with self.lock():
+            self.touch(sha256)
+            if self.isLinked(sha256, target):
+                return 0
+            try:
+                os.link(source, tmp_path)
+                copied = 0
+            except OSError as ex:
+                if ex.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                    raise
+                shutil.copyfile(source, tmp_path)
+                copied = os.path.getsize(tmp_path)
+            os.rename(tmp_path, target)
+            # rename is a no-op when tmp_path and target are already the same inode
+            if os.path.lexists(tmp_path):
+                os.unlink(tmp_path)
+        return copied
+
+    def prune(self, ttl):
+        # members no extraction folder links to any more expire after ttl
+        expired = time.time() - ttl
+        removed = []
+        with self.lock():
+            object_dir = os.path.join(self.cache_dir, 'sha256')
+            for sha256 in os.listdir(object_dir):
+                stat = os.stat(os.path.join(object_dir, sha256))
+                if stat.st_nlink == 1 and self.lastUsed(sha256) < expired:
+                    os.unlink(os.path.join(object_dir, sha256))
+                    removed.append(sha256)
+            for sha256 in os.listdir(os.path.join(self.cache_dir, 'used')):
+                if not os.path.exists(self.objectPath(sha256)):
+                    os.unlink(self.usedPath(sha256))
+            for algorithm in STORE_ALGORITHMS[1:]:
+                index_dir = os.path.join(self.cache_dir, algorithm)
+                for name in os.listdir(index_dir):
+                    with open(os.path.join(index_dir, name)) as index:
+                        sha256 = index.read().strip()
+                    if not os.path.exists(self.objectPath(sha256)):
+                        os.unlink(os.path.join(index_dir, name))
+        return removed
+
+
+def streamOva(path, dest, store, previous, chunk_size=None):
+    files = {}
+    manifest = {}
+    result = dict(manifest=None, extracted=[], linked=[], skipped=[], bytes_written=0)
+    algorithms = set(STORE_ALGORITHMS)
+    with open(path, 'rb') as source:
+        reader = HashingReader(source)
+        tar = tarfile.open(fileobj=reader, mode='r|')
+        for member in tar:
+            if not member.isfile():
+                continue
+            name = checkMemberName(member.name)
+            target = os.path.join(dest, name)
+            expected = manifest.get(name, {})
+            info = previous.get(name)
+            if info and isCurrent(target, info) and matchesDigests(info['digests'], expected):
+                files[name] = info
+                result['skipped'].append(name)
+                if name.endswith('.mf'):
+                    manifest = readManifest(target)
+                    result['manifest'] = name
+                continue
+            sha256 = store.find(expected)
+            if sha256 is None:
+                digests, size = store.add(tar.extractfile(member), algorithms | set(expected), chunk_size)
+                sha256 = digests['sha256']
+                result['bytes_written'] += size
+                action = 'extracted'
+            else:
+                digests = dict(expected, sha256=sha256)
+                action = 'linked'
+            if info and isCurrent(target, info) and info['digests'].get('sha256') == sha256 or \
+                    store.isLinked(sha256, target):
+                files[name] = info if info and isCurrent(target, info) else fileInfo(target, digests)
+                result['skipped'].append(name)
+            else:
+                result['bytes_written'] += store.link(sha256, target)
+                files[name] = fileInfo(target, digests)
+                result[action].append(name)
+            if name.endswith('.mf'):
+                manifest = readManifest(target)
+                result['manifest'] = name
+        tar.close()
+        result['sha256'] = reader.drain(chunk_size)
+    for name, expected in manifest.items():
+        if name not in files:
+            raise ValueError('%s is listed in the manifest of %s but not part of it' % (name, path))
+        if not matchesDigests(files[name]['digests'], expected):
+            raise ValueError('%s does not match the manifest digest in %s' % (name, path))
+    result['files'] = files
+    return result
+
+
+def getExtractEntryPath(dest):
+    return getCacheFile('ova_extract', os.path.abspath(dest))
+
+
+def extractOva(path, dest, cache_dir=None, chunk_size=None):
+    # the extraction state of dest is remembered per source OVA digest, so an
+    # unchanged OVA over an untouched folder is not even read again
+    stat = os.stat(path)
+    makeDirs(dest)
+    store = MemberStore(cache_dir or getOvaCacheDir())
+    entry_path = getExtractEntryPath(dest)
+    with CacheLock(entry_path + '.lock'):
+        entry = readCacheEntry(entry_path, allow_expired=True) or dict(files={})
+        files = entry['files']
+        sha256 = getCachedOvaDigest(path, stat)
+        if sha256 is not None and sha256 == entry.get('sha256') and files and \
+                all(isCurrent(os.path.join(dest, name), info) for name, info in files.items()):
+            return dict(changed=False, sha256=sha256, manifest=entry.get('manifest'), extracted=[], linked=[],
+                        skipped=sorted(files), bytes_written=0, files=files)
+        result = streamOva(path, dest, store, files, chunk_size)
+        setCachedOvaDigest(path, stat, result['sha256'])
+        writeCacheEntry(entry_path, dict(sha256=result['sha256'], manifest=result['manifest'],
+                                         files=result['files'], expires=0))
+    store.prune(getOvaCacheTtl())
+    result['changed'] = bool(result['extracted'] or result['linked'])
+    return result
+
+
+def findManifest(dest):
+    names = [name for name in os.listdir(dest) if name.endswith('.mf')]
+    if len(names) != 1:
+        raise ValueError('expected one manifest in %s, found %d' % (dest, len(names)))
+    return names[0]
+
+
+def updateManifest(dest, chunk_size=None):
+    # only files whose size or modification time changed since they were
+    # extracted or last hashed are read again
+    entry_path = getExtractEntryPath(dest)
+    with CacheLock(entry_path + '.lock'):
+        entry = readCacheEntry(entry_path, allow_expired=True) or dict(files={}, expires=0)
+        files = entry['files']
+        name = entry.get('manifest') or findManifest(dest)
+        manifest_path = os.path.join(dest, name)
+        manifest = readManifest(manifest_path)
+        updated = []
+        hashed = []
+        for member, expected in manifest.items():
+            target = os.path.join(dest, member)
+            info = files.get(member)
+            if not (info and isCurrent(target, info) and set(expected) <= set(info['digests'])):
+                with open(target, 'rb') as source:
+                    digests, size = digestStream(source, set(expected) | set(['sha256']), chunk_size)
+                info = files[member] = fileInfo(target, digests)
+                hashed.append(member)
+            current = dict((algorithm, info['digests'][algorithm]) for algorithm in expected)
+            if current != expected:
+                manifest[member] = current
+                updated.append(member)
+        if updated:
+            writeManifest(manifest_path, manifest)
+        with open(manifest_path, 'rb') as source:
+            files[name] = fileInfo(manifest_path, digestStream(source, STORE_ALGORITHMS, chunk_size)[0])
+        entry.update(manifest=name, files=files)
+        writeCacheEntry(entry_path, entry)
+    return dict(changed=bool(updated), manifest=name, updated=updated, hashed=hashed)
@@ -0,0 +1,100 @@
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import os
+import time
+
+try:
+    from com.vmware.nsx_client import LogicalRouterPorts
+    from com.vmware.vapi.std.errors_client import ConcurrentChange, Error, NotFound, ResourceBusy, ServiceUnavailable
+    HAS_PYNSXT = True
+except ImportError:
+    HAS_PYNSXT = False
+
+from ansible.module_utils.nsxt_bulk import apiErrorMessage
+from ansible.module_utils.nsxt_connection import getPoolSize
+from ansible.module_utils.nsxt_lookup import getRawField, iterPages
+from ansible.module_utils.nsxt_topology import runGraph
+from ansible.module_utils.nsxt_wait import backoffDelays
+
+
+def getDeleteAttempts():
+    return int(os.getenv("NSX_T_DELETE_ATTEMPTS", "5"))
+
+
+def deletePort(lrp_svc, port_id, attempts, sleep=time.sleep):
+    # 409 and 503 (ConcurrentChange, ResourceBusy, ServiceUnavailable) mean
+    # the manager is busy with this router, those deletes are sent again
+    # after a backoff. A port that is already gone counts as deleted.
+    delays = backoffDelays(initial=1, maximum=15)
+    for attempt in range(1, attempts + 1):
+        try:
+            lrp_svc.delete(port_id, force=True)
+        except NotFound:
+            pass
+        except (ConcurrentChange, ResourceBusy, ServiceUnavailable):
+            if attempt == attempts:
+                raise
+            sleep(next(delays))
+            continue
+        return attempt
+
+
+def listRouterPortIds(lrp_svc, router_id):
+    # materialise the ports first, deleting while following the cursor would skip pages
+    return [getRawField(vs, 'id') for vs in iterPages(lrp_svc.list, logical_router_id=router_id)]
+
+
+def deleteRouterPorts(stub_config, router_id, max_workers=None, attempts=None):
+    # Ports are deleted by up to max_workers threads, then the router is
+    # listed again. Every port that is still there, whether its delete failed
+    # or it was added while the deletes ran, gets one more round before it is
+    # reported.
+    lrp_svc = LogicalRouterPorts(stub_config)
+    attempts = attempts or getDeleteAttempts()
+    errors = {}
+    attempted = set()
+    retries = 0
+
+    def delete(port_id, resolved):
+        try:
+            return dict(attempts=deletePort(lrp_svc, port_id, attempts))
+        except Error as ex:
+            return dict(failed=True, msg=apiErrorMessage(ex))
+
+    remaining = listRouterPortIds(lrp_svc, router_id)
+    for pass_number in range(2):
+        if not remaining:
+            break
+        attempted.update(remaining)
+        outcomes = runGraph(remaining, dict((port_id, {}) for port_id in remaining), delete,
+                            max_workers or getPoolSize())
+        for port_id, outcome in outcomes.items():
+            if outcome.get('failed'):
+                errors[port_id] = outcome['msg']
+            else:
+                errors.pop(port_id, None)
+                retries += outcome['attempts'] - 1
+        remaining = listRouterPortIds(lrp_svc, router_id)
+    # a port counts once, however many rounds it took
+    deleted = len(attempted - set(remaining))
+    msg = None
+    if remaining:
+        msg = '%d ports are left on the router: %s' % (len(remaining), '; '.join(
+            '%s: %s' % (port_id, errors.get(port_id, 'still present after delete')) for port_id in remaining))
+    return dict(deleted=deleted, retries=retries, remaining=remaining, msg=msg)
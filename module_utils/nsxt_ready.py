@@ -0,0 +1,126 @@
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import socket
+
+import requests
+
+from ansible.module_utils.nsxt_connection import createSession, getNsxUrl
+from ansible.module_utils.nsxt_topology import runGraph
+from ansible.module_utils.nsxt_wait import WAIT_SUCCESS, getWaitTimeout, waitFor
+
+ROLE_PORTS = dict(manager=[22, 443], controller=[22], edge=[22])
+
+
+def probePort(address, port, timeout):
+    try:
+        sock = socket.create_connection((address, port), timeout)
+    except (socket.error, socket.timeout):
+        return False
+    sock.close()
+    return True
+
+
+def getJson(session, address, path, auth, timeout):
+    # a manager that is still starting answers with 503 or not at all, both
+    # only mean "not yet"
+    try:
+        response = session.get('%s%s' % (getNsxUrl(address), path), auth=auth, timeout=timeout)
+    except requests.exceptions.RequestException:
+        return None
+    if response.status_code != 200:
+        return None
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+def findClusterNode(nodes, address):
+    for node in (nodes or {}).get('results', []):
+        listen = (node.get('controller_role') or {}).get('control_plane_listen_addr') or {}
+        if address in (node.get('appliance_mgmt_listen_addr'), listen.get('ip_address')):
+            return node
+    return None
+
+
+def probeManager(session, appliance, timeout):
+    auth = (appliance['username'], appliance['password'])
+    service = getJson(session, appliance['address'], '/api/v1/node/services/manager/status', auth, timeout)
+    if (service or {}).get('runtime_state') != 'running':
+        return 'manager service'
+    status = getJson(session, appliance['address'], '/api/v1/cluster/status', auth, timeout)
+    if ((status or {}).get('mgmt_cluster_status') or {}).get('status') != 'STABLE':
+        return 'management cluster'
+    return None
+
+
+def probeController(session, appliance, manager, timeout, control_cluster):
+    auth = (manager['username'], manager['password'])
+    node = findClusterNode(getJson(session, manager['address'], '/api/v1/cluster/nodes', auth, timeout),
+                           appliance['address'])
+    if node is None:
+        return 'registration with %s' % manager['address']
+    status = getJson(session, manager['address'], '/api/v1/cluster/nodes/%s/status' % node['id'], auth, timeout)
+    control = (status or {}).get('control_cluster_status') or {}
+    if (control.get('mgmt_connection_status') or {}).get('connectivity_status') != 'CONNECTED':
+        return 'connection to %s' % manager['address']
+    if not control_cluster:
+        return None
+    if control.get('control_cluster_status') != 'CONNECTED':
+        return 'control cluster membership'
+    status = getJson(session, manager['address'], '/api/v1/cluster/status', auth, timeout)
+    if ((status or {}).get('control_cluster_status') or {}).get('status') != 'STABLE':
+        return 'control cluster'
+    return None
+
+
+def probeAppliance(session, appliance, manager=None, timeout=5, control_cluster=False):
+    # returns what the appliance is still waiting for, None once it is usable
+    for port in appliance['ports']:
+        if not probePort(appliance['address'], port, timeout):
+            return 'port %d' % port
+    if appliance['role'] == 'manager':
+        return probeManager(session, appliance, timeout)
+    if appliance['role'] == 'controller' and manager is not None:
+        return probeController(session, appliance, manager, timeout, control_cluster)
+    return None
+
+
+def waitReady(appliances, manager=None, timeout=None, probe_timeout=5, control_cluster=False, max_workers=None):
+    # every appliance is polled on its own thread with backoff, so each one
+    # is reported as soon as it is usable and a slow one holds up nobody else
+    session = createSession(pool_size=max(1, len(appliances)))
+    by_name = dict((appliance['name'], appliance) for appliance in appliances)
+    if timeout is None:
+        timeout = getWaitTimeout(1800)
+
+    def worker(name, resolved):
+        appliance = by_name[name]
+        outcome, waiting_for = waitFor(
+            lambda: probeAppliance(session, appliance, manager, probe_timeout, control_cluster),
+            lambda waiting_for: waiting_for is None, timeout=timeout, initial=2, maximum=30)
+        if outcome != WAIT_SUCCESS:
+            return dict(name=name, address=appliance['address'], role=appliance['role'], ready=False,
+                        failed=True, waiting_for=waiting_for,
+                        msg="%s (%s) was not ready after %ds, waiting for %s"
+                            % (name, appliance['address'], timeout, waiting_for))
+        return dict(name=name, address=appliance['address'], role=appliance['role'], ready=True)
+
+    order = [appliance['name'] for appliance in appliances]
+    return runGraph(order, dict((name, {}) for name in order), worker, max_workers or len(order))
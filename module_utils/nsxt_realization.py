@@ -0,0 +1,185 @@
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import os
+import threading
+import time
+
+try:
+    from com.vmware.nsx.transport_nodes_client import State
+    from com.vmware.nsx.fabric.nodes_client import Status
+    from com.vmware.vapi.std.errors_client import NotFound
+    HAS_PYNSXT = True
+except ImportError:
+    HAS_PYNSXT = False
+
+from ansible.module_utils.nsxt_connection import CacheLock, getCacheFile, readCacheEntry, writeCacheEntry
+from ansible.module_utils.nsxt_lookup import getRawField, iterPages
+from ansible.module_utils.nsxt_wait import WAIT_FAILURE, WAIT_SUCCESS, WAIT_TIMEOUT, backoffDelays, stateIn
+
+TNODE_SUCCESS_STATES = ('success',)
+# partial_success is final too, some of the node's configuration did not realize
+TNODE_FAILURE_STATES = ('failed', 'error', 'partial_success')
+FABRIC_SUCCESS_STATES = ('INSTALL_SUCCESSFUL',)
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def getStateTtl():
+    return float(os.getenv("NSX_T_STATE_TTL", "5"))
+
+
+def getStateCacheFile(module):
+    return getCacheFile('state', '%s|%s|transport-nodes' % (module.params['nsx_manager'], module.params['nsx_username']))
+
+
+def listTransportNodeStates(module, stub_config):
+    # One listing of every transport node state, shared through the cache
+    # for a few seconds so concurrent module runs (forks, async jobs) polling
+    # the same manager do not each ask for it.
+    path = getStateCacheFile(module)
+    with CacheLock(path + '.lock'):
+        entry = readCacheEntry(path)
+        if entry is None:
+            states = {}
+            for vs in iterPages(State(stub_config).list):
+                states[getRawField(vs, 'transport_node_id')] = getRawField(vs, 'state')
+            entry = dict(states=states, expires=time.time() + getStateTtl())
+            writeCacheEntry(path, entry)
+    return entry['states']
+
+
+def invalidateTransportNodeStates(module):
+    # a node that was just changed may still be listed with its old state
+    path = getStateCacheFile(module)
+    with CacheLock(path + '.lock'):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def listFabricNodeStates(stub_config, node_ids):
+    # host deployment status has no listing, so one tick asks for each
+    # pending node over the shared keep-alive session
+    status_svc = Status(stub_config)
+    states = {}
+    for node_id in node_ids:
+        try:
+            states[node_id] = status_svc.get(node_id).host_node_deployment_status
+        except NotFound:
+            # the status is only published once the manager has picked the node up
+            pass
+    return states
+
+
+def isFabricFailure(state):
+    return state is not None and state.endswith('_FAILED')
+
+
+class RealizationWatcher(object):
+
+    def __init__(self, list_states, success, failure, initial=1, maximum=15, invalidate=None):
+        self.list_states = list_states
+        self.invalidate = invalidate
+        self.success = success
+        self.failure = failure
+        self.initial = initial
+        self.maximum = maximum
+        self.cond = threading.Condition()
+        self.waiters = {}
+        self.thread = None
+
+    def watch(self, obj_id, timeout):
+        # watch is called right after a change, so states cached before it are dropped
+        if self.invalidate is not None:
+            self.invalidate()
+        now = time.time()
+        with self.cond:
+            self.waiters[obj_id] = dict(id=obj_id, status=None, state=None, started=now,
+                                        deadline=now + timeout, elapsed=None)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run)
+                self.thread.daemon = True
+                self.thread.start()
+
+    def wait(self, obj_id):
+        with self.cond:
+            while self.waiters[obj_id]['status'] is None:
+                self.cond.wait()
+            return dict(self.waiters[obj_id])
+
+    def waitAll(self, obj_ids):
+        return dict((obj_id, self.wait(obj_id)) for obj_id in obj_ids)
+
+    def run(self):
+        # a single listing per tick serves every waiter, each one is woken
+        # as soon as its own object is done
+        delays = backoffDelays(self.initial, self.maximum)
+        while True:
+            with self.cond:
+                pending = [waiter for waiter in self.waiters.values() if waiter['status'] is None]
+                if not pending:
+                    self.thread = None
+                    return
+            try:
+                states = self.list_states([waiter['id'] for waiter in pending])
+            except Exception:
+                states = {}
+            now = time.time()
+            with self.cond:
+                for waiter in pending:
+                    state = states.get(waiter['id'], waiter['state'])
+                    waiter['state'] = state
+                    if self.success(state):
+                        waiter['status'] = WAIT_SUCCESS
+                    elif self.failure(state):
+                        waiter['status'] = WAIT_FAILURE
+                    elif now >= waiter['deadline']:
+                        waiter['status'] = WAIT_TIMEOUT
+                    if waiter['status'] is not None:
+                        waiter['elapsed'] = round(now - waiter['started'], 1)
+                self.cond.notify_all()
+                deadlines = [waiter['deadline'] for waiter in pending if waiter['status'] is None]
+            if deadlines:
+                time.sleep(max(0, min(next(delays), min(deadlines) - time.time())))
+
+
+def getWatcher(module, kind, create):
+    key = (module.params['nsx_manager'], module.params['nsx_username'], kind)
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            watcher = create()
+            _watchers[key] = watcher
+    return watcher
+
+
+def getTransportNodeWatcher(module, stub_config):
+    return getWatcher(module, 'transport-node', lambda: RealizationWatcher(
+        lambda node_ids: listTransportNodeStates(module, stub_config),
+        stateIn(*TNODE_SUCCESS_STATES), stateIn(*TNODE_FAILURE_STATES),
+        invalidate=lambda: invalidateTransportNodeStates(module)))
+
+
+def getFabricNodeWatcher(module, stub_config):
+    # installs take minutes, so the poll interval is allowed to grow further
+    return getWatcher(module, 'fabric-node', lambda: RealizationWatcher(
+        lambda node_ids: listFabricNodeStates(stub_config, node_ids),
+        stateIn(*FABRIC_SUCCESS_STATES), isFabricFailure, maximum=30))
@@ -0,0 +1,1153 @@
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import os
+import time
+
+try:
+    from com.vmware.nsx.model_client import Tag
+    from com.vmware.nsx_client import LogicalSwitches
+    from com.vmware.nsx.model_client import LogicalSwitch
+    from com.vmware.nsx_client import TransportZones
+    from com.vmware.nsx.model_client import TransportZone
+    from com.vmware.nsx_client import TransportNodes
+    from com.vmware.nsx.model_client import TransportNode
+    from com.vmware.nsx.model_client import TransportZoneEndPoint
+    from com.vmware.nsx.model_client import HostSwitch
+    from com.vmware.nsx.model_client import HostSwitchProfileTypeIdEntry
+    from com.vmware.nsx.model_client import Pnic
+    from com.vmware.nsx_client import HostSwitchProfiles
+    from com.vmware.nsx.model_client import UplinkHostSwitchProfile
+    from com.vmware.nsx.model_client import TeamingPolicy
+    from com.vmware.nsx.model_client import Uplink
+    from com.vmware.nsx.fabric_client import Nodes
+    from com.vmware.nsx.model_client import Node
+    from com.vmware.nsx_client import EdgeClusters
+    from com.vmware.nsx.model_client import EdgeCluster
+    from com.vmware.nsx.model_client import EdgeClusterMember
+    from com.vmware.nsx_client import LogicalPorts
+    from com.vmware.nsx.model_client import LogicalPort
+    from com.vmware.nsx_client import LogicalRouters
+    from com.vmware.nsx.model_client import LogicalRouter
+    from com.vmware.nsx_client import LogicalRouterPorts
+    from com.vmware.nsx.model_client import LogicalRouterLinkPortOnTIER0
+    from com.vmware.nsx.model_client import LogicalRouterLinkPortOnTIER1
+    from com.vmware.nsx.model_client import LogicalRouterUpLinkPort
+    from com.vmware.nsx.model_client import IPSubnet
+    from com.vmware.nsx.model_client import ResourceReference
+    from com.vmware.nsx.logical_routers.routing_client import Advertisement
+    from com.vmware.nsx.logical_routers.routing_client import StaticRoutes
+    from com.vmware.nsx.model_client import StaticRouteNextHop
+    from com.vmware.nsx.model_client import StaticRoute
+    from com.vmware.nsx.model_client import IpPoolSubnet
+    from com.vmware.nsx.model_client import IpPoolRange
+    from com.vmware.nsx.model_client import IpPool
+    from com.vmware.nsx.pools_client import IpPools
+    from com.vmware.vapi.std.errors_client import Error
+    from com.vmware.vapi.std.errors_client import NotFound
+    HAS_PYNSXT = True
+except ImportError:
+    HAS_PYNSXT = False
+
+from ansible.module_utils.nsxt_bulk import apiErrorMessage
+from ansible.module_utils.nsxt_connection import getStubConfig
+from ansible.module_utils.nsxt_diff import diffTransportNode, mergeTransportNode
+from ansible.module_utils.nsxt_lookup import addToNameIndex, findByField, getIdByName, getObjectByName, invalidateNameIndex, iterPages
+from ansible.module_utils.nsxt_ports import deleteRouterPorts
+from ansible.module_utils.nsxt_realization import getTransportNodeWatcher
+from ansible.module_utils.nsxt_wait import WAIT_SUCCESS, WAIT_TIMEOUT, getWaitTimeout, stateIn, waitFor
+
+# Per object parameters, same names, defaults and choices as the single
+# object modules, plus *_name variants for references to other objects.
+OBJECT_SPECS = dict(
+    transport_zone=dict(
+        display_name=dict(required=True),
+        description=dict(default=None),
+        host_switch_mode=dict(default='STANDARD', choices=['STANDARD', 'ENS']),
+        host_switch_name=dict(required=True),
+        nested_nsx=dict(default=False),
+        transport_type=dict(default='OVERLAY', choices=['OVERLAY', 'VLAN']),
+        tags=dict(default=None),
+        state=dict(default='present', choices=['present', 'absent'])
+    ),
+    uplink_profile=dict(
+        display_name=dict(required=True),
+        description=dict(default=None),
+        mtu=dict(default=1600),
+        active_list=dict(required=True),
+        standby_list=dict(default=None),
+        policy=dict(required=True, choices=['FAILOVER_ORDER', 'LOADBALANCE_SRCID']),
+        transport_vlan=dict(required=True),
+        tags=dict(default=None),
+        state=dict(default='present', choices=['present', 'absent'])
+    ),
+    transport_node=dict(
+        display_name=dict(required=True),
+        node_id=dict(default=None),
+        node_name=dict(default=None),
+        host_switch=dict(required=True),
+        transport_zone_endpoints=dict(default=None),
+        state=dict(default='present', choices=['present', 'absent'])
+    ),
+    edge_cluster=dict(
+        display_name=dict(required=True),
+        description=dict(default=None),
+        members=dict(default=None),
+        tags=dict(default=None),
+        state=dict(default='present', choices=['present', 'absent'])
+    ),
+    t0_router=dict(
+        display_name=dict(required=True),
+        description=dict(default=None),
+        failover_mode=dict(default=None, choices=['NON_PREEMPTIVE', 'PREEMPTIVE']),
+        edge_cluster_id=dict(default=None),
+        edge_cluster_name=dict(default=None),
+        high_availability_mode=dict(default='ACTIVE_STANDBY', choices=['ACTIVE_STANDBY', 'ACTIVE_ACTIVE']),
+        tags=dict(default=None),
+        state=dict(default='present', choices=['present', 'absent'])
+    ),
+    t1_router=dict(
+        display_name=dict(required=True),
+        description=dict(default=None),
+        failover_mode=dict(default=None, choices=['NON_PREEMPTIVE', 'PREEMPTIVE']),
+        edge_cluster_id=dict(default=None),
+        edge_cluster_name=dict(default=None),
+        pinned_to_edges=dict(default=None),
+        connected_t0_id=dict(default=None),
+        connected_t0_name=dict(default=None),
+        high_availability_mode=dict(default='ACTIVE_STANDBY', choices=['ACTIVE_STANDBY', 'ACTIVE_ACTIVE']),
+        advertise=dict(default=None),
+        tags=dict(default=None),
+        state=dict(default='present', choices=['present', 'absent'])
+    ),
+    logical_switch=dict(
+        display_name=dict(required=True),
+        description=dict(default=None),
+        admin_state=dict(default='UP', choices=['UP', 'DOWN']),
+        ip_pool_id=dict(default=None),
+        mac_pool_id=dict(default=None),
+        replication_mode=dict(default='MTEP', choices=['MTEP', 'SOURCE']),
+        switching_profile_ids=dict(default=None),
+        transport_zone_id=dict(default=None),
+        transport_zone_name=dict(default=None),
+        vlan=dict(default=None),
+        tags=dict(default=None),
+        state=dict(default='present', choices=['present', 'absent'])
+    ),
+    ip_pool=dict(
+        display_name=dict(required=True),
+        description=dict(default=None),
+        subnets=dict(required=True),
+        tags=dict(default=None),
+        state=dict(default='present', choices=['present', 'absent'])
+    ),
+    static_route=dict(
+        network=dict(required=True),
+        description=dict(default=None),
+        next_hops=dict(required=True),
+        admin_distance=dict(default=1),
+        router_name=dict(default=None),
+        router_id=dict(default=None),
+        tags=dict(default=None),
+        state=dict(default='present', choices=['present', 'absent'])
+    ),
+    logical_switch_port=dict(
+        display_name=dict(required=True),
+        description=dict(default=None),
+        admin_state=dict(default='UP', choices=['UP', 'DOWN']),
+        logical_switch_id=dict(default=None),
+        logical_switch_name=dict(default=None),
+        switching_profile_ids=dict(default=None),
+        tags=dict(default=None),
+        state=dict(default='present', choices=['present', 'absent'])
+    ),
+    t0_uplink=dict(
+        display_name=dict(required=True),
+        description=dict(default=None),
+        edge_cluster_member=dict(required=True),
+        ip_address=dict(required=True),
+        t0_router=dict(required=True),
+        logical_switch_port_id=dict(default=None),
+        logical_switch_port_name=dict(default=None),
+        urpf=dict(default='NONE', choices=['NONE', 'STRICT']),
+        tags=dict(default=None),
+        state=dict(default='present', choices=['present', 'absent'])
+    )
+)
+
+HOST_SWITCH_KEYS = ['name', 'pnics', 'uplink_profile', 'static_ip_pool_id', 'static_ip_pool_name']
+
+ADVERTISE_KEYS = ['advertise_lb_snat_ip', 'advertise_lb_vip', 'advertise_nat_routes',
+                  'advertise_nsx_connected_routes', 'advertise_static_routes']
+
+# How references are named in error messages, by resource type
+REFERENCE_NAMES = dict(
+    HostSwitchProfile="Uplink Profile",
+    IpPool="IP Pool",
+    TransportZone="Transport Zone",
+    Node="Fabric Node",
+    TransportNode="Transport Node"
+)
+
+
+def hostSwitchNames(key):
+    return lambda params: [hostswitch.get(key) for hostswitch in params['host_switch'] or []]
+
+
+# References by name between object types: the name parameter (or a function
+# returning the names), the id parameter it resolves to, None when the
+# reconciler looks the name up itself, and the object types it may point at.
+REFERENCES = dict(
+    transport_node=[(hostSwitchNames('uplink_profile'), None, ['uplink_profile']),
+                    (hostSwitchNames('static_ip_pool_name'), None, ['ip_pool']),
+                    ('transport_zone_endpoints', None, ['transport_zone'])],
+    edge_cluster=[('members', None, ['transport_node'])],
+    logical_switch=[('transport_zone_name', 'transport_zone_id', ['transport_zone'])],
+    logical_switch_port=[('logical_switch_name', 'logical_switch_id', ['logical_switch'])],
+    t0_router=[('edge_cluster_name', 'edge_cluster_id', ['edge_cluster'])],
+    t1_router=[('connected_t0_name', 'connected_t0_id', ['t0_router']),
+               ('edge_cluster_name', 'edge_cluster_id', ['edge_cluster'])],
+    t0_uplink=[('t0_router', None, ['t0_router']),
+               ('edge_cluster_member', None, ['transport_node']),
+               ('logical_switch_port_name', 'logical_switch_port_id', ['logical_switch_port'])],
+    static_route=[('router_name', 'router_id', ['t0_router', 't1_router'])]
+)
+
+
+def checkObjectParams(obj_type, obj):
+    if obj_type not in OBJECT_SPECS:
+        return None, "unsupported type %s, expected one of %s" % (obj_type, ', '.join(sorted(OBJECT_SPECS)))
+    spec = OBJECT_SPECS[obj_type]
+    unknown = [key for key in obj if key != 'type' and key not in spec]
+    if unknown:
+        return None, "unsupported parameters for %s: %s" % (obj_type, ', '.join(sorted(unknown)))
+    params = dict()
+    for key, opts in spec.items():
+        value = obj.get(key, opts.get('default'))
+        if opts.get('required') and value is None:
+            return None, "missing required parameter %s for %s" % (key, obj_type)
+        if value is not None and 'choices' in opts and value not in opts['choices']:
+            return None, "value of %s must be one of %s, got %s" % (key, ', '.join(opts['choices']), value)
+        params[key] = value
+    if obj_type == 'logical_switch' and not (params['transport_zone_id'] or params['transport_zone_name']):
+        return None, "one of transport_zone_id or transport_zone_name is required for logical_switch"
+    if obj_type == 'static_route' and not (params['router_id'] or params['router_name']):
+        return None, "one of router_id or router_name is required for static_route"
+    if obj_type == 'logical_switch_port' and not (params['logical_switch_id'] or params['logical_switch_name']):
+        return None, "one of logical_switch_id or logical_switch_name is required for logical_switch_port"
+    if obj_type == 'uplink_profile' and params['policy'] == 'LOADBALANCE_SRCID' and params['standby_list']:
+        return None, "standby_list must not be set with the LOADBALANCE_SRCID teaming policy"
+    if obj_type == 'transport_node':
+        if not (params['node_id'] or params['node_name']):
+            return None, "one of node_id or node_name is required for transport_node"
+        if not isinstance(params['host_switch'], list):
+            return None, "host_switch must be a list for transport_node"
+        for hostswitch in params['host_switch']:
+            missing = [key for key in ('name', 'pnics', 'uplink_profile') if not isinstance(hostswitch, dict) or key not in hostswitch]
+            if missing:
+                return None, "host_switch entries need %s" % (', '.join(missing))
+            unknown = [key for key in hostswitch if key not in HOST_SWITCH_KEYS]
+            if unknown:
+                return None, "unsupported host_switch parameters: %s" % (', '.join(sorted(unknown)))
+    if obj_type == 't0_uplink':
+        if not (params['logical_switch_port_id'] or params['logical_switch_port_name']):
+            return None, "one of logical_switch_port_id or logical_switch_port_name is required for t0_uplink"
+        if '/' not in params['ip_address']:
+            return None, "ip_address must be in address/prefix form for t0_uplink"
+    return params, None
+
+
+def objectName(obj_type, params):
+    if obj_type == 'static_route':
+        return params['network']
+    return params['display_name']
+
+
+def listTransportZones(stub_config):
+    return iterPages(TransportZones(stub_config).list)
+
+
+def listLogicalSwitches(stub_config):
+    return iterPages(LogicalSwitches(stub_config).list)
+
+
+def listLogicalSwitchPorts(stub_config):
+    return iterPages(LogicalPorts(stub_config).list)
+
+
+def listLogicalRouters(stub_config):
+    return iterPages(LogicalRouters(stub_config).list)
+
+
+def listIpPools(stub_config):
+    return iterPages(IpPools(stub_config).list)
+
+
+def listStaticRoutes(stub_config, lrid):
+    return iterPages(StaticRoutes(stub_config).list, logical_router_id=lrid)
+
+
+def listEdgeClusters(stub_config):
+    return iterPages(EdgeClusters(stub_config).list)
+
+
+def listTransportNodes(stub_config):
+    return iterPages(TransportNodes(stub_config).list)
+
+
+def listHostSwitchProfiles(stub_config):
+    return iterPages(HostSwitchProfiles(stub_config).list)
+
+
+def listFabricNodes(stub_config):
+    return iterPages(Nodes(stub_config).list)
+
+
+def listRouterUplinkPorts(stub_config, lrid):
+    return iterPages(LogicalRouterPorts(stub_config).list, resource_type='LogicalRouterUpLinkPort', logical_router_id=lrid)
+
+
+def findTag(tags, key):
+    for tag in tags:
+        if tag.scope == key:
+            return tag
+    return None
+
+
+def compareTags(existing_tags, new_tags):
+    if existing_tags is None or new_tags is None:
+        return False
+
+    for tag1 in new_tags:
+        key = tag1.scope
+        if key == 'generated' or key == 'modified':
+            continue
+
+        tag2 =  findTag(existing_tags, key)
+        if tag2 is None:
+            return False
+
+        if tag1.tag != tag2.tag:
+            return False
+    return True
+
+
+def buildTags(params):
+    tags=[ ]
+    tags.append(Tag(scope='created-by', tag=os.getenv("NSX_T_INSTALLER", "nsx-t-gen") ) )
+    if params['tags'] is not None:
+        for key, value in params['tags'].items():
+            tags.append(Tag(scope=key, tag=value))
+    return tags
+
+
+def updateTags(existing_tags, tags):
+    generated = findTag(existing_tags or [], 'generated')
+    if generated is not None:
+        tags.append(generated)
+    tags.append(Tag(scope='modified', tag=time.strftime("%Y-%m-%d %H:%M:%S %z") ) )
+    return tags
+
+
+def createTags(params):
+    tags = buildTags(params)
+    tags.append(Tag(scope='generated', tag=time.strftime("%Y-%m-%d %H:%M:%S %z") ) )
+    return tags
+
+
+def retag(obj, params):
+    # sets the tags of an existing object, returns False when they already match
+    tags = buildTags(params)
+    if compareTags(obj.tags, tags):
+        return False
+    obj.tags = updateTags(obj.tags, tags)
+    return True
+
+
+def buildLogicalSwitch(params, tz_id):
+    return LogicalSwitch(
+        display_name=params['display_name'],
+        description=params['description'],
+        address_bindings=None,
+        admin_state=params['admin_state'],
+        ip_pool_id=params['ip_pool_id'],
+        mac_pool_id=params['mac_pool_id'],
+        replication_mode=params['replication_mode'],
+        switching_profile_ids=None,
+        transport_zone_id=tz_id,
+        vlan=params['vlan'],
+        tags=createTags(params)
+    )
+
+
+def reconcileLogicalSwitch(module, stub_config, params):
+    ls_svc = LogicalSwitches(stub_config)
+    name = params['display_name']
+    ls = getObjectByName(module, 'LogicalSwitch', name, lambda: listLogicalSwitches(stub_config),
+                         ls_svc.get, LogicalSwitch, stub_config=stub_config)
+    if params['state'] == 'absent':
+        if ls is None:
+            return dict(changed=False, message="Logical Switch with name %s does not exist!" % (name))
+        if not module.check_mode:
+            ls_svc.delete(ls.id)
+            invalidateNameIndex(module, 'LogicalSwitch')
+        return dict(changed=True, id=ls.id, message="Logical Switch with name %s deleted!" % (name))
+
+    if ls is None:
+        tz_id = params['transport_zone_id']
+        if not tz_id:
+            tz_id = getIdByName(module, 'TransportZone', params['transport_zone_name'],
+                                lambda: listTransportZones(stub_config), TransportZone)
+            if tz_id is None and not module.check_mode:
+                raise ValueError("Transport Zone %s not found" % (params['transport_zone_name']))
+        new_ls = buildLogicalSwitch(params, tz_id)
+        if module.check_mode:
+            return dict(changed=True, id=None, debug_out=str(new_ls),
+                        message="Logical Switch with name %s would be created" % (name))
+        new_ls = ls_svc.create(new_ls)
+        addToNameIndex(module, 'LogicalSwitch', new_ls.display_name, new_ls.id)
+        return dict(changed=True, id=new_ls.id, message="Logical Switch with name %s created!" % (name))
+
+    if not retag(ls, params):
+        return dict(changed=False, id=ls.id, message="Logical Switch with name %s already exists!" % (name))
+    if not module.check_mode:
+        ls_svc.update(ls.id, ls)
+    return dict(changed=True, id=ls.id, message="Logical Switch with name %s has changed tags!" % (name))
+
+
+def buildSubnetList(subnets):
+    subnet_list = []
+    for subnet in subnets:
+        ip_range_list = []
+        for iprange in subnet['allocation_ranges']:
+            ipr = iprange.split('-')
+            ip_range_list.append(IpPoolRange(start=ipr[0], end=ipr[1]))
+        subnet_list.append(IpPoolSubnet(
+            allocation_ranges=ip_range_list,
+            cidr=subnet['cidr'],
+            gateway_ip=subnet['gateway_ip']
+        ))
+    return subnet_list
+
+
+def reconcileIpPool(module, stub_config, params):
+    ippool_svc = IpPools(stub_config)
+    name = params['display_name']
+    ippool = getObjectByName(module, 'IpPool', name, lambda: listIpPools(stub_config),
+                             ippool_svc.get, IpPool)
+    if params['state'] == 'absent':
+        if ippool is None:
+            return dict(changed=False, message="IP POOL with name %s does not exist!" % (name))
+        if not module.check_mode:
+            ippool_svc.delete(ippool.id)
+            invalidateNameIndex(module, 'IpPool')
+        return dict(changed=True, id=ippool.id, message="IP POOL with name %s deleted!" % (name))
+
+    subnet_list = buildSubnetList(params['subnets'])
+    if ippool is None:
+        new_ippool = IpPool(
+            display_name=name,
+            description=params['description'],
+            subnets=subnet_list,
+            tags=createTags(params)
+        )
+        if module.check_mode:
+            return dict(changed=True, id=None, debug_out=str(new_ippool),
+                        message="IP POOL with name %s would be created" % (name))
+        new_ippool = ippool_svc.create(new_ippool)
+        addToNameIndex(module, 'IpPool', new_ippool.display_name, new_ippool.id)
+        return dict(changed=True, id=new_ippool.id, message="IP POOL with name %s created!" % (name))
+
+    changed = retag(ippool, params)
+    if ippool.subnets != subnet_list:
+        ippool.subnets = subnet_list
+        changed = True
+    if not changed:
+        return dict(changed=False, id=ippool.id, message="IP POOL with name %s already exists!" % (name))
+    if not module.check_mode:
+        ippool_svc.update(ippool.id, ippool)
+    return dict(changed=True, id=ippool.id, message="IP Pool with name %s has been changed" % (name))
+
+
+def simplifyNextHopList(nextHopList):
+    ipList = []
+    for member in nextHopList:
+        ipList.append(member.ip_address)
+    return ipList
+
+
+def buildNextHops(params):
+    next_hop_list = []
+    for next_hop in params['next_hops']:
+        next_hop_list.append(StaticRouteNextHop(
+            administrative_distance=params['admin_distance'],
+            ip_address=next_hop,
+            logical_router_port_id=None
+        ))
+    return next_hop_list
+
+
+def buildStaticRoute(params):
+    return StaticRoute(
+        display_name=None,
+        network=params['network'],
+        next_hops=buildNextHops(params),
+        description=params['description'],
+        tags=createTags(params)
+    )
+
+
+def updateStaticRoute(sroute, params):
+    changed = retag(sroute, params)
+    next_hop_list = buildNextHops(params)
+    if simplifyNextHopList(sroute.next_hops) != simplifyNextHopList(next_hop_list):
+        sroute.next_hops = next_hop_list
+        changed = True
+    return changed
+
+
+def reconcileStaticRoute(module, stub_config, params):
+    sr_svc = StaticRoutes(stub_config)
+    network = params['network']
+    lrid = params['router_id']
+    if not lrid:
+        lrid = getIdByName(module, 'LogicalRouter', params['router_name'],
+                           lambda: listLogicalRouters(stub_config), LogicalRouter,
+                           stub_config=stub_config)
+        if lrid is None:
+            if module.check_mode and params['state'] == 'present':
+                return dict(changed=True, id=None, message="Static Route for %s would be created" % (network))
+            raise ValueError("Logical Router %s not found" % (params['router_name']))
+    sroute = findByField(listStaticRoutes(stub_config, lrid), 'network', network, StaticRoute)
+    if params['state'] == 'absent':
+        if sroute is None:
+            return dict(changed=False, router_id=lrid, message="Static Route for %s does not exist!" % (network))
+        if not module.check_mode:
+            sr_svc.delete(lrid, sroute.id)
+        return dict(changed=True, id=sroute.id, router_id=lrid, message="Static Route for %s deleted!" % (network))
+
+    if sroute is None:
+        new_static_route = buildStaticRoute(params)
+        if module.check_mode:
+            return dict(changed=True, id=None, router_id=lrid, debug_out=str(new_static_route),
+                        message="Static Route for %s would be created" % (network))
+        new_static_route = sr_svc.create(lrid, new_static_route)
+        return dict(changed=True, id=new_static_route.id, router_id=lrid,
+                    message="Static Route for %s with id %s was created on router with id %s!" % (network, new_static_route.id, lrid))
+
+    if not updateStaticRoute(sroute, params):
+        return dict(changed=False, id=sroute.id, router_id=lrid, message="Static Route for %s already exists!" % (network))
+    if not module.check_mode:
+        sr_svc.update(lrid, sroute.id, sroute)
+    return dict(changed=True, id=sroute.id, router_id=lrid, message="Static Route for %s has changed!" % (network))
+
+
+def buildLogicalPort(params, ls_id):
+    return LogicalPort(
+        display_name=params['display_name'],
+        description=params['description'],
+        address_bindings=None,
+        admin_state=params['admin_state'],
+        attachment=None,
+        logical_switch_id=ls_id,
+        switching_profile_ids=None,
+        tags=createTags(params)
+    )
+
+
+def reconcileLogicalSwitchPort(module, stub_config, params):
+    lsp_svc = LogicalPorts(stub_config)
+    name = params['display_name']
+    lsp = getObjectByName(module, 'LogicalPort', name, lambda: listLogicalSwitchPorts(stub_config),
+                          lsp_svc.get, LogicalPort, stub_config=stub_config)
+    if params['state'] == 'absent':
+        if lsp is None:
+            return dict(changed=False, message="Logical Switch Port with name %s does not exist!" % (name))
+        if not module.check_mode:
+            lsp_svc.delete(lsp.id)
+            invalidateNameIndex(module, 'LogicalPort')
+        return dict(changed=True, id=lsp.id, message="Logical Switch Port with name %s deleted!" % (name))
+
+    if lsp is None:
+        ls_id = params['logical_switch_id']
+        if not ls_id:
+            ls_id = getIdByName(module, 'LogicalSwitch', params['logical_switch_name'],
+                                lambda: listLogicalSwitches(stub_config), LogicalSwitch,
+                                stub_config=stub_config)
+            if ls_id is None and not module.check_mode:
+                raise ValueError("Logical Switch %s not found" % (params['logical_switch_name']))
+        new_lsp = buildLogicalPort(params, ls_id)
+        if module.check_mode:
+            return dict(changed=True, id=None, debug_out=str(new_lsp),
+                        message="Logical Switch Port with name %s would be created" % (name))
+        new_lsp = lsp_svc.create(new_lsp)
+        addToNameIndex(module, 'LogicalPort', new_lsp.display_name, new_lsp.id)
+        return dict(changed=True, id=new_lsp.id, message="Logical Switch Port with name %s created!" % (name))
+
+    if not retag(lsp, params):
+        return dict(changed=False, id=lsp.id, message="Logical Switch Port with name %s already exists!" % (name))
+    if not module.check_mode:
+        lsp_svc.update(lsp.id, lsp)
+    return dict(changed=True, id=lsp.id, message="Logical Switch Port with name %s has changed tags!" % (name))
+
+
+def reconcileTransportZone(module, stub_config, params):
+    tz_svc = TransportZones(stub_config)
+    name = params['display_name']
+    tz = getObjectByName(module, 'TransportZone', name, lambda: listTransportZones(stub_config),
+                         tz_svc.get, TransportZone)
+    if params['state'] == 'absent':
+        if tz is None:
+            return dict(changed=False, message="Transport Zone with name %s does not exist!" % (name))
+        if not module.check_mode:
+            tz_svc.delete(tz.id)
+            invalidateNameIndex(module, 'TransportZone')
+        return dict(changed=True, id=tz.id, message="Transport Zone with name %s deleted!" % (name))
+
+    if tz is None:
+        new_tz = TransportZone(
+            transport_type=params['transport_type'],
+            display_name=name,
+            description=params['description'],
+            host_switch_name=params['host_switch_name'],
+            host_switch_mode=params['host_switch_mode'],
+            nested_nsx=params['nested_nsx'],
+            tags=createTags(params)
+        )
+        if module.check_mode:
+            return dict(changed=True, id=None, debug_out=str(new_tz),
+                        message="Transport Zone with name %s would be created" % (name))
+        new_tz = tz_svc.create(new_tz)
+        addToNameIndex(module, 'TransportZone', new_tz.display_name, new_tz.id)
+        return dict(changed=True, id=new_tz.id, message="Transport Zone with name %s created!" % (name))
+
+    if not retag(tz, params):
+        return dict(changed=False, id=tz.id, message="Transport Zone with name %s already exists!" % (name))
+    if not module.check_mode:
+        tz_svc.update(tz.id, tz)
+    return dict(changed=True, id=tz.id, message="Transport Zone with name %s has changed tags!" % (name))
+
+
+def buildTeamingPolicy(params):
+    active_list = [Uplink(uplink, Uplink.UPLINK_TYPE_PNIC) for uplink in params['active_list']]
+    standby_list = None
+    if params['standby_list']:
+        standby_list = [Uplink(uplink, Uplink.UPLINK_TYPE_PNIC) for uplink in params['standby_list']]
+    return TeamingPolicy(active_list, params['policy'], standby_list)
+
+
+def reconcileUplinkProfile(module, stub_config, params):
+    hsp_svc = HostSwitchProfiles(stub_config)
+    name = params['display_name']
+    prof = getObjectByName(module, 'HostSwitchProfile', name, lambda: listHostSwitchProfiles(stub_config),
+                           lambda prof_id: hsp_svc.get(prof_id).convert_to(UplinkHostSwitchProfile),
+                           UplinkHostSwitchProfile)
+    if params['state'] == 'absent':
+        if prof is None:
+            return dict(changed=False, message="Uplink Profile with name %s does not exist!" % (name))
+        if not module.check_mode:
+            hsp_svc.delete(prof.id)
+            invalidateNameIndex(module, 'HostSwitchProfile')
+        return dict(changed=True, id=prof.id, message="Uplink Profile with name %s deleted!" % (name))
+
+    teaming = buildTeamingPolicy(params)
+    mtu = int(params['mtu'])
+    transport_vlan = int(params['transport_vlan'])
+    if prof is None:
+        new_prof = UplinkHostSwitchProfile(
+            display_name=name,
+            description=params['description'],
+            lags=None,
+            mtu=mtu,
+            teaming=teaming,
+            transport_vlan=transport_vlan,
+            tags=createTags(params)
+        )
+        if module.check_mode:
+            return dict(changed=True, id=None, debug_out=str(new_prof),
+                        message="Uplink Profile with name %s would be created" % (name))
+        new_prof = hsp_svc.create(new_prof).convert_to(UplinkHostSwitchProfile)
+        addToNameIndex(module, 'HostSwitchProfile', new_prof.display_name, new_prof.id)
+        return dict(changed=True, id=new_prof.id, message="Uplink Profile with name %s created!" % (name))
+
+    changed = retag(prof, params)
+    if prof.teaming != teaming:
+        prof.teaming = teaming
+        changed = True
+    if prof.mtu != mtu:
+        prof.mtu = mtu
+        changed = True
+    if prof.transport_vlan != transport_vlan:
+        prof.transport_vlan = transport_vlan
+        changed = True
+    if not changed:
+        return dict(changed=False, id=prof.id, message="Uplink Profile with name %s already exists!" % (name))
+    if not module.check_mode:
+        hsp_svc.update(prof.id, prof)
+    return dict(changed=True, id=prof.id, message="Uplink Profile with name %s has been changed" % (name))
+
+
+def resolveName(module, resource_type, name, list_func, model, description, **kwargs):
+    obj_id = getIdByName(module, resource_type, name, list_func, model, **kwargs)
+    if obj_id is None and not module.check_mode:
+        raise ValueError("%s %s not found" % (description, name))
+    return obj_id
+
+
+def indexResolver(module, stub_config):
+    # resolve(kind, name) through the name indexes, for a single object
+    lookups = dict(
+        HostSwitchProfile=(lambda: listHostSwitchProfiles(stub_config), UplinkHostSwitchProfile),
+        IpPool=(lambda: listIpPools(stub_config), IpPool),
+        TransportZone=(lambda: listTransportZones(stub_config), TransportZone),
+        Node=(lambda: listFabricNodes(stub_config), Node)
+    )
+
+    def resolve(kind, name):
+        list_func, model = lookups[kind]
+        return resolveName(module, kind, name, list_func, model, REFERENCE_NAMES[kind])
+    return resolve
+
+
+def mapResolver(resolver):
+    # resolve(kind, name) through a ReferenceResolver, for many objects at once
+    def resolve(kind, name):
+        obj_id = resolver.getId(kind, name)
+        if obj_id is None:
+            raise ValueError("%s %s not found" % (REFERENCE_NAMES[kind], name))
+        return obj_id
+    return resolve
+
+
+def buildHostSwitches(host_switches, resolve):
+    hs_list = []
+    for hostswitch in host_switches:
+        profile_id = resolve('HostSwitchProfile', hostswitch['uplink_profile'])
+        pool_id = hostswitch.get('static_ip_pool_id')
+        if not pool_id and hostswitch.get('static_ip_pool_name'):
+            pool_id = resolve('IpPool', hostswitch['static_ip_pool_name'])
+        hs_list.append(HostSwitch(
+            host_switch_name=hostswitch['name'],
+            host_switch_profile_ids=[HostSwitchProfileTypeIdEntry(
+                key=HostSwitchProfileTypeIdEntry.KEY_UPLINKHOSTSWITCHPROFILE,
+                value=profile_id
+            )],
+            pnics=[Pnic(device_name=device, uplink_name=uplink) for uplink, device in hostswitch['pnics'].items()],
+            static_ip_pool_id=pool_id
+        ))
+    return hs_list
+
+
+def buildTransportZoneEndPoints(tz_names, resolve):
+    return [TransportZoneEndPoint(transport_zone_id=resolve('TransportZone', tz_name)) for tz_name in tz_names or []]
+
+
+def planTransportNode(params, node, resolve):
+    # action and body for a transport node, plus the patch of an update
+    if params['state'] == 'absent':
+        return 'delete' if node is not None else 'absent', node, []
+    hs_list = buildHostSwitches(params['host_switch'] or [], resolve)
+    tz_endpoints = buildTransportZoneEndPoints(params['transport_zone_endpoints'], resolve)
+    if node is None:
+        node_id = params['node_id'] or resolve('Node', params['node_name'] or params['display_name'])
+        return 'create', TransportNode(
+            display_name=params['display_name'],
+            host_switches=hs_list,
+            node_id=node_id,
+            transport_zone_endpoints=tz_endpoints
+        ), []
+    patch = diffTransportNode(node, hs_list, tz_endpoints)
+    if not patch:
+        return 'unchanged', node, patch
+    return 'update', mergeTransportNode(node, hs_list, tz_endpoints), patch
+
+
+def isTransportNodeGone(tn_svc, node_id):
+    try:
+        tn_svc.get(node_id)
+    except NotFound:
+        return True
+    return False
+
+
+def reconcileTransportNode(module, stub_config, params):
+    tn_svc = TransportNodes(stub_config)
+    name = params['display_name']
+    node = getObjectByName(module, 'TransportNode', name, lambda: listTransportNodes(stub_config),
+                           tn_svc.get, TransportNode, stub_config=stub_config)
+    action, body, patch = planTransportNode(params, node, indexResolver(module, stub_config))
+    if action == 'absent':
+        return dict(changed=False, message="Transport Node with name %s does not exist!" % (name))
+    if action == 'delete':
+        if not module.check_mode:
+            tn_svc.delete(node.id)
+            invalidateNameIndex(module, 'TransportNode')
+            status, gone = waitFor(lambda: isTransportNodeGone(tn_svc, node.id), stateIn(True), timeout=getWaitTimeout(60))
+            if status == WAIT_TIMEOUT:
+                raise ValueError("Transport Node %s is still present after its delete" % (name))
+        return dict(changed=True, id=node.id, message="Transport Node with name %s deleted!" % (name))
+    if action == 'create':
+        if module.check_mode:
+            return dict(changed=True, id=None, debug_out=str(body),
+                        message="Transport Node with name %s would be created" % (name))
+        new_node = tn_svc.create(body)
+        addToNameIndex(module, 'TransportNode', new_node.display_name, new_node.id)
+        # edge clusters and uplinks need the node up, not only created
+        watcher = getTransportNodeWatcher(module, stub_config)
+        watcher.watch(new_node.id, getWaitTimeout(600))
+        realized = watcher.wait(new_node.id)
+        if realized['status'] != WAIT_SUCCESS:
+            raise ValueError("Transport Node %s is not up, last state: %s" % (name, realized['state']))
+        return dict(changed=True, id=new_node.id, message="Transport Node with name %s created!" % (name))
+    if action == 'unchanged':
+        return dict(changed=False, id=node.id, message="Transport Node with name %s already exists!" % (name))
+    if not module.check_mode:
+        tn_svc.update(node.id, body)
+    return dict(changed=True, id=node.id, patch=patch, message="Transport Node with name %s has been modified!" % (name))
+
+
+def reconcileEdgeCluster(module, stub_config, params):
+    ec_svc = EdgeClusters(stub_config)
+    name = params['display_name']
+    ec = getObjectByName(module, 'EdgeCluster', name, lambda: listEdgeClusters(stub_config),
+                         ec_svc.get, EdgeCluster)
+    if params['state'] == 'absent':
+        if ec is None:
+            return dict(changed=False, message="Edge Cluster with name %s does not exist!" % (name))
+        if not module.check_mode:
+            ec_svc.delete(ec.id)
+            invalidateNameIndex(module, 'EdgeCluster')
+        return dict(changed=True, id=ec.id, message="Edge Cluster with name %s deleted!" % (name))
+
+    member_list = None
+    if params['members'] is not None:
+        member_list = []
+        for tnode_name in params['members']:
+            tn_id = getIdByName(module, 'TransportNode', tnode_name, lambda: listTransportNodes(stub_config),
+                                TransportNode, stub_config=stub_config)
+            if tn_id is None:
+                raise ValueError("Transport Node %s not found" % (tnode_name))
+            member_list.append(EdgeClusterMember(transport_node_id=tn_id))
+    if ec is None:
+        new_ec = EdgeCluster(
+            display_name=name,
+            description=params['description'],
+            members=member_list,
+            tags=createTags(params)
+        )
+        if module.check_mode:
+            return dict(changed=True, id=None, debug_out=str(new_ec),
+                        message="Edge Cluster with name %s would be created" % (name))
+        new_ec = ec_svc.create(new_ec)
+        addToNameIndex(module, 'EdgeCluster', new_ec.display_name, new_ec.id)
+        return dict(changed=True, id=new_ec.id, message="Edge Cluster with name %s created!" % (name))
+
+    changed = retag(ec, params)
+    desired = [member.transport_node_id for member in member_list or []]
+    realised = [member.transport_node_id for member in ec.members or []]
+    if desired != realised:
+        ec.members = member_list
+        changed = True
+    if not changed:
+        return dict(changed=False, id=ec.id, message="Edge Cluster with name %s already exists!" % (name))
+    if not module.check_mode:
+        ec_svc.update(ec.id, ec)
+    return dict(changed=True, id=ec.id, message="Edge Cluster with name %s has changed!" % (name))
+
+
+def resolveEdgeCluster(module, stub_config, params):
+    if params['edge_cluster_id'] or not params['edge_cluster_name']:
+        return params['edge_cluster_id']
+    ec_id = getIdByName(module, 'EdgeCluster', params['edge_cluster_name'],
+                        lambda: listEdgeClusters(stub_config), EdgeCluster)
+    if ec_id is None and not module.check_mode:
+        raise ValueError("Edge Cluster %s not found" % (params['edge_cluster_name']))
+    return ec_id
+
+
+def getT0Link(stub_config, lr_id):
+    lrp_svc = LogicalRouterPorts(stub_config)
+    first = next(iterPages(lrp_svc.list, page_size=1, logical_router_id=lr_id,
+                           resource_type='LogicalRouterLinkPortOnTIER1'), None)
+    if first is None:
+        return None, None, None
+    lrp = first.convert_to(LogicalRouterLinkPortOnTIER1)
+    t0port_id = lrp.linked_logical_router_port_id.target_id if lrp.linked_logical_router_port_id else None
+    t0_id = None
+    if t0port_id:
+        t0_id = lrp_svc.get(t0port_id).convert_to(LogicalRouterLinkPortOnTIER0).logical_router_id
+    return lrp.id, t0port_id, t0_id
+
+
+def buildT0LinkPort(t1_name, t1_id, t0_id):
+    return LogicalRouterLinkPortOnTIER0(
+        display_name="t0-downlink-to_%s" % (t1_name),
+        logical_router_id=t0_id,
+        description=t1_id
+    )
+
+
+def buildT1LinkPort(t1_name, t1_id, t0_id, t0port_id):
+    return LogicalRouterLinkPortOnTIER1(
+        display_name="%s-uplinklink-to_t0" % (t1_name),
+        description=t0_id,
+        logical_router_id=t1_id,
+        linked_logical_router_port_id=ResourceReference(target_id=t0port_id)
+    )
+
+
+def connectT0(stub_config, lr, t0_id):
+    lrp_svc = LogicalRouterPorts(stub_config)
+    t0port = lrp_svc.create(buildT0LinkPort(lr.display_name, lr.id, t0_id)).convert_to(LogicalRouterLinkPortOnTIER0)
+    lrp_svc.create(buildT1LinkPort(lr.display_name, lr.id, t0_id, t0port.id))
+
+
+def deleteRouter(module, stub_config, lr, max_workers=None):
+    outcome = deleteRouterPorts(stub_config, lr.id, max_workers)
+    if outcome['remaining']:
+        raise ValueError("Error deleting the ports of Logical Router %s: %s" % (lr.display_name, outcome['msg']))
+    LogicalRouters(stub_config).delete(lr.id)
+    invalidateNameIndex(module, 'LogicalRouter')
+
+
+def buildLogicalRouter(params, router_type, edge_cluster_id):
+    # a T1 only gets an edge cluster when it is pinned to the edges
+    if router_type == 'TIER1' and params['pinned_to_edges'] not in ('True', 'true', True):
+        edge_cluster_id = None
+    return LogicalRouter(
+        display_name=params['display_name'],
+        description=params['description'],
+        failover_mode=params['failover_mode'],
+        edge_cluster_id=edge_cluster_id,
+        router_type=router_type,
+        high_availability_mode=params['high_availability_mode'],
+        tags=createTags(params)
+    )
+
+
+def updateLogicalRouter(lr, params, router_type, edge_cluster_id):
+    changed = retag(lr, params)
+    if router_type == 'TIER1' and edge_cluster_id != lr.edge_cluster_id:
+        lr.edge_cluster_id = edge_cluster_id
+        changed = True
+    return changed
+
+
+def updateAdvertisement(adv_config, advertise, enabled):
+    # keys left out of advertise are switched off, enabled is only changed
+    # when given (or defaulted for a new router)
+    changed = False
+    enabled = advertise.get('enabled', enabled)
+    if enabled is not None and enabled != adv_config.enabled:
+        adv_config.enabled = enabled
+        changed = True
+    for key in ADVERTISE_KEYS:
+        value = advertise.get(key) or None
+        if value != (getattr(adv_config, key) or None):
+            setattr(adv_config, key, value)
+            changed = True
+    return changed
+
+
+def reconcileAdvertisement(module, stub_config, lr_id, advertise, created):
+    adv_svc = Advertisement(stub_config)
+    adv_config = adv_svc.get(lr_id)
+    if not updateAdvertisement(adv_config, advertise, True if created else None):
+        return False
+    if not module.check_mode:
+        adv_svc.update(lr_id, adv_config)
+    return True
+
+
+def reconcileLogicalRouter(module, stub_config, params, router_type):
+    lr_svc = LogicalRouters(stub_config)
+    name = params['display_name']
+    lr = getObjectByName(module, 'LogicalRouter', name, lambda: listLogicalRouters(stub_config),
+                         lr_svc.get, LogicalRouter, stub_config=stub_config)
+    if params['state'] == 'absent':
+        if lr is None:
+            return dict(changed=False, message="Logical Router with name %s does not exist!" % (name))
+        if not module.check_mode:
+            deleteRouter(module, stub_config, lr, params.get('max_concurrent'))
+        return dict(changed=True, id=lr.id, message="Logical Router with name %s deleted!" % (name))
+
+    edge_cluster_id = resolveEdgeCluster(module, stub_config, params)
+    t0_id = None
+    advertise = None
+    if router_type == 'TIER1':
+        advertise = params['advertise']
+        t0_id = params['connected_t0_id']
+        if not t0_id and params['connected_t0_name']:
+            t0_id = getIdByName(module, 'LogicalRouter', params['connected_t0_name'],
+                                lambda: listLogicalRouters(stub_config), LogicalRouter,
+                                stub_config=stub_config)
+            if t0_id is None and not module.check_mode:
+                raise ValueError("T0 Logical Router %s not found" % (params['connected_t0_name']))
+    if lr is None:
+        new_lr = buildLogicalRouter(params, router_type, edge_cluster_id)
+        if module.check_mode:
+            return dict(changed=True, id=None, debug_out=str(new_lr),
+                        message="Logical Router with name %s would be created" % (name))
+        new_lr = lr_svc.create(new_lr)
+        addToNameIndex(module, 'LogicalRouter', new_lr.display_name, new_lr.id)
+        if t0_id:
+            connectT0(stub_config, new_lr, t0_id)
+        if advertise:
+            reconcileAdvertisement(module, stub_config, new_lr.id, advertise, True)
+        return dict(changed=True, id=new_lr.id, message="Logical Router with name %s created!" % (name))
+
+    changed = updateLogicalRouter(lr, params, router_type, edge_cluster_id)
+    if changed and not module.check_mode:
+        lr = lr_svc.update(lr.id, lr)
+    if router_type == 'TIER1':
+        t1port_id, t0port_id, current_t0_id = getT0Link(stub_config, lr.id)
+        if current_t0_id != t0_id:
+            changed = True
+            if not module.check_mode:
+                lrp_svc = LogicalRouterPorts(stub_config)
+                if t1port_id:
+                    lrp_svc.delete(t1port_id, force=True)
+                if t0port_id:
+                    lrp_svc.delete(t0port_id, force=True)
+                if t0_id:
+                    connectT0(stub_config, lr, t0_id)
+    if advertise and reconcileAdvertisement(module, stub_config, lr.id, advertise, False):
+        changed = True
+    if not changed:
+        return dict(changed=False, id=lr.id, message="Logical Router with name %s already exists!" % (name))
+    return dict(changed=True, id=lr.id, message="Logical Router with name %s has been modified!" % (name))
+
+
+def reconcileT0Router(module, stub_config, params):
+    return reconcileLogicalRouter(module, stub_config, params, 'TIER0')
+
+
+def reconcileT1Router(module, stub_config, params):
+    return reconcileLogicalRouter(module, stub_config, params, 'TIER1')
+
+
+def getEdgeClusterMemberIndex(module, stub_config, lr, member_name):
+    tn_id = resolveName(module, 'TransportNode', member_name, lambda: listTransportNodes(stub_config),
+                        TransportNode, "Transport Node", stub_config=stub_config)
+    if tn_id is None:
+        return []
+    if not lr.edge_cluster_id:
+        raise ValueError("T0 Logical Router %s has no edge cluster" % (lr.display_name))
+    edge_cluster = EdgeClusters(stub_config).get(lr.edge_cluster_id)
+    member_index = [int(member.member_index) for member in edge_cluster.members or []
+                    if member.transport_node_id == tn_id]
+    if not member_index:
+        raise ValueError("Transport Node %s is not a member of the edge cluster of %s" % (member_name, lr.display_name))
+    return member_index
+
+
+def reconcileT0Uplink(module, stub_config, params):
+    lrp_svc = LogicalRouterPorts(stub_config)
+    name = params['display_name']
+    lr = getObjectByName(module, 'LogicalRouter', params['t0_router'], lambda: listLogicalRouters(stub_config),
+                         LogicalRouters(stub_config).get, LogicalRouter, stub_config=stub_config)
+    if lr is None:
+        if module.check_mode and params['state'] == 'present':
+            return dict(changed=True, id=None, message="Logical Router Uplink with name %s would be created" % (name))
+        raise ValueError("T0 Logical Router %s not found" % (params['t0_router']))
+    index_type = 'LogicalRouterUpLinkPort:%s' % (lr.id)
+    lrp = getObjectByName(module, index_type, name, lambda: listRouterUplinkPorts(stub_config, lr.id),
+                          lambda lrp_id: lrp_svc.get(lrp_id).convert_to(LogicalRouterUpLinkPort),
+                          LogicalRouterUpLinkPort, stub_config=stub_config, search_filters=dict(logical_router_id=lr.id))
+    if params['state'] == 'absent':
+        if lrp is None:
+            return dict(changed=False, message="Logical Router Uplink with name %s does not exist!" % (name))
+        if not module.check_mode:
+            lrp_svc.delete(lrp.id, force=True)
+            invalidateNameIndex(module, index_type)
+        return dict(changed=True, id=lrp.id, message="Logical Router Uplink with name %s deleted!" % (name))
+
+    member_index = getEdgeClusterMemberIndex(module, stub_config, lr, params['edge_cluster_member'])
+    lsp_id = params['logical_switch_port_id']
+    if not lsp_id:
+        lsp_id = resolveName(module, 'LogicalPort', params['logical_switch_port_name'],
+                             lambda: listLogicalSwitchPorts(stub_config), LogicalPort, "Logical Switch Port",
+                             stub_config=stub_config)
+    address, prefix = params['ip_address'].split('/')
+    subnet_list = [IPSubnet(ip_addresses=[address], prefix_length=int(prefix))]
+    if lrp is None:
+        new_lrp = LogicalRouterUpLinkPort(
+            display_name=name,
+            description=params['description'],
+            edge_cluster_member_index=member_index,
+            linked_logical_switch_port_id=ResourceReference(target_id=lsp_id),
+            subnets=subnet_list,
+            urpf_mode=params['urpf'],
+            logical_router_id=lr.id,
+            tags=createTags(params)
+        )
+        if module.check_mode:
+            return dict(changed=True, id=None, debug_out=str(new_lrp),
+                        message="Logical Router Uplink with name %s would be created" % (name))
+        new_lrp = lrp_svc.create(new_lrp).convert_to(LogicalRouterUpLinkPort)
+        addToNameIndex(module, index_type, new_lrp.display_name, new_lrp.id)
+        return dict(changed=True, id=new_lrp.id, message="Logical Router Uplink with name %s created!" % (name))
+
+    changed = False
+    linked = lrp.linked_logical_switch_port_id
+    if linked is None or linked.target_id != lsp_id:
+        lrp.linked_logical_switch_port_id = ResourceReference(target_id=lsp_id)
+        changed = True
+    if retag(lrp, params):
+        changed = True
+    if lrp.subnets != subnet_list:
+        lrp.subnets = subnet_list
+        changed = True
+    if lrp.edge_cluster_member_index != member_index:
+        lrp.edge_cluster_member_index = member_index
+        changed = True
+    if not changed:
+        return dict(changed=False, id=lrp.id, message="Logical Router Uplink with name %s already exists!" % (name))
+    if not module.check_mode:
+        lrp_svc.update(lrp.id, lrp)
+    return dict(changed=True, id=lrp.id, message="Logical Router Uplink with name %s has been changed!" % (name))
+
+
+RECONCILERS = dict(
+    transport_zone=reconcileTransportZone,
+    uplink_profile=reconcileUplinkProfile,
+    transport_node=reconcileTransportNode,
+    edge_cluster=reconcileEdgeCluster,
+    t0_router=reconcileT0Router,
+    t1_router=reconcileT1Router,
+    logical_switch=reconcileLogicalSwitch,
+    ip_pool=reconcileIpPool,
+    static_route=reconcileStaticRoute,
+    logical_switch_port=reconcileLogicalSwitchPort,
+    t0_uplink=reconcileT0Uplink
+)
+
+
+def runModule(module, obj_type, stub_config=None):
+    # Entry point of the single object modules. Parameters a module does not
+    # declare get their defaults from OBJECT_SPECS, API errors and missing
+    # references fail the module.
+    params = dict((key, opts.get('default')) for key, opts in OBJECT_SPECS[obj_type].items())
+    params.update(module.params)
+    try:
+        result = RECONCILERS[obj_type](module, stub_config or getStubConfig(module), params)
+    except Error as ex:
+        module.fail_json(msg='API Error: %s' % (apiErrorMessage(ex)))
+    except ValueError as ex:
+        module.fail_json(msg=str(ex))
+    module.exit_json(object_name=objectName(obj_type, params), **result)
@@ -0,0 +1,81 @@
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import threading
+
+try:
+    from com.vmware.nsx_client import HostSwitchProfiles
+    from com.vmware.nsx_client import TransportZones
+    from com.vmware.nsx_client import TransportNodes
+    from com.vmware.nsx.fabric_client import Nodes
+    from com.vmware.nsx.pools_client import IpPools
+    HAS_PYNSXT = True
+except ImportError:
+    HAS_PYNSXT = False
+
+from ansible.module_utils.nsxt_lookup import buildNameIndex, iterPages
+
+
+class ReferenceResolver(object):
+    # Name to id maps for the objects transport node specs refer to, each
+    # filled by a single listing the first time it is needed in a run.
+    # Modules can pass their own list functions to keep their error handling.
+
+    def __init__(self, stub_config, listers=None):
+        self.stub_config = stub_config
+        self.listers = listers or {}
+        self.maps = {}
+        self.lock = threading.Lock()
+
+    def getMap(self, kind):
+        with self.lock:
+            if kind not in self.maps:
+                self.maps[kind] = self.loadMap(kind)
+            return self.maps[kind]
+
+    def loadMap(self, kind):
+        if kind in self.listers:
+            return buildNameIndex(self.listers[kind])
+        services = dict(
+            HostSwitchProfile=HostSwitchProfiles,
+            TransportZone=TransportZones,
+            Node=Nodes,
+            TransportNode=TransportNodes,
+            IpPool=IpPools
+        )
+        if kind not in services:
+            raise ValueError("unsupported reference type %s" % (kind))
+        list_func = services[kind](self.stub_config).list
+        return buildNameIndex(lambda: iterPages(list_func))
+
+    def getId(self, kind, name):
+        return self.getMap(kind).get(name)
+
+    def uplinkProfileId(self, name):
+        return self.getId('HostSwitchProfile', name)
+
+    def transportZoneId(self, name):
+        return self.getId('TransportZone', name)
+
+    def fabricNodeId(self, name):
+        return self.getId('Node', name)
+
+    def add(self, kind, name, obj_id):
+        with self.lock:
+            if kind in self.maps:
+                self.maps[kind][name] = obj_id
@@ -0,0 +1,200 @@
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import base64
+import errno
+import hashlib
+import hmac
+import os
+import socket
+import tempfile
+import time
+
+try:
+    from shlex import quote
+except ImportError:
+    from pipes import quote
+
+try:
+    import paramiko
+    HAS_PARAMIKO = True
+except ImportError:
+    HAS_PARAMIKO = False
+
+from ansible.module_utils.nsxt_connection import CacheLock, getCacheFile, readCacheEntry, writeCacheEntry
+from ansible.module_utils.nsxt_topology import runGraph
+
+NSXCLI_PATH = '/opt/vmware/nsx-cli/bin/scripts/nsxcli'
+
+
+def getHostKeyTtl():
+    return int(os.getenv("NSX_T_HOST_KEY_TTL", "3600"))
+
+
+def formatFingerprint(key_bytes):
+    # same format as ssh-keygen -l
+    return 'SHA256:%s' % base64.b64encode(hashlib.sha256(key_bytes).digest()).decode('ascii').rstrip('=')
+
+
+def getHostKey(address, port=22, timeout=10):
+    # only the key exchange is done, no authentication
+    sock = socket.create_connection((address, port), timeout)
+    transport = paramiko.Transport(sock)
+    try:
+        transport.start_client(timeout=timeout)
+        key = transport.get_remote_server_key()
+    finally:
+        transport.close()
+    return dict(type=key.get_name(), key=key.get_base64(), fingerprint=formatFingerprint(key.asbytes()))
+
+
+def scanHostKey(host, port=22, timeout=10, refresh=False):
+    # Cached per host:port for NSX_T_HOST_KEY_TTL seconds. When a cached
+    # entry is refreshed the fingerprint is compared, so a host that was
+    # redeployed or regenerated its key is reported as changed.
+    path = getCacheFile('host_key', '%s:%s' % (host, port))
+    with CacheLock(path + '.lock'):
+        previous = readCacheEntry(path, allow_expired=True)
+        if previous is not None and not refresh and previous['expires'] > time.time():
+            previous.update(cached=True, key_changed=False)
+            return previous
+        entry = getHostKey(host, port, timeout)
+        entry.update(fetched=time.time(), expires=time.time() + getHostKeyTtl())
+        writeCacheEntry(path, entry)
+    entry['cached'] = False
+    entry['key_changed'] = previous is not None and previous.get('fingerprint') != entry['fingerprint']
+    return entry
+
+
+def collectHostKeys(hosts, port=22, timeout=10, refresh=False, max_workers=50):
+    def scan(host, resolved):
+        try:
+            entry = scanHostKey(host, port, timeout, refresh)
+        except (IOError, OSError, EOFError, paramiko.SSHException) as ex:
+            return dict(failed=True, msg='Error reading the SSH host key of %s:%s: %s' % (host, port, str(ex)))
+        entry.update(host=host, port=port)
+        return entry
+
+    order = []
+    for host in hosts:
+        if host not in order:
+            order.append(host)
+    return runGraph(order, dict((host, {}) for host in order), scan, max_workers)
+
+
+def getKnownHostName(host, port=22):
+    return host if port == 22 else '[%s]:%s' % (host, port)
+
+
+def hashKnownHost(name, salt=None):
+    # the "|1|salt|hmac" form written by ssh-keyscan -H
+    salt = salt or os.urandom(20)
+    digest = hmac.new(salt, name.encode('utf-8'), hashlib.sha1).digest()
+    return '|1|%s|%s' % (base64.b64encode(salt).decode('ascii'), base64.b64encode(digest).decode('ascii'))
+
+
+def matchKnownHost(field, names):
+    for pattern in field.split(','):
+        if pattern.startswith('|1|'):
+            try:
+                salt = base64.b64decode(pattern.split('|')[2])
+            except (IndexError, TypeError, ValueError):
+                continue
+            for name in names:
+                if hmac.compare_digest(hashKnownHost(name, salt), pattern):
+                    return name
+        elif pattern in names:
+            return pattern
+    return None
+
+
+def updateKnownHosts(path, keys, hash_hosts=True, check_mode=False):
+    # keys maps known_hosts names to (type, base64 key). Every line for those
+    # names is replaced and the file is written once, through a rename, under
+    # a lock so parallel runs do not interleave their edits. Nothing is
+    # written when the file already holds exactly these keys.
+    path = os.path.expanduser(path)
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, 0o700)
+    except OSError as ex:
+        if ex.errno != errno.EEXIST:
+            raise
+    with CacheLock(path + '.lock'):
+        try:
+            with open(path) as known_hosts:
+                lines = known_hosts.read().splitlines()
+        except IOError as ex:
+            if ex.errno != errno.ENOENT:
+                raise
+            lines = []
+        kept = []
+        present = dict((name, set()) for name in keys)
+        for line in lines:
+            fields = line.split()
+            name = None
+            if len(fields) >= 3 and not line.startswith(('#', '@')):
+                name = matchKnownHost(fields[0], present)
+            if name is None:
+                kept.append(line)
+            else:
+                present[name].add((fields[1], fields[2]))
+        stale = sorted(name for name, key in keys.items() if present[name] != set([tuple(key)]))
+        if not stale or check_mode:
+            return dict(changed=bool(stale), updated=stale)
+        for name in sorted(keys):
+            key_type, key = keys[name]
+            kept.append('%s %s %s' % (hashKnownHost(name) if hash_hosts else name, key_type, key))
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as known_hosts:
+                known_hosts.write('\n'.join(kept) + '\n')
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o600)
+            os.rename(tmp_path, path)
+        except (IOError, OSError):
+            os.unlink(tmp_path)
+            raise
+    return dict(changed=True, updated=stale)
+
+
+class SshSession(object):
+
+    def __init__(self, address, username, password, port=22, timeout=10):
+        self.address = address
+        self.client = paramiko.SSHClient()
+        # keys already in known_hosts are enforced, new ones are recorded so
+        # the caller can report them
+        self.client.load_system_host_keys()
+        self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self.client.connect(address, port=port, username=username, password=password, timeout=timeout,
+                            allow_agent=False, look_for_keys=False)
+        key = self.client.get_transport().get_remote_server_key()
+        self.host_key = dict(type=key.get_name(), key=key.get_base64(), fingerprint=formatFingerprint(key.asbytes()))
+
+    def run(self, command, timeout=300):
+        stdin, stdout, stderr = self.client.exec_command(command, timeout=timeout)
+        stdin.close()
+        out = stdout.read().decode('utf-8', 'replace')
+        err = stderr.read().decode('utf-8', 'replace')
+        return stdout.channel.recv_exit_status(), out, err
+
+    def nsxcli(self, args, timeout=300):
+        return self.run(' '.join([NSXCLI_PATH, '-c'] + [quote(arg) for arg in args]), timeout)
+
+    def close(self):
+        self.client.close()
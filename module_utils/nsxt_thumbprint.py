@@ -0,0 +1,138 @@
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import hashlib
+import os
+import socket
+import ssl
+import time
+
+from ansible.module_utils.nsxt_connection import CacheLock, getCacheFile, readCacheEntry, writeCacheEntry
+from ansible.module_utils.nsxt_topology import runGraph
+
+
+def getThumbprintTtl():
+    return int(os.getenv("NSX_T_THUMBPRINT_TTL", "900"))
+
+
+def splitEndpoint(endpoint, port=443):
+    host, sep, given = endpoint.rpartition(':')
+    if sep and given.isdigit() and ']' not in given:
+        return host.strip('[]'), int(given)
+    return endpoint.strip('[]'), port
+
+
+def formatThumbprint(der_cert):
+    # NSX expects the SHA-256 digest as upper case hex pairs joined by colons
+    sha = hashlib.sha256(der_cert).hexdigest().upper()
+    return ":".join(sha[i:i+2] for i in range(0, len(sha), 2))
+
+
+def readDerHeader(der, offset):
+    # returns (tag, start of value, end of value) of the DER element at offset
+    tag = bytearray(der[offset:offset + 1])[0]
+    length = bytearray(der[offset + 1:offset + 2])[0]
+    offset += 2
+    if length & 0x80:
+        count = length & 0x7f
+        length = 0
+        for byte in bytearray(der[offset:offset + count]):
+            length = (length << 8) | byte
+        offset += count
+    return tag, offset, offset + length
+
+
+def getCertificateSerial(der_cert):
+    # Certificate ::= SEQUENCE { tbsCertificate SEQUENCE { [0] version OPTIONAL, serialNumber INTEGER, ...
+    tag, start, end = readDerHeader(der_cert, 0)
+    tag, start, end = readDerHeader(der_cert, start)
+    tag, start, end = readDerHeader(der_cert, start)
+    if tag == 0xa0:
+        tag, start, end = readDerHeader(der_cert, end)
+    if tag != 0x02:
+        raise ValueError("unexpected certificate layout")
+    return ''.join('%02X' % byte for byte in bytearray(der_cert[start:end]))
+
+
+def fetchCertificate(host, port=443, timeout=5):
+    # the certificate is only read for its digest, it is not verified
+    context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+    context.verify_mode = ssl.CERT_NONE
+    sock = socket.create_connection((host, port), timeout)
+    try:
+        wrapped = context.wrap_socket(sock)
+        try:
+            return wrapped.getpeercert(True)
+        finally:
+            wrapped.close()
+    finally:
+        sock.close()
+
+
+def getThumbprint(host, port=443, timeout=5, refresh=False):
+    # Cached per host:port for NSX_T_THUMBPRINT_TTL seconds. When a cached
+    # entry is refreshed the serial is compared, so a host that regenerated
+    # its certificate is reported as rotated. Callers that hand a cached
+    # thumbprint to the manager retry with getFreshThumbprint when it is rejected.
+    path = getCacheFile('thumbprint', '%s:%s' % (host, port))
+    with CacheLock(path + '.lock'):
+        previous = readCacheEntry(path, allow_expired=True)
+        if previous is not None and not refresh and previous['expires'] > time.time():
+            previous.update(cached=True, rotated=False)
+            return previous
+        der_cert = fetchCertificate(host, port, timeout)
+        entry = dict(
+            thumbprint=formatThumbprint(der_cert),
+            serial=getCertificateSerial(der_cert),
+            fetched=time.time(),
+            expires=time.time() + getThumbprintTtl()
+        )
+        writeCacheEntry(path, entry)
+    entry['cached'] = False
+    entry['rotated'] = previous is not None and previous.get('serial') != entry['serial']
+    return entry
+
+
+def getFreshThumbprint(host, port=443, timeout=5, stale=None):
+    # Re-reads the certificate after the manager rejected a cached thumbprint,
+    # returns None when it is unchanged so the original error stands.
+    try:
+        entry = getThumbprint(host, port, timeout, refresh=True)
+    except (IOError, OSError, ValueError):
+        return None
+    if entry['thumbprint'] == stale:
+        return None
+    return entry['thumbprint']
+
+
+def collectThumbprints(endpoints, port=443, timeout=5, refresh=False, max_workers=50):
+    # endpoints are host or host:port strings, fetched max_workers at a time
+    def fetch(endpoint, resolved):
+        host, host_port = splitEndpoint(endpoint, port)
+        try:
+            entry = getThumbprint(host, host_port, timeout, refresh)
+        except (IOError, OSError, ValueError) as ex:
+            return dict(failed=True, msg='Error reading certificate from %s:%s: %s' % (host, host_port, str(ex)))
+        entry.update(host=host, port=host_port)
+        return entry
+
+    order = []
+    for endpoint in endpoints:
+        if endpoint not in order:
+            order.append(endpoint)
+    return runGraph(order, dict((endpoint, {}) for endpoint in order), fetch, max_workers)
@@ -0,0 +1,129 @@
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import threading
+import time
+
+
+def referencedNames(params, name_param):
+    # a reference is a parameter holding one name or a list of names, or a
+    # function returning the names found deeper in the parameters
+    value = name_param(params) if callable(name_param) else params.get(name_param)
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [name for name in value if name]
+    return [value]
+
+
+def buildGraph(nodes, references):
+    # nodes is a list of (kind, name, params). Returns, per node key, the
+    # declared nodes it refers to mapped to the id parameter they fill in,
+    # or None when the reference only orders the two nodes. References to
+    # objects outside the list are left to the name lookup.
+    declared = set()
+    for kind, name, params in nodes:
+        if (kind, name) in declared:
+            raise ValueError("%s %s is declared more than once" % (kind, name))
+        declared.add((kind, name))
+    deps = {}
+    for kind, name, params in nodes:
+        refs = {}
+        for name_param, id_param, target_kinds in references.get(kind, []):
+            if id_param and params.get(id_param):
+                continue
+            for target in referencedNames(params, name_param):
+                for target_kind in target_kinds:
+                    if (target_kind, target) in declared and (id_param or (target_kind, target) not in refs):
+                        refs[(target_kind, target)] = id_param
+        deps[(kind, name)] = refs
+    checkAcyclic(deps)
+    return deps
+
+
+def checkAcyclic(deps):
+    waiting = dict((key, set(refs)) for key, refs in deps.items())
+    done = [key for key, refs in waiting.items() if not refs]
+    resolved = set()
+    while done:
+        key = done.pop()
+        resolved.add(key)
+        for other, refs in waiting.items():
+            if key in refs:
+                refs.discard(key)
+                if not refs and other not in resolved:
+                    done.append(other)
+    cycle = sorted(key for key in deps if key not in resolved)
+    if cycle:
+        raise ValueError("reference cycle between %s" % (', '.join('%s %s' % key for key in cycle)))
+
+
+def runGraph(order, deps, worker, max_workers):
+    # Run worker(key, resolved) for every node once all the nodes it depends
+    # on are done, at most max_workers at a time. resolved maps id parameters
+    # to the ids produced by those nodes. A failed node skips everything that
+    # depends on it, independent branches carry on.
+    dependents = dict((key, []) for key in order)
+    waiting = {}
+    for key in order:
+        waiting[key] = set(deps[key])
+        for dep in deps[key]:
+            dependents[dep].append(key)
+    ready = [key for key in order if not waiting[key]]
+    results = {}
+    cond = threading.Condition()
+
+    def complete(key, result):
+        results[key] = result
+        for child in dependents[key]:
+            if child in results:
+                continue
+            if result.get('failed'):
+                complete(child, dict(failed=True, skipped=True, changed=False,
+                                     msg="skipped, %s %s failed" % key))
+            else:
+                waiting[child].discard(key)
+                if not waiting[child]:
+                    ready.append(child)
+
+    def run():
+        while True:
+            with cond:
+                while not ready and len(results) < len(order):
+                    cond.wait()
+                if not ready:
+                    return
+                key = ready.pop(0)
+                resolved = dict((id_param, results[dep].get('id')) for dep, id_param in deps[key].items() if id_param)
+            start = time.time()
+            try:
+                result = worker(key, resolved)
+            except Exception as ex:
+                result = dict(failed=True, changed=False, msg=str(ex))
+            result['elapsed'] = round(time.time() - start, 3)
+            with cond:
+                complete(key, result)
+                cond.notify_all()
+
+    threads = [threading.Thread(target=run) for i in range(max(1, min(max_workers, len(order))))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
@@ -0,0 +1,61 @@
+# coding=utf-8
+#
+# Copyright © 2018 VMware, Inc. All Rights Reserved.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software, and
+# to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions
+# of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED
+# TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF
+# CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import os
+import random
+import time
+
+WAIT_SUCCESS = 'success'
+WAIT_FAILURE = 'failure'
+WAIT_TIMEOUT = 'timeout'
+
+
+def getWaitTimeout(default):
+    return int(os.getenv("NSX_T_WAIT_TIMEOUT", default))
+
+
+def backoffDelays(initial=1, maximum=15, factor=2, jitter=0.5):
+    # Exponential delays capped at maximum, each shortened by a random share
+    # of up to jitter so parallel waiters do not poll in lock step.
+    delay = initial
+    while True:
+        yield delay * (1 - random.uniform(0, jitter))
+        delay = min(maximum, delay * factor)
+
+
+def stateIn(*states):
+    return lambda state: state in states
+
+
+def waitFor(poll, success, failure=None, timeout=300, initial=1, maximum=15, factor=2, jitter=0.5,
+            sleep=time.sleep):
+    # Call poll() until success(state) or failure(state) holds for what it
+    # returned, backing off between calls, and give up once timeout seconds
+    # have passed. Returns (WAIT_SUCCESS|WAIT_FAILURE|WAIT_TIMEOUT, last state).
+    deadline = time.time() + timeout
+    delays = backoffDelays(initial, maximum, factor, jitter)
+    while True:
+        state = poll()
+        if success(state):
+            return WAIT_SUCCESS, state
+        if failure is not None and failure(state):
+            return WAIT_FAILURE, state
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return WAIT_TIMEOUT, state
+        sleep(min(next(delays), remaining))